@@ -1,89 +1,59 @@
 import streamlit as st
 from user_management import create_user, delete_user, list_all_users
+from download_service import file_download_button
+from presence import get_presence_registry
+from storage import get_storage
+from metrics_service import metrics_url
+from workflows.metrics import REGISTRY
 from pathlib import Path
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
-import psutil
-import subprocess
 
-# Session tracking file
-SESSIONS_FILE = Path(".streamlit/sessions.json")
-UPLOADS_FILE = Path(".streamlit/uploads.json")
+# State namespaces/logs in the shared state database (storage.py)
+SESSIONS_NS = "sessions"
+UPLOADS_NS = "uploads"
+ACTIVITY_LOG = "activity"
+UPLOADS_KEEP = 50
+ACTIVITY_KEEP = 100
+
+# Short TTLs for the admin's data sources: rerunning a section (or clicking a
+# widget in it) reuses the last read instead of re-globbing /tmp, re-reading
+# logs or sampling CPU for a second.
+HEALTH_TTL_SEC = 10
+FILES_TTL_SEC = 30
+LOGS_TTL_SEC = 15
+
+# Output files listed by the admin, by name ending (batch ZIPs, bulk and batch summaries included)
+OUTPUT_SUFFIXES = ["_output.xlsx", "_smart_output.xlsx", ".zip", "enriched_output.xlsx", "_SUMMARY.xlsx", "_QC_SUMMARY.xlsx"]
 
 def track_user_session(username, action="login"):
     """Track active user sessions"""
-    Path(".streamlit").mkdir(exist_ok=True)
-    sessions = {}
-    
-    if SESSIONS_FILE.exists():
-        try:
-            with open(SESSIONS_FILE, 'r') as f:
-                sessions = json.load(f)
-        except:
-            sessions = {}
-    
-    if action == "login":
-        sessions[username] = {
-            "login_time": datetime.now().isoformat(),
-            "last_activity": datetime.now().isoformat(),
-            "status": "online"
-        }
-    elif action == "logout":
-        if username in sessions:
-            sessions[username]["status"] = "offline"
-            sessions[username]["logout_time"] = datetime.now().isoformat()
-    elif action == "activity":
-        if username in sessions:
-            sessions[username]["last_activity"] = datetime.now().isoformat()
-    
+    def apply(session):
+        now = datetime.now().isoformat()
+        if action == "login":
+            return {"login_time": now, "last_activity": now, "status": "online"}
+        if session is None:
+            return None
+        if action == "logout":
+            session["status"] = "offline"
+            session["logout_time"] = now
+        elif action == "activity":
+            session["last_activity"] = now
+        return session
+
     try:
-        with open(SESSIONS_FILE, 'w') as f:
-            json.dump(sessions, f, indent=2)
-    except:
+        if action == "login" or get_storage().get(SESSIONS_NS, username) is not None:
+            get_storage().update(SESSIONS_NS, username, apply)
+    except Exception:
         pass
 
 def get_online_users():
-    """Get list of currently online users"""
-    if not SESSIONS_FILE.exists():
-        return []
-    
-    try:
-        with open(SESSIONS_FILE, 'r') as f:
-            sessions = json.load(f)
-        
-        online = []
-        for username, data in sessions.items():
-            if data.get("status") == "online":
-                # Check if user was active in last 15 minutes
-                last_activity = datetime.fromisoformat(data.get("last_activity", datetime.now().isoformat()))
-                if datetime.now() - last_activity < timedelta(minutes=15):
-                    online.append({
-                        "username": username,
-                        "login_time": data.get("login_time", "Unknown"),
-                        "last_activity": data.get("last_activity", "Unknown"),
-                        "session_duration": str(datetime.now() - datetime.fromisoformat(data.get("login_time", datetime.now().isoformat())))[:8]
-                    })
-        
-        return online
-    except:
-        return []
+    """Get list of currently online users (from the in-memory presence registry)"""
+    return get_presence_registry().online_users()
 
 def track_file_upload(username, filename, filesize_mb, workflow_type="unknown", filepath=None):
     """Track file uploads with optional file path for download"""
-    Path(".streamlit").mkdir(exist_ok=True)
-    uploads = {}
-    
-    if UPLOADS_FILE.exists():
-        try:
-            with open(UPLOADS_FILE, 'r') as f:
-                uploads = json.load(f)
-        except:
-            uploads = {}
-    
-    if username not in uploads:
-        uploads[username] = []
-    
     upload_record = {
         "timestamp": datetime.now().isoformat(),
         "filename": filename,
@@ -99,33 +69,24 @@ def track_file_upload(username, filename, filesize_mb, workflow_type="unknown",
         except:
             pass
     
-    uploads[username].append(upload_record)
-    
-    # Keep only last 50 uploads per user
-    if len(uploads[username]) > 50:
-        uploads[username] = uploads[username][-50:]
-    
+    # Keep only last UPLOADS_KEEP uploads per user
     try:
-        with open(UPLOADS_FILE, 'w') as f:
-            json.dump(uploads, f, indent=2)
-    except:
+        get_storage().update(UPLOADS_NS, username, lambda uploads: (uploads + [upload_record])[-UPLOADS_KEEP:], default=[])
+    except Exception:
         pass
+    get_user_uploads.clear()
 
+@st.cache_data(ttl=FILES_TTL_SEC, show_spinner=False)
 def get_user_uploads(username=None):
     """Get file uploads by user"""
-    if not UPLOADS_FILE.exists():
-        return {}
-    
     try:
-        with open(UPLOADS_FILE, 'r') as f:
-            uploads = json.load(f)
-        
         if username:
-            return uploads.get(username, [])
-        return uploads
-    except:
+            return get_storage().get(UPLOADS_NS, username, [])
+        return get_storage().items(UPLOADS_NS)
+    except Exception:
         return {} if not username else []
 
+@st.cache_data(ttl=FILES_TTL_SEC, show_spinner=False)
 def get_output_files():
     """Get list of output files created"""
     output_files = []
@@ -134,9 +95,10 @@ def get_output_files():
     try:
         temp_dirs = list(temp_base.glob("dhl_team_tool_*"))
         for temp_dir in temp_dirs[-20:]:
-            files = list(temp_dir.glob("*"))
+            # batch and bulk runs write into subfolders (batch_output/, bulk_output/)
+            files = list(temp_dir.rglob("*"))
             for file in files:
-                if file.is_file() and any(file.name.endswith(ext) for ext in ['_output.xlsx', '_smart_output.xlsx', '.zip', 'enriched_output.xlsx']):
+                if file.is_file() and any(file.name.endswith(ext) for ext in OUTPUT_SUFFIXES):
                     size_mb = file.stat().st_size / (1024 * 1024)
                     mod_time = datetime.fromtimestamp(file.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
                     output_files.append({
@@ -151,6 +113,7 @@ def get_output_files():
     
     return output_files
 
+@st.cache_data(ttl=LOGS_TTL_SEC, show_spinner=False)
 def get_app_logs(lines=50):
     """Get recent app logs"""
     log_files = list(Path("logs").glob("*.log")) if Path("logs").exists() else []
@@ -166,6 +129,7 @@ def get_app_logs(lines=50):
     except:
         return []
 
+@st.cache_data(ttl=FILES_TTL_SEC, show_spinner=False)
 def get_uploaded_files():
     """Get list of uploaded files"""
     uploaded_files = []
@@ -186,9 +150,11 @@ def get_uploaded_files():
                     })
     return uploaded_files
 
+@st.cache_data(ttl=HEALTH_TTL_SEC, show_spinner=False)
 def get_system_health():
     """Get system health metrics"""
     try:
+        import psutil  # only needed on the System tab; keeps non-admin page loads light
         cpu_percent = psutil.cpu_percent(interval=1)
         memory = psutil.virtual_memory()
         disk = psutil.disk_usage('/')
@@ -205,9 +171,11 @@ def get_system_health():
     except:
         return None
 
+@st.cache_data(ttl=HEALTH_TTL_SEC, show_spinner=False)
 def get_process_info():
     """Get current process info"""
     try:
+        import psutil
         process = psutil.Process(os.getpid())
         return {
             "pid": process.pid,
@@ -221,49 +189,81 @@ def get_process_info():
 
 def get_activity_log():
     """Get user activity log"""
-    activity_file = Path(".streamlit/activity.json")
-    if activity_file.exists():
-        try:
-            with open(activity_file, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    try:
+        return get_storage().tail(ACTIVITY_LOG, ACTIVITY_KEEP)
+    except Exception:
+        return []
 
 def log_activity(action, user, details=""):
     """Log user activity"""
-    activity_file = Path(".streamlit/activity.json")
-    Path(".streamlit").mkdir(exist_ok=True)
-    
-    activities = get_activity_log()
-    activities.append({
-        "timestamp": datetime.now().isoformat(),
-        "user": user,
-        "action": action,
-        "details": details
-    })
-    
-    # Keep only last 100 activities
-    if len(activities) > 100:
-        activities = activities[-100:]
-    
+    # Keep only last ACTIVITY_KEEP activities
     try:
-        with open(activity_file, 'w') as f:
-            json.dump(activities, f, indent=2)
-    except:
+        get_storage().append(ACTIVITY_LOG, {
+            "timestamp": datetime.now().isoformat(),
+            "user": user,
+            "action": action,
+            "details": details
+        }, keep=ACTIVITY_KEEP)
+    except Exception:
         pass
 
+def get_metrics_summary():
+    """This process's workflow metrics (workflows/metrics.py) as admin tables."""
+    snap = REGISTRY.snapshot()
+
+    def samples(name):
+        return snap.get(name, {}).get("samples", [])
+
+    def bound(p):
+        # quantiles are bucket upper bounds; past the last bucket there is none
+        return None if p in (None, float("inf")) else p
+
+    workflows = {}
+    for labels, value in samples("dhl_workflow_runs_total"):
+        w = workflows.setdefault(labels["workflow"], {"workflow": labels["workflow"], "ok": 0, "error": 0})
+        w[labels["status"]] = int(value)
+    for labels, value in samples("dhl_workflow_in_progress"):
+        workflows.setdefault(labels["workflow"], {"workflow": labels["workflow"], "ok": 0, "error": 0})["running"] = int(value)
+    for labels, value in samples("dhl_workflow_rows_total"):
+        workflows.setdefault(labels["workflow"], {"workflow": labels["workflow"], "ok": 0, "error": 0})["rows"] = int(value)
+
+    stages = []
+    for labels, h in samples("dhl_workflow_stage_seconds"):
+        if labels["stage"] == "total":
+            w = workflows.setdefault(labels["workflow"], {"workflow": labels["workflow"], "ok": 0, "error": 0})
+            w["mean_s"] = round(h["mean"], 2)
+            w["p95_s"] = bound(h["p95"])
+        else:
+            stages.append({"workflow": labels["workflow"], "stage": labels["stage"], "count": h["count"],
+                           "mean_s": round(h["mean"], 3), "p95_s": bound(h["p95"]), "total_s": round(h["sum"], 1)})
+
+    api_status = {labels["status"]: int(value) for labels, value in samples("dhl_api_requests_total")}
+    latency = (samples("dhl_api_request_seconds") or [({}, {"count": 0, "mean": None, "p95": None})])[0][1]
+    lookups = {labels["source"]: int(value) for labels, value in samples("dhl_enrich_lookups_total")}
+    ratio = samples("dhl_enrich_cache_hit_ratio")
+    return {
+        "workflows": sorted(workflows.values(), key=lambda w: w["workflow"]),
+        "stages": stages,
+        "api_requests": sum(api_status.values()),
+        "api_status": api_status,
+        "api_failed": sum(n for status, n in api_status.items() if status not in ("200", "400")),
+        "api_mean_ms": round(latency["mean"] * 1000) if latency["mean"] is not None else None,
+        "api_p95_ms": round(bound(latency["p95"]) * 1000) if bound(latency["p95"]) is not None else None,
+        "api_retries": int(sum(value for _, value in samples("dhl_api_retries_total"))),
+        "lookups": lookups,
+        "cache_hit_ratio": ratio[0][1] if ratio else None,
+    }
+
 def get_session_stats():
     """Get session statistics"""
-    # Try to read from a stats file if it exists
-    stats_file = Path(".streamlit/session_stats.json")
-    if stats_file.exists():
-        try:
-            with open(stats_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+    try:
+        return get_storage().items("session_stats")
+    except Exception:
+        return {}
+
+def clear_admin_caches():
+    for fn in (get_user_uploads, get_output_files, get_app_logs, get_uploaded_files, get_system_health, get_process_info):
+        fn.clear()
 
 def export_data():
     """Export all application data"""
@@ -276,507 +276,527 @@ def export_data():
     return json.dumps(export_data, indent=2)
 
 
-def show_admin_panel():
-    """Admin panel for user management and monitoring"""
-    st.write("### 👨‍💼 Admin Panel")
+@st.fragment
+def _users_section():
+    """Create, delete and list users"""
+    st.write("**Manage Users**")
+    subtab1, subtab2, subtab3 = st.columns(3)
     
-    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
-        "👥 Users", 
-        "📊 Statistics", 
-        "📁 Files", 
-        "📝 Logs",
-        "💻 System",
-        "📈 Activity",
-        "⚙️ Tools",
-        "🌐 Online Users"
-    ])
-    
-    # TAB 1: User Management
-    with tab1:
-        st.write("**Manage Users**")
-        subtab1, subtab2, subtab3 = st.columns(3)
-        
-        with subtab1:
-            st.write("#### Create User")
-            new_username = st.text_input("New Username:")
-            new_password = st.text_input("New Password:", type="password")
-            new_role = st.selectbox("User Role:", ["user", "admin"])
-            
-            if st.button("Create User", use_container_width=True):
-                if new_username and new_password:
-                    success, message = create_user(new_username, new_password, new_role)
-                    if success:
-                        st.success(f"✅ {message}")
-                    else:
-                        st.error(f"❌ {message}")
+    with subtab1:
+        st.write("#### Create User")
+        new_username = st.text_input("New Username:")
+        new_password = st.text_input("New Password:", type="password")
+        new_role = st.selectbox("User Role:", ["user", "admin"])
+        
+        if st.button("Create User", use_container_width=True):
+            if new_username and new_password:
+                success, message = create_user(new_username, new_password, new_role)
+                if success:
+                    st.success(f"✅ {message}")
                 else:
-                    st.warning("⚠️ Please fill in all fields")
-        
-        with subtab2:
-            st.write("#### Delete User")
-            users = list_all_users()
-            if users:
-                user_to_delete = st.selectbox("Select user to delete:", list(users.keys()))
-                
-                if st.button("Delete User", use_container_width=True, key="delete_btn"):
-                    success, message = delete_user(user_to_delete)
-                    if success:
-                        st.success(f"✅ {message}")
-                    else:
-                        st.error(f"❌ {message}")
+                    st.error(f"❌ {message}")
             else:
-                st.info("No users found")
-        
-        with subtab3:
-            st.write("#### All Users")
-            users = list_all_users()
-            if users:
-                for username, user_data in users.items():
-                    role = user_data if isinstance(user_data, str) else user_data.get("role", "user")
-                    st.write(f"👤 **{username}** - Role: `{role}`")
-            else:
-                st.info("No users found")
+                st.warning("⚠️ Please fill in all fields")
     
-    # TAB 2: Statistics
-    with tab2:
-        st.write("**Application Statistics**")
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            users = list_all_users()
-            st.metric("Total Users", len(users))
-        
-        with col2:
-            uploaded_files = get_uploaded_files()
-            st.metric("Files Processed", len(uploaded_files))
-        
-        with col3:
-            # Check if log files exist
-            log_files = list(Path("logs").glob("*.log")) if Path("logs").exists() else []
-            st.metric("Log Files", len(log_files))
-        
-        with col4:
-            # Get current session info
-            if "username" in st.session_state:
-                st.metric("Current User", st.session_state.username)
-            else:
-                st.metric("Current User", "Guest")
-        
-        # Session details
-        st.write("**Session Details**")
-        session_info = {
-            "Session User": st.session_state.get("username", "Unknown"),
-            "User Role": st.session_state.get("user_role", "Unknown"),
-            "Login Status": "✅ Logged In" if st.session_state.get("logged_in") else "❌ Not Logged In",
-            "Session Started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        }
-        for key, value in session_info.items():
-            st.write(f"**{key}:** {value}")
+    with subtab2:
+        st.write("#### Delete User")
+        users = list_all_users()
+        if users:
+            user_to_delete = st.selectbox("Select user to delete:", list(users.keys()))
+            
+            if st.button("Delete User", use_container_width=True, key="delete_btn"):
+                success, message = delete_user(user_to_delete)
+                if success:
+                    st.success(f"✅ {message}")
+                else:
+                    st.error(f"❌ {message}")
+        else:
+            st.info("No users found")
     
-    # TAB 3: Uploaded Files
-    with tab3:
-        st.write("**Recently Uploaded Files**")
-        uploaded_files = get_uploaded_files()
-        
-        if uploaded_files:
-            # Create dataframe-like display
-            for file_info in uploaded_files:
-                col1, col2, col3 = st.columns([2, 1, 1])
-                with col1:
-                    st.write(f"📄 {file_info['name']}")
-                with col2:
-                    st.write(f"Size: {file_info['size_mb']} MB")
-                with col3:
-                    st.write(f"⏰ {file_info['uploaded']}")
+    with subtab3:
+        st.write("#### All Users")
+        users = list_all_users()
+        if users:
+            for username, user_data in users.items():
+                role = user_data if isinstance(user_data, str) else user_data.get("role", "user")
+                st.write(f"👤 **{username}** - Role: `{role}`")
         else:
-            st.info("📭 No uploaded files yet")
-        
-        # File statistics
-        st.write("**File Statistics**")
-        if uploaded_files:
-            total_size = sum(float(f['size_mb']) for f in uploaded_files)
-            st.write(f"Total Files: {len(uploaded_files)}")
-            st.write(f"Total Size: {total_size:.2f} MB")
-            st.write(f"Average Size: {total_size/len(uploaded_files):.2f} MB")
-    
-    # TAB 4: Logs
-    with tab4:
-        st.write("**Application Logs**")
-        
-        log_level = st.selectbox("Filter by type:", ["All", "Errors", "Info", "Debug"])
-        lines_to_show = st.slider("Number of lines to display:", 10, 200, 50)
-        
-        logs = get_app_logs(lines_to_show)
-        
-        if logs:
-            log_text = "".join(logs)
-            
-            # Filter logs
-            if log_level != "All":
-                log_text = "\n".join([
-                    line for line in log_text.split("\n") 
-                    if log_level.lower() in line.lower()
-                ])
-            
-            st.code(log_text, language="text")
-            
-            # Download logs button
-            if st.button("📥 Download Logs"):
-                st.download_button(
-                    label="Download as TXT",
-                    data=log_text,
-                    file_name=f"app_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                    mime="text/plain"
-                )
+            st.info("No users found")
+
+
+@st.fragment
+def _statistics_section():
+    """Application statistics"""
+    st.write("**Application Statistics**")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        users = list_all_users()
+        st.metric("Total Users", len(users))
+    
+    with col2:
+        uploaded_files = get_uploaded_files()
+        st.metric("Files Processed", len(uploaded_files))
+    
+    with col3:
+        # Check if log files exist
+        log_files = list(Path("logs").glob("*.log")) if Path("logs").exists() else []
+        st.metric("Log Files", len(log_files))
+    
+    with col4:
+        # Get current session info
+        if "username" in st.session_state:
+            st.metric("Current User", st.session_state.username)
         else:
-            st.info("📭 No logs available")
+            st.metric("Current User", "Guest")
     
-    # TAB 5: Settings
-    with tab5:
-        st.write("**Admin Settings**")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.write("**Application Info**")
-            st.info("""
-            **DHLMailShot v1.0**
-            
-            - Framework: Streamlit
-            - Platform: Streamlit Cloud
-            - Deployment: GitHub
-            - Status: ✅ Active
-            """)
-        
-        with col2:
-            st.write("**Quick Actions**")
-            if st.button("🔄 Refresh Statistics", use_container_width=True):
-                st.rerun()
-            
-            if st.button("📋 View System Info", use_container_width=True):
-                st.write(f"Python Version: {__import__('sys').version}")
-                st.write(f"Streamlit Version: {__import__('streamlit').__version__}")
-                st.write(f"Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        # Danger Zone
-        st.write("**⚠️ Danger Zone**")
-        st.warning("Advanced operations that may affect the application")
-        
-        if st.button("Clear All Logs", use_container_width=True):
-            try:
-                import shutil
-                if Path("logs").exists():
-                    shutil.rmtree("logs")
-                    Path("logs").mkdir()
-                st.success("✅ Logs cleared")
-            except Exception as e:
-                st.error(f"❌ Error: {e}")
+    # Session details
+    st.write("**Session Details**")
+    session_info = {
+        "Session User": st.session_state.get("username", "Unknown"),
+        "User Role": st.session_state.get("user_role", "Unknown"),
+        "Login Status": "✅ Logged In" if st.session_state.get("logged_in") else "❌ Not Logged In",
+        "Session Started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    for key, value in session_info.items():
+        st.write(f"**{key}:** {value}")
+
+
+@st.fragment
+def _files_section():
+    """Recently uploaded files"""
+    st.write("**Recently Uploaded Files**")
+    uploaded_files = get_uploaded_files()
     
-    # TAB 6: System Health & Performance
-    with tab6:
-        st.write("**System Health Monitoring**")
-        
-        health = get_system_health()
-        
-        if health:
-            col1, col2, col3 = st.columns(3)
-            
+    if uploaded_files:
+        # Create dataframe-like display
+        for file_info in uploaded_files:
+            col1, col2, col3 = st.columns([2, 1, 1])
             with col1:
-                st.metric("CPU Usage", f"{health['cpu_percent']}%", delta="Live")
-            
+                st.write(f"📄 {file_info['name']}")
             with col2:
-                st.metric("Memory Usage", 
-                         f"{health['memory_percent']}%", 
-                         f"{health['memory_used_gb']:.2f}/{health['memory_total_gb']:.2f}GB")
-            
+                st.write(f"Size: {file_info['size_mb']} MB")
             with col3:
-                st.metric("Disk Usage", 
-                         f"{health['disk_percent']}%",
-                         f"{health['disk_used_gb']:.2f}/{health['disk_total_gb']:.2f}GB")
-            
-            # Charts
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.write("**Resource Usage**")
-                resource_data = {
-                    "CPU": health['cpu_percent'],
-                    "Memory": health['memory_percent'],
-                    "Disk": health['disk_percent']
-                }
-                st.bar_chart(resource_data)
-            
-            with col2:
-                st.write("**Process Information**")
-                process_info = get_process_info()
-                if process_info:
-                    st.write(f"**Process ID:** {process_info['pid']}")
-                    st.write(f"**Memory:** {process_info['memory_mb']:.2f} MB")
-                    st.write(f"**CPU:** {process_info['cpu_percent']:.1f}%")
-                    st.write(f"**Threads:** {process_info['threads']}")
-                    st.write(f"**Started:** {process_info['create_time']}")
-        else:
-            st.warning("⚠️ Could not retrieve system metrics")
+                st.write(f"⏰ {file_info['uploaded']}")
+    else:
+        st.info("📭 No uploaded files yet")
+    
+    # File statistics
+    st.write("**File Statistics**")
+    if uploaded_files:
+        total_size = sum(float(f['size_mb']) for f in uploaded_files)
+        st.write(f"Total Files: {len(uploaded_files)}")
+        st.write(f"Total Size: {total_size:.2f} MB")
+        st.write(f"Average Size: {total_size/len(uploaded_files):.2f} MB")
+
+
+@st.fragment
+def _logs_section():
+    """Application logs"""
+    st.write("**Application Logs**")
+    
+    log_level = st.selectbox("Filter by type:", ["All", "Errors", "Info", "Debug"])
+    lines_to_show = st.slider("Number of lines to display:", 10, 200, 50)
     
-    # TAB 7: Activity Log
-    with tab7:
-        st.write("**User Activity Log**")
+    logs = get_app_logs(lines_to_show)
+    
+    if logs:
+        log_text = "".join(logs)
         
-        activities = get_activity_log()
+        # Filter logs
+        if log_level != "All":
+            log_text = "\n".join([
+                line for line in log_text.split("\n") 
+                if log_level.lower() in line.lower()
+            ])
         
-        if activities:
-            # Show last activities first
-            for activity in reversed(activities[-20:]):
-                timestamp = activity.get('timestamp', 'Unknown')
-                user = activity.get('user', 'Unknown')
-                action = activity.get('action', 'Unknown')
-                details = activity.get('details', '')
-                
-                with st.container():
-                    col1, col2, col3 = st.columns([2, 2, 2])
-                    with col1:
-                        st.write(f"**{user}**")
-                    with col2:
-                        st.write(f"*{action}*")
-                    with col3:
-                        st.write(f"⏰ {timestamp[:19]}")
-                    if details:
-                        st.caption(f"📝 {details}")
-                    st.divider()
-        else:
-            st.info("📭 No activity recorded yet")
+        st.code(log_text, language="text")
         
-        # Export activity
-        if st.button("📥 Download Activity Log", use_container_width=True):
-            activity_json = json.dumps(activities, indent=2)
+        # Download logs button
+        if st.button("📥 Download Logs"):
             st.download_button(
-                label="Download JSON",
-                data=activity_json,
-                file_name=f"activity_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                mime="application/json"
+                label="Download as TXT",
+                data=log_text,
+                file_name=f"app_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                mime="text/plain"
             )
+    else:
+        st.info("📭 No logs available")
+
+
+@st.fragment
+def _system_section():
+    """System health & performance"""
+    st.write("**System Health Monitoring**")
     
-    # TAB 8: Tools & Utilities
-    with tab5:
-        st.write("**Admin Tools**")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.write("**Application Info**")
-            st.info("""
-            **DHLMailShot v1.0**
-            
-            - Framework: Streamlit
-            - Deployment: Streamlit Cloud
-            - Repository: GitHub
-            - Status: ✅ Active
-            """)
-        
-        with col2:
-            st.write("**Quick Actions**")
-            if st.button("🔄 Refresh Dashboard", use_container_width=True):
-                st.rerun()
-            
-            if st.button("📋 System Information", use_container_width=True):
-                st.write(f"**Python Version:** {__import__('sys').version}")
-                st.write(f"**Streamlit Version:** {__import__('streamlit').__version__}")
-                st.write(f"**Current Time:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                st.write(f"**Platform:** {__import__('platform').system()}")
-        
-        st.divider()
-        st.write("**Data Management**")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            if st.button("📤 Export All Data", use_container_width=True):
-                data = export_data()
-                st.download_button(
-                    label="Download JSON Export",
-                    data=data,
-                    file_name=f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
-                )
-        
-        with col2:
-            if st.button("🔐 Export Users", use_container_width=True):
-                users_data = json.dumps(list_all_users(), indent=2)
-                st.download_button(
-                    label="Download Users JSON",
-                    data=users_data,
-                    file_name=f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
-                )
-        
-        with col3:
-            if st.button("📊 Export Logs", use_container_width=True):
-                logs = "\n".join(get_app_logs(200))
-                st.download_button(
-                    label="Download Logs TXT",
-                    data=logs,
-                    file_name=f"logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                    mime="text/plain"
-                )
-        
-        st.divider()
-        st.write("**⚠️ Danger Zone**")
-        st.warning("Advanced operations - use with caution!")
-        
+    health = get_system_health()
+    
+    if health:
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            if st.button("🗑️ Clear Logs", use_container_width=True):
-                try:
-                    import shutil
-                    if Path("logs").exists():
-                        shutil.rmtree("logs")
-                        Path("logs").mkdir()
-                    st.success("✅ Logs cleared")
-                except Exception as e:
-                    st.error(f"❌ Error: {e}")
+            st.metric("CPU Usage", f"{health['cpu_percent']}%", delta="Live")
         
         with col2:
-            if st.button("🗑️ Clear Activity", use_container_width=True):
-                try:
-                    activity_file = Path(".streamlit/activity.json")
-                    if activity_file.exists():
-                        activity_file.unlink()
-                    st.success("✅ Activity log cleared")
-                except Exception as e:
-                    st.error(f"❌ Error: {e}")
+            st.metric("Memory Usage", 
+                     f"{health['memory_percent']}%", 
+                     f"{health['memory_used_gb']:.2f}/{health['memory_total_gb']:.2f}GB")
         
         with col3:
-            if st.button("🔄 Restart App", use_container_width=True):
-                st.warning("⚠️ App will restart. This will disconnect all users.")
-                if st.button("Confirm Restart", key="confirm_restart"):
-                    st.rerun()
-    
-    # TAB 8: Online Users & Sessions
-    with tab8:
-        st.write("**🌐 Online Users & Active Sessions**")
+            st.metric("Disk Usage", 
+                     f"{health['disk_percent']}%",
+                     f"{health['disk_used_gb']:.2f}/{health['disk_total_gb']:.2f}GB")
         
-        col1, col2, col3 = st.columns(3)
+        # Charts
+        col1, col2 = st.columns(2)
         
         with col1:
-            online_users = get_online_users()
-            st.metric("👥 Online Users", len(online_users))
+            st.write("**Resource Usage**")
+            resource_data = {
+                "CPU": health['cpu_percent'],
+                "Memory": health['memory_percent'],
+                "Disk": health['disk_percent']
+            }
+            st.bar_chart(resource_data)
         
         with col2:
-            uploads = get_user_uploads()
-            total_uploads = sum(len(v) for v in uploads.values())
-            st.metric("📤 Total Uploads", total_uploads)
-        
-        with col3:
-            outputs = get_output_files()
-            st.metric("📥 Output Files", len(outputs))
-        
-        st.divider()
-        
-        # Online Users
-        if online_users:
-            st.write("**Currently Online**")
-            for user in online_users:
-                with st.container(border=True):
-                    col1, col2, col3, col4 = st.columns(4)
-                    
-                    with col1:
-                        st.write(f"**👤 {user['username']}**")
-                    
-                    with col2:
-                        st.caption(f"Login: {user['login_time'].split('T')[1][:5]}")
-                    
-                    with col3:
-                        st.caption(f"Session: {user['session_duration']}")
-                    
-                    with col4:
-                        st.caption(f"📍 Last activity: {user['last_activity'].split('T')[1][:5]}")
-                    
-                    # Show user's recent uploads
-                    user_uploads = get_user_uploads(user['username'])
-                    if user_uploads:
-                        st.write(f"*Recent uploads ({len(user_uploads)}):*")
-                        for idx, upload in enumerate(user_uploads[-5:]):
-                            col_file, col_download = st.columns([3, 1])
-                            with col_file:
-                                st.caption(f"📄 {upload['filename']} ({upload['size_mb']} MB) - {upload['workflow']}")
-                            with col_download:
-                                if "filepath" in upload and Path(upload["filepath"]).exists():
-                                    with open(upload["filepath"], "rb") as f:
-                                        st.download_button(
-                                            label="📥",
-                                            data=f,
-                                            file_name=upload["filename"],
-                                            key=f"dl_{user['username']}_{idx}_{upload['timestamp']}"
-                                        )
-                        else:
-                            st.info("No files available for download")
-        else:
-            st.info("😴 No users currently online")
-        
-        st.divider()
-        
-        # All User Activity
-        st.write("**📊 User Upload Summary**")
-        uploads = get_user_uploads()
-        
-        if uploads:
-            summary_data = {user: len(files) for user, files in uploads.items()}
-            st.bar_chart(summary_data)
+            st.write("**Process Information**")
+            process_info = get_process_info()
+            if process_info:
+                st.write(f"**Process ID:** {process_info['pid']}")
+                st.write(f"**Memory:** {process_info['memory_mb']:.2f} MB")
+                st.write(f"**CPU:** {process_info['cpu_percent']:.1f}%")
+                st.write(f"**Threads:** {process_info['threads']}")
+                st.write(f"**Started:** {process_info['create_time']}")
+    else:
+        st.warning("⚠️ Could not retrieve system metrics")
+
+
+@st.fragment
+def _activity_section():
+    """User activity log"""
+    st.write("**User Activity Log**")
+    
+    activities = get_activity_log()
+    
+    if activities:
+        # Show last activities first
+        for activity in reversed(activities[-20:]):
+            timestamp = activity.get('timestamp', 'Unknown')
+            user = activity.get('user', 'Unknown')
+            action = activity.get('action', 'Unknown')
+            details = activity.get('details', '')
             
-            for username, files in uploads.items():
-                if files:
-                    with st.expander(f"📁 {username} ({len(files)} uploads)"):
-                        for idx, file in enumerate(files[-10:]):
-                            col_file, col_download = st.columns([3, 1])
-                            with col_file:
-                                st.caption(f"• {file['filename']} ({file['size_mb']} MB) - {file['timestamp'].split('T')[1][:5]}")
-                            with col_download:
-                                if "filepath" in file and Path(file["filepath"]).exists():
-                                    with open(file["filepath"], "rb") as f:
-                                        st.download_button(
-                                            label="📥",
-                                            data=f,
-                                            file_name=file["filename"],
-                                            key=f"dl_exp_{username}_{idx}_{file['timestamp']}"
-                                        )
-        else:
-            st.info("No uploads tracked yet")
-        
-        st.divider()
-        
-        # Recent Output Files
-        st.write("**📥 Generated Output Files**")
+            with st.container():
+                col1, col2, col3 = st.columns([2, 2, 2])
+                with col1:
+                    st.write(f"**{user}**")
+                with col2:
+                    st.write(f"*{action}*")
+                with col3:
+                    st.write(f"⏰ {timestamp[:19]}")
+                if details:
+                    st.caption(f"📝 {details}")
+                st.divider()
+    else:
+        st.info("📭 No activity recorded yet")
+    
+    # Export activity
+    if st.button("📥 Download Activity Log", use_container_width=True):
+        activity_json = json.dumps(activities, indent=2)
+        st.download_button(
+            label="Download JSON",
+            data=activity_json,
+            file_name=f"activity_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json"
+        )
+
+
+@st.fragment
+def _tools_section():
+    """Tools & utilities"""
+    st.write("**Admin Tools**")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write("**Application Info**")
+        st.info("""
+        **DHLMailShot v1.0**
+        
+        - Framework: Streamlit
+        - Deployment: Streamlit Cloud
+        - Repository: GitHub
+        - Status: ✅ Active
+        """)
+    
+    with col2:
+        st.write("**Quick Actions**")
+        if st.button("🔄 Refresh Dashboard", use_container_width=True):
+            clear_admin_caches()
+            st.rerun()
+        
+        if st.button("📋 System Information", use_container_width=True):
+            st.write(f"**Python Version:** {__import__('sys').version}")
+            st.write(f"**Streamlit Version:** {__import__('streamlit').__version__}")
+            st.write(f"**Current Time:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            st.write(f"**Platform:** {__import__('platform').system()}")
+    
+    st.divider()
+    st.write("**Data Management**")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if st.button("📤 Export All Data", use_container_width=True):
+            data = export_data()
+            st.download_button(
+                label="Download JSON Export",
+                data=data,
+                file_name=f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json"
+            )
+    
+    with col2:
+        if st.button("🔐 Export Users", use_container_width=True):
+            users_data = json.dumps(list_all_users(), indent=2)
+            st.download_button(
+                label="Download Users JSON",
+                data=users_data,
+                file_name=f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json"
+            )
+    
+    with col3:
+        if st.button("📊 Export Logs", use_container_width=True):
+            logs = "\n".join(get_app_logs(200))
+            st.download_button(
+                label="Download Logs TXT",
+                data=logs,
+                file_name=f"logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                mime="text/plain"
+            )
+    
+    st.divider()
+    st.write("**⚠️ Danger Zone**")
+    st.warning("Advanced operations - use with caution!")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if st.button("🗑️ Clear Logs", use_container_width=True):
+            try:
+                import shutil
+                if Path("logs").exists():
+                    shutil.rmtree("logs")
+                    Path("logs").mkdir()
+                get_app_logs.clear()
+                st.success("✅ Logs cleared")
+            except Exception as e:
+                st.error(f"❌ Error: {e}")
+    
+    with col2:
+        if st.button("🗑️ Clear Activity", use_container_width=True):
+            try:
+                get_storage().clear_log(ACTIVITY_LOG)
+                st.success("✅ Activity log cleared")
+            except Exception as e:
+                st.error(f"❌ Error: {e}")
+    
+    with col3:
+        if st.button("🔄 Restart App", use_container_width=True):
+            st.warning("⚠️ App will restart. This will disconnect all users.")
+            if st.button("Confirm Restart", key="confirm_restart"):
+                st.rerun()
+
+
+@st.fragment
+def _online_section():
+    """Online users & sessions"""
+    st.write("**🌐 Online Users & Active Sessions**")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        online_users = get_online_users()
+        st.metric("👥 Online Users", len(online_users))
+    
+    with col2:
+        uploads = get_user_uploads()
+        total_uploads = sum(len(v) for v in uploads.values())
+        st.metric("📤 Total Uploads", total_uploads)
+    
+    with col3:
         outputs = get_output_files()
-        
-        if outputs:
-            for idx, output in enumerate(outputs[-10:]):
-                with st.container(border=True):
-                    col1, col2, col3, col_download = st.columns([2, 1, 1, 1])
-                    
-                    with col1:
-                        st.write(f"📄 {output['name']}")
-                    
-                    with col2:
-                        st.caption(f"{output['size_mb']} MB")
-                    
-                    with col3:
-                        st.caption(f"{output['created']}")
-                    
-                    with col_download:
-                        try:
-                            if Path(output["path"]).exists():
-                                with open(output["path"], "rb") as f:
-                                    st.download_button(
-                                        label="📥",
-                                        data=f,
-                                        file_name=output["name"],
-                                        key=f"dl_output_{idx}_{output['created']}"
-                                    )
-                        except:
-                            st.caption("❌")
-        else:
-            st.info("No output files generated yet")
+        st.metric("📥 Output Files", len(outputs))
+    
+    st.divider()
+    
+    # Online Users
+    if online_users:
+        st.write("**Currently Online**")
+        for user in online_users:
+            with st.container(border=True):
+                col1, col2, col3, col4 = st.columns(4)
+                
+                with col1:
+                    st.write(f"**👤 {user['username']}**")
+                
+                with col2:
+                    st.caption(f"Login: {user['login_time'].split('T')[1][:5]}")
+                
+                with col3:
+                    st.caption(f"Session: {user['session_duration']}")
+                
+                with col4:
+                    st.caption(f"📍 Last activity: {user['last_activity'].split('T')[1][:5]}")
+                
+                # Show user's recent uploads
+                user_uploads = get_user_uploads(user['username'])
+                if user_uploads:
+                    st.write(f"*Recent uploads ({len(user_uploads)}):*")
+                    for idx, upload in enumerate(user_uploads[-5:]):
+                        col_file, col_download = st.columns([3, 1])
+                        with col_file:
+                            st.caption(f"📄 {upload['filename']} ({upload['size_mb']} MB) - {upload['workflow']}")
+                        with col_download:
+                            if "filepath" in upload and Path(upload["filepath"]).exists():
+                                file_download_button("📥", upload["filepath"], file_name=upload["filename"],
+                                                     key=f"dl_{user['username']}_{idx}_{upload['timestamp']}")
+                    else:
+                        st.info("No files available for download")
+    else:
+        st.info("😴 No users currently online")
+    
+    st.divider()
+    
+    # All User Activity
+    st.write("**📊 User Upload Summary**")
+    uploads = get_user_uploads()
+    
+    if uploads:
+        summary_data = {user: len(files) for user, files in uploads.items()}
+        st.bar_chart(summary_data)
+        
+        for username, files in uploads.items():
+            if files:
+                with st.expander(f"📁 {username} ({len(files)} uploads)"):
+                    for idx, file in enumerate(files[-10:]):
+                        col_file, col_download = st.columns([3, 1])
+                        with col_file:
+                            st.caption(f"• {file['filename']} ({file['size_mb']} MB) - {file['timestamp'].split('T')[1][:5]}")
+                        with col_download:
+                            if "filepath" in file and Path(file["filepath"]).exists():
+                                file_download_button("📥", file["filepath"], file_name=file["filename"],
+                                                     key=f"dl_exp_{username}_{idx}_{file['timestamp']}")
+    else:
+        st.info("No uploads tracked yet")
+    
+    st.divider()
+    
+    # Recent Output Files
+    st.write("**📥 Generated Output Files**")
+    outputs = get_output_files()
+    
+    if outputs:
+        for idx, output in enumerate(outputs[-10:]):
+            with st.container(border=True):
+                col1, col2, col3, col_download = st.columns([2, 1, 1, 1])
+                
+                with col1:
+                    st.write(f"📄 {output['name']}")
+                
+                with col2:
+                    st.caption(f"{output['size_mb']} MB")
+                
+                with col3:
+                    st.caption(f"{output['created']}")
+                
+                with col_download:
+                    try:
+                        if Path(output["path"]).exists():
+                            file_download_button("📥", output["path"], file_name=output["name"],
+                                                 key=f"dl_output_{idx}_{output['created']}")
+                    except:
+                        st.caption("❌")
+    else:
+        st.info("No output files generated yet")
+
+
+@st.fragment
+def _metrics_section():
+    """Workflow throughput, stage latency and DHL API health"""
+    st.write("**Workflow Metrics**")
+    url = metrics_url()
+    st.caption(f"This instance since its last restart. Prometheus text: {url}" if url
+               else "This instance since its last restart. The metrics page is disabled or its port is taken.")
+    if st.button("🔄 Refresh", key="metrics_refresh"):
+        st.rerun(scope="fragment")
+
+    m = get_metrics_summary()
+    if m["workflows"]:
+        st.dataframe(m["workflows"], use_container_width=True, hide_index=True,
+                     column_order=["workflow", "ok", "error", "running", "rows", "mean_s", "p95_s"])
+    else:
+        st.info("📭 No workflow has run in this instance yet")
+    if m["stages"]:
+        with st.expander("Stage latency"):
+            st.dataframe(m["stages"], use_container_width=True, hide_index=True)
 
+    st.write("**DHL Location Finder API**")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Requests", m["api_requests"])
+    with col2:
+        st.metric("Failed", m["api_failed"], help="Responses other than 200 and 400 (Unknown Country), and requests with no response")
+    with col3:
+        st.metric("Latency", f"{m['api_mean_ms']} ms" if m["api_mean_ms"] is not None else "–",
+                  f"p95 ≤ {m['api_p95_ms']} ms" if m["api_p95_ms"] is not None else None, delta_color="off")
+    with col4:
+        st.metric("Retries", m["api_retries"])
+    if m["api_status"]:
+        st.bar_chart(m["api_status"])
 
+    st.write("**Enricher Lookups**")
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        ratio = m["cache_hit_ratio"]
+        st.metric("Cache hit ratio (last run)", f"{ratio:.0%}" if ratio is not None else "–")
+    with col2:
+        if any(m["lookups"].values()):
+            st.bar_chart(m["lookups"])
+
+    with st.expander("Raw metrics (Prometheus text)"):
+        st.code(REGISTRY.render(), language="text")
+
+
+SECTIONS = {
+    "👥 Users": _users_section,
+    "📊 Statistics": _statistics_section,
+    "📁 Files": _files_section,
+    "📝 Logs": _logs_section,
+    "💻 System": _system_section,
+    "⏱️ Metrics": _metrics_section,
+    "📈 Activity": _activity_section,
+    "⚙️ Tools": _tools_section,
+    "🌐 Online Users": _online_section,
+}
+
+
+def show_admin_panel():
+    """Admin panel for user management and monitoring.
+
+    Only the selected section runs (st.tabs would execute all nine bodies on
+    every rerun), and each section is a fragment, so its own widgets rerun it
+    without rerunning the workflow page below.
+    """
+    st.write("### 👨‍💼 Admin Panel")
+    section = st.radio(
+        "Admin section", list(SECTIONS), index=None, horizontal=True,
+        key="admin_section", label_visibility="collapsed",
+    )
+    if section is None:
+        st.caption("Select a section to load it.")
+        return
+    SECTIONS[section]()
@@ -1,18 +1,30 @@
 import streamlit as st
 from pathlib import Path
+import os
+import re
+import shutil
 import tempfile
-
-from workflows.per_tab_zip import run_per_tab_zip, PerTabZipOptions
-from workflows.final_ai_standard import run_final_ai_standard
-from workflows.final_ai_smart import run_final_ai_smart
-from workflows.postal_enricher import run_postal_enricher, EnricherOptions
+import time
+import zipfile
+
+# Workflow modules (pandas, numpy, openpyxl, requests) are imported inside the
+# branch of the selected workflow, and the admin panel only for admins, so the
+# first page load after a restart does not pay for code the user never runs.
+# preflight is stdlib-only.
+from workflows.preflight import CHUNK_ROWS, CHUNKED_THRESHOLD_ROWS, WORKFLOW_LIMITS, check_upload_size, check_workbook, inspect_workbook
 from auth import check_login, logout
-from admin_panel import show_admin_panel, track_user_session, track_file_upload
+from download_service import XLSX_MIME, file_download_button
+from metrics_service import start_metrics_server
+from presence import leave_presence, touch_presence
+from admin_panel import track_user_session, track_file_upload
 from user_management import create_user
 
 # Set page config
 st.set_page_config(page_title="DHL Team Tool", layout="wide")
 
+# Prometheus text page of this process's workflow metrics (once per process)
+start_metrics_server()
+
 # Create default user on first run
 try:
     create_user("mabuzeid", "Mta@0127809934800", "admin")
@@ -26,6 +38,7 @@ check_login()
 if "session_tracked" not in st.session_state:
     track_user_session(st.session_state.username, "login")
     st.session_state.session_tracked = True
+touch_presence(st.session_state.username)
 
 # Sidebar
 with st.sidebar:
@@ -34,6 +47,7 @@ with st.sidebar:
     
     if st.button("Logout", use_container_width=True):
         track_user_session(st.session_state.username, "logout")
+        leave_presence()
         logout()
 
 # Main content
@@ -41,6 +55,7 @@ st.write("### 📦 DHL Team Tool")
 
 # Show admin panel only to admins
 if st.session_state.user_role == "admin":
+    from admin_panel import show_admin_panel
     show_admin_panel()
     st.divider()
 
@@ -56,16 +71,87 @@ workflow = st.selectbox(
 
 st.divider()
 
-work_dir = Path(tempfile.mkdtemp(prefix="dhl_team_tool_"))
-
-def save_uploaded(uploaded_file, target_path: Path):
-    target_path.write_bytes(uploaded_file.getbuffer())
+# One working folder per browser session: reruns (e.g. after changing an
+# option) reuse the saved uploads, and the parsed-workbook cache keyed by
+# content hash then skips re-parsing them.
+if "work_dir" not in st.session_state:
+    st.session_state.work_dir = tempfile.mkdtemp(prefix="dhl_team_tool_")
+work_dir = Path(st.session_state.work_dir)
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+GAZETTEER_DB = Path(".streamlit/gazetteer.sqlite")
+# Outlives the per-run temp folder so an interrupted enrichment resumes on rerun
+CHECKPOINT_DIR = Path(".streamlit/checkpoints")
+# Row fingerprints of each user's last incremental run, per workflow
+INCREMENTAL_DIR = Path(".streamlit/incremental")
+# Worker processes for multi-file Final AI batches; each holds its own pandas
+# heap, so keep this low under the PM2 memory cap (1 = run in the app process)
+BATCH_WORKERS = int(os.environ.get("DHL_BATCH_WORKERS", "1"))
+
+
+def fingerprint_file(kind: str) -> str:
+    user = re.sub(r"[^A-Za-z0-9_.-]+", "_", st.session_state.username)
+    return str(INCREMENTAL_DIR / f"{kind}_{user}.sqlite")
+
+
+def save_uploaded(uploaded_file, target_path: Path, limits_key: str = 'reference'):
+    errors = check_upload_size(uploaded_file.size, WORKFLOW_LIMITS[limits_key])
+    if errors:
+        st.error(f"{uploaded_file.name}: {errors[0]}")
+        st.stop()
+    # Same upload already saved at this path on an earlier rerun
+    saved = st.session_state.setdefault("saved_uploads", {})
+    stamp = (uploaded_file.file_id, uploaded_file.size)
+    if saved.get(str(target_path)) == stamp and target_path.exists():
+        return target_path
+    # Spool to disk in chunks instead of materializing another full copy
+    uploaded_file.seek(0)
+    with open(target_path, 'wb') as f:
+        shutil.copyfileobj(uploaded_file, f, UPLOAD_CHUNK_BYTES)
     # Track file upload with path
     size_mb = uploaded_file.size / (1024 * 1024)
     track_file_upload(st.session_state.username, uploaded_file.name, size_mb, "workflow", str(target_path))
+    saved[str(target_path)] = stamp
     return target_path
 
 
+def preflight(path: Path, limits_key: str, row_multiplier: int = 1):
+    """Reject or warn on oversized workbooks before a workflow loads them."""
+    try:
+        info = inspect_workbook(path)
+    except Exception as e:
+        st.error(f"{path.name}: not a readable .xlsx workbook ({e})")
+        st.stop()
+    errors, warnings = check_workbook(info, WORKFLOW_LIMITS[limits_key], row_multiplier)
+    for w in warnings:
+        st.warning(f"{path.name}: {w}")
+    if errors:
+        for e in errors:
+            st.error(f"{path.name}: {e}")
+        st.stop()
+    return info
+
+
+OUTPUT_FORMAT_LABELS = {"xlsx": "Excel (.xlsx)", "csv": "CSV (UTF-8)", "parquet": "Parquet"}
+
+
+def output_formats_select(key: str) -> tuple:
+    formats = st.multiselect(
+        "Output formats", list(OUTPUT_FORMAT_LABELS), default=["xlsx"], format_func=OUTPUT_FORMAT_LABELS.get, key=key,
+        help="CSV/Parquet: one file per output sheet, for import tools. Leave out Excel to skip building the workbook.",
+    )
+    if not formats:
+        st.warning("Choose at least one output format.")
+    return tuple(formats)
+
+
+def tables_download_button(label: str, tables: list, zip_path: Path):
+    """One ZIP download for the CSV/Parquet tables of a run."""
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for p in map(Path, tables):
+            z.write(p, arcname=p.name)
+    file_download_button(label, zip_path, mime="application/zip")
+
 
 def get_secret(name: str) -> str:
     try:
@@ -75,70 +161,179 @@ def get_secret(name: str) -> str:
 
 
 if workflow.startswith('1)') or workflow.startswith('2)'):
+    from workflows.final_ai_standard import run_final_ai_batch
+    if workflow.startswith('1)'):
+        from workflows.final_ai_standard import PREVIEW_ROWS, preview_final_ai, run_final_ai_standard
+    else:
+        from workflows.final_ai_smart import PREVIEW_ROWS, preview_final_ai_smart, run_final_ai_smart
+
     st.subheader("Inputs")
-    af_input = st.file_uploader("Upload AF Input.xlsx", type=["xlsx", "xlsm"], key="af")
+    af_inputs = st.file_uploader(
+        "Upload AF Input.xlsx (several files run as one batch)", type=["xlsx", "xlsm"], key="af", accept_multiple_files=True,
+    )
+    af_input = af_inputs[0] if af_inputs else None
     country_code = st.file_uploader("Upload country code .xlsx", type=["xlsx"], key="cc")
     template = st.file_uploader("Upload final AI template .xlsx", type=["xlsx"], key="tpl")
 
     st.caption("Output schema follows the template headers/order. The output also contains a _QC sheet.")
+    conditional_highlight = st.checkbox(
+        "Highlight flagged rows with conditional formatting (faster, smaller file)", value=False,
+        help="Adds a hidden _issue_flag column after the template columns instead of filling every cell.",
+    )
+    highlight = "conditional" if conditional_highlight else "fill"
+    incremental = st.checkbox(
+        "Incremental: reuse unchanged contacts from my previous incremental run", value=False,
+        help="Only new or changed contacts are transformed; _QC marks reused rows.",
+    )
+    formats = output_formats_select("final_ai_formats")
+
+    inputs_ready = bool(af_input and country_code and template)
+    col_preview, col_run = st.columns([1, 1])
+    with col_preview:
+        preview_btn = st.button(f"Preview first {PREVIEW_ROWS} rows per sheet", disabled=not inputs_ready)
+    with col_run:
+        run_btn = st.button("Run", type="primary", disabled=not (inputs_ready and formats))
+
+    if preview_btn:
+        limits_key = 'standard' if workflow.startswith('1)') else 'smart'
+        af_path = save_uploaded(af_input, work_dir / "AF Input.xlsx", limits_key)
+        cc_path = save_uploaded(country_code, work_dir / "country code .xlsx")
+        tpl_path = save_uploaded(template, work_dir / "final AI template.xlsx")
+        t0 = time.perf_counter()
+        if workflow.startswith('1)'):
+            preview = preview_final_ai(af_path, cc_path, tpl_path)
+        else:
+            preview = preview_final_ai_smart(af_path, cc_path, tpl_path)
+        issues = preview['qc'][preview['qc']['Issues'] != '']
+        st.success(f"Preview: {len(preview['rows'])} rows, {len(issues)} with issues ({time.perf_counter() - t0:.2f}s). Nothing was written.")
+        st.dataframe(preview['rows'], use_container_width=True, hide_index=True)
+        with st.expander(f"QC issues ({len(issues)})", expanded=bool(len(issues))):
+            st.dataframe(issues, use_container_width=True, hide_index=True)
+        with st.expander("Column mapping"):
+            st.dataframe(preview['mapping'], use_container_width=True, hide_index=True)
+
+    if run_btn and len(af_inputs) > 1:
+        limits_key = 'standard' if workflow.startswith('1)') else 'smart'
+        # one folder per upload keeps same-named files apart; outputs get unique stems
+        af_paths = []
+        for i, f in enumerate(af_inputs):
+            (work_dir / "batch_inputs" / str(i)).mkdir(parents=True, exist_ok=True)
+            af_paths.append(save_uploaded(f, work_dir / "batch_inputs" / str(i) / f.name, limits_key))
+        cc_path = save_uploaded(country_code, work_dir / "country code .xlsx")
+        tpl_path = save_uploaded(template, work_dir / "final AI template.xlsx")
+        af_infos = [preflight(p, limits_key) for p in af_paths]
+        preflight(cc_path, 'reference')
+        preflight(tpl_path, 'reference')
+        chunk_rows = CHUNK_ROWS if max(info['total_rows'] for info in af_infos) > CHUNKED_THRESHOLD_ROWS else 0
+        kind = "final_ai" if workflow.startswith('1)') else "final_ai_smart"
+
+        bar = st.progress(0.0, text=f"Building {len(af_paths)} files…")
+        with st.spinner("Building batch…"):
+            stats = run_final_ai_batch(
+                af_paths, cc_path, tpl_path, work_dir / "batch_output", workers=BATCH_WORKERS, chunk_rows=chunk_rows,
+                highlight=highlight, fingerprint_file=fingerprint_file(kind) if incremental else "", formats=formats,
+                smart=not workflow.startswith('1)'),
+                progress=lambda done, total, name: bar.progress(done / total, text=f"{done}/{total} {name}"),
+            )
 
-    run_btn = st.button("Run", type="primary", disabled=not (af_input and country_code and template))
+        st.success(f"Done. Files: {stats['files']} | Rows: {stats['rows']} | Highlighted: {stats['highlighted']}")
+        if stats["failed"]:
+            st.error(f"{stats['failed']} file(s) failed; see the Files sheet of _QC_SUMMARY.")
+        file_download_button("Download outputs + _QC_SUMMARY (ZIP)", stats["zip_path"], mime="application/zip")
 
-    if run_btn:
-        af_path = save_uploaded(af_input, work_dir / "AF Input.xlsx")
+    elif run_btn:
+        limits_key = 'standard' if workflow.startswith('1)') else 'smart'
+        af_path = save_uploaded(af_input, work_dir / "AF Input.xlsx", limits_key)
         cc_path = save_uploaded(country_code, work_dir / "country code .xlsx")
         tpl_path = save_uploaded(template, work_dir / "final AI template.xlsx")
+        af_info = preflight(af_path, limits_key)
+        preflight(cc_path, 'reference')
+        preflight(tpl_path, 'reference')
         out_path = work_dir / ("final_AI_output.xlsx" if workflow.startswith('1)') else "final_AI_smart_output.xlsx")
 
+        # Large inputs go through the chunked pipeline to stay within the memory cap
+        chunk_rows = CHUNK_ROWS if af_info['total_rows'] > CHUNKED_THRESHOLD_ROWS else 0
+        if chunk_rows:
+            st.info(f"Large input ({af_info['total_rows']:,} rows): processing in chunks of {chunk_rows:,} rows.")
+
         with st.spinner("Building…"):
             if workflow.startswith('1)'):
-                stats = run_final_ai_standard(af_path, cc_path, tpl_path, out_path)
+                stats = run_final_ai_standard(af_path, cc_path, tpl_path, out_path, chunk_rows=chunk_rows, highlight=highlight,
+                                              fingerprint_file=fingerprint_file("final_ai") if incremental else "",
+                                              formats=formats)
             else:
-                stats = run_final_ai_smart(af_path, cc_path, tpl_path, out_path)
+                stats = run_final_ai_smart(af_path, cc_path, tpl_path, out_path, chunk_rows=chunk_rows, highlight=highlight,
+                                           fingerprint_file=fingerprint_file("final_ai_smart") if incremental else "",
+                                           formats=formats)
 
         st.success(f"Done. Rows: {stats.get('rows', 0)} | Highlighted: {stats.get('highlighted', 0)}")
+        if incremental:
+            st.info(f"Incremental: {stats.get('reused_rows', 0)} rows reused, {stats.get('computed_rows', 0)} new or changed.")
 
-        with open(out_path, 'rb') as f:
-            st.download_button(
-                "Download output Excel",
-                data=f,
-                file_name=out_path.name,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+        if "xlsx" in formats:
+            file_download_button("Download output Excel", out_path, mime=XLSX_MIME)
+        if stats.get("tables"):
+            tables_download_button("Download CSV/Parquet tables (ZIP)", stats["tables"], out_path.with_name(out_path.stem + "_tables.zip"))
 
 
 elif workflow.startswith('3)'):
+    from workflows.per_tab_zip import PREVIEW_ROWS, preview_per_tab, run_per_tab_zip, PerTabZipOptions
+
     st.subheader("Inputs")
     main_xlsx = st.file_uploader("Upload MAIN Excel (multiple tabs)", type=["xlsx", "xlsm"], key="main")
     items_xlsx = st.file_uploader("Upload Items.xlsx", type=["xlsx"], key="items")
 
     st.subheader("Options")
     keep_phone_all_lines = st.checkbox("Keep Destination Phone on all item lines", value=True)
+    fast_writer = st.checkbox(
+        "Fast low-memory Excel writer (xlsxwriter)", value=False,
+        help="Streams rows to disk instead of building each workbook in memory. Same sheets, headers and columns.",
+    )
+    formats = output_formats_select("per_tab_formats")
+
+    inputs_ready = bool(main_xlsx and items_xlsx)
+    col_preview, col_run = st.columns([1, 1])
+    with col_preview:
+        preview_btn = st.button(f"Preview first {PREVIEW_ROWS} rows per tab", disabled=not inputs_ready)
+    with col_run:
+        run_btn = st.button("Run", type="primary", disabled=not (inputs_ready and formats))
 
-    run_btn = st.button("Run", type="primary", disabled=not (main_xlsx and items_xlsx))
+    if preview_btn:
+        main_path = save_uploaded(main_xlsx, work_dir / "main.xlsx", 'per_tab')
+        items_path = save_uploaded(items_xlsx, work_dir / "Items.xlsx")
+        t0 = time.perf_counter()
+        preview = preview_per_tab(main_path, items_path, PerTabZipOptions(keep_phone_on_all_item_lines=keep_phone_all_lines))
+        st.success(f"Preview: {preview['tabs']} tabs, {len(preview['rows'])} item lines ({time.perf_counter() - t0:.2f}s). Nothing was written.")
+        st.dataframe(preview['rows'], use_container_width=True, hide_index=True)
+        with st.expander("Phone QC"):
+            st.dataframe(preview['qc'], use_container_width=True, hide_index=True)
 
     if run_btn:
-        main_path = save_uploaded(main_xlsx, work_dir / "main.xlsx")
+        main_path = save_uploaded(main_xlsx, work_dir / "main.xlsx", 'per_tab')
         items_path = save_uploaded(items_xlsx, work_dir / "Items.xlsx")
+        items_info = preflight(items_path, 'reference')
+        item_lines = max(1, items_info['sheets'][0]['rows'] - 1) if items_info['sheets'] else 1
+        preflight(main_path, 'per_tab', row_multiplier=item_lines)
 
         with st.spinner("Processing…"):
-            opts = PerTabZipOptions(keep_phone_on_all_item_lines=keep_phone_all_lines)
+            opts = PerTabZipOptions(
+                keep_phone_on_all_item_lines=keep_phone_all_lines,
+                excel_writer="xlsxwriter" if fast_writer else "openpyxl",
+                output_formats=formats,
+            )
             result = run_per_tab_zip(main_path, items_path, options=opts)
 
         zip_path = result['zip_path']
         st.success(f"Done. Per-tab files: {result['per_tab_count']}. ZIP ready.")
-        with open(zip_path, "rb") as f:
-            st.download_button(
-                label="Download DHL_PER_TAB_EXCELS.zip",
-                data=f,
-                file_name=zip_path.name,
-                mime="application/zip",
-            )
+        file_download_button("Download DHL_PER_TAB_EXCELS.zip", zip_path, mime="application/zip")
 
 
 else:
     st.subheader("Inputs")
-    in_xlsx = st.file_uploader("Upload Excel to enrich", type=["xlsx", "xlsm"], key="enrich")
+    in_files = st.file_uploader(
+        "Upload Excel to enrich (several files run as one batch)", type=["xlsx", "xlsm"], key="enrich",
+        accept_multiple_files=True,
+    )
 
     st.subheader("DHL API Key")
     default_key = get_secret('DHL_API_KEY')
@@ -152,25 +347,92 @@ else:
     provider = st.selectbox("Provider type", options=['express','parcel'], index=0)
     strict_city = st.checkbox("Use city returned by DHL", value=True)
     only_empty = st.checkbox("Only fill empty cells", value=False)
-
-    run_btn = st.button("Run", type="primary", disabled=not (in_xlsx and api_key))
+    incremental = st.checkbox("Incremental: reuse rows unchanged since my previous incremental run", value=False)
+    fast_writer = st.checkbox(
+        "Fast low-memory Excel writer (xlsxwriter)", value=False,
+        help="Streams rows to disk instead of building the workbook in memory. Same sheets, headers and columns.",
+    )
+    formats = output_formats_select("enrich_formats")
+
+    with st.expander("Offline gazetteer (resolve known cities without API calls)"):
+        if GAZETTEER_DB.exists():
+            st.caption(f"Gazetteer ready: {GAZETTEER_DB} ({GAZETTEER_DB.stat().st_size / (1024 * 1024):.1f} MB)")
+        else:
+            st.caption("No gazetteer yet. Import a GeoNames postal file (e.g. allCountries.zip or EG.zip).")
+        geo_file = st.file_uploader("GeoNames postal TSV (.txt or .zip)", type=["txt", "tsv", "zip"], key="geonames")
+        geo_countries = st.text_input("Only these countries (ISO2, comma-separated; empty = all)", value="")
+        if st.button("Import gazetteer", disabled=not geo_file):
+            from workflows.gazetteer import build_gazetteer
+            geo_path = save_uploaded(geo_file, work_dir / geo_file.name, 'gazetteer')
+            with st.spinner("Building gazetteer…"):
+                countries = [c for c in geo_countries.split(',') if c.strip()] or None
+                info = build_gazetteer(geo_path, GAZETTEER_DB, countries)
+            st.success(f"Imported {info['places']:,} places in {info['countries']} countries.")
+    use_gazetteer = st.checkbox("Use offline gazetteer before the API", value=GAZETTEER_DB.exists(), disabled=not GAZETTEER_DB.exists())
+
+    run_btn = st.button("Run", type="primary", disabled=not (in_files and api_key and formats))
 
     if run_btn:
-        in_path = save_uploaded(in_xlsx, work_dir / "input.xlsx")
-        out_path = work_dir / "enriched_output.xlsx"
-
-        opts = EnricherOptions(provider_type=provider, strict_city_from_dhl=strict_city, only_empty=only_empty)
-
-        with st.spinner("Enriching… (DHL API calls may take time)"):
-            stats = run_postal_enricher(in_path, out_path, dhl_api_key=api_key, opts=opts)
-
-        st.success(f"Done. Rows processed: {stats.get('rows', 0)} | Cache size: {stats.get('cache_size', 0)}")
-        with open(out_path, 'rb') as f:
-            st.download_button(
-                "Download enriched_output.xlsx",
-                data=f,
-                file_name=out_path.name,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
+        # pandas + requests are only needed once the enrichment actually runs
+        from workflows.postal_enricher import run_postal_enricher, run_postal_enricher_bulk, EnricherOptions
+        opts = EnricherOptions(
+            provider_type=provider,
+            strict_city_from_dhl=strict_city,
+            only_empty=only_empty,
+            gazetteer_file=str(GAZETTEER_DB) if use_gazetteer and GAZETTEER_DB.exists() else '',
+            checkpoint_dir=str(CHECKPOINT_DIR),
+            fingerprint_file=fingerprint_file("enrich") if incremental else "",
+            excel_writer="xlsxwriter" if fast_writer else "openpyxl",
+            output_formats=formats,
+        )
+
+        if len(in_files) == 1:
+            in_path = save_uploaded(in_files[0], work_dir / "input.xlsx", 'enrich')
+            preflight(in_path, 'enrich')
+            out_path = work_dir / "enriched_output.xlsx"
+
+            with st.spinner("Enriching… (DHL API calls may take time)"):
+                stats = run_postal_enricher(in_path, out_path, dhl_api_key=api_key, opts=opts)
+
+            st.success(f"Done. Rows processed: {stats.get('rows', 0)} | Cache size: {stats.get('cache_size', 0)} | Gazetteer hits: {stats.get('gazetteer_hits', 0)}")
+            if incremental:
+                st.info(f"Incremental: {stats.get('reused_rows', 0)} rows reused, {stats.get('computed_rows', 0)} looked up.")
+            if stats.get('resumed_rows'):
+                st.info(f"Resumed an interrupted run: {stats['resumed_rows']} rows were restored from the checkpoint.")
+            if "xlsx" in formats:
+                file_download_button("Download enriched_output.xlsx", out_path, mime=XLSX_MIME)
+            if stats.get("tables"):
+                tables_download_button("Download CSV/Parquet tables (ZIP)", stats["tables"], work_dir / "enriched_output_tables.zip")
+        else:
+            # one folder per upload keeps same-named files apart; outputs get unique stems
+            in_paths = []
+            for i, f in enumerate(in_files):
+                (work_dir / "bulk_inputs" / str(i)).mkdir(parents=True, exist_ok=True)
+                in_paths.append(save_uploaded(f, work_dir / "bulk_inputs" / str(i) / f.name, 'enrich'))
+            for p in in_paths:
+                preflight(p, 'enrich')
+            bulk_dir = work_dir / "bulk_output"
+            # same cache files as single-file runs in this session
+            opts.cache_file = str(work_dir / EnricherOptions.cache_file)
+            opts.city_index_file = str(work_dir / EnricherOptions.city_index_file)
+            opts.neg_cache_file = str(work_dir / EnricherOptions.neg_cache_file)
+
+            bar = st.progress(0.0, text="Planning lookups…")
+            with st.spinner("Enriching batch… (DHL API calls may take time)"):
+                stats = run_postal_enricher_bulk(
+                    in_paths, bulk_dir, api_key, opts,
+                    progress=lambda done, total, name: bar.progress(done / total, text=f"{done}/{total} {name}".strip()),
+                )
+
+            st.success(f"Done. Files: {stats['files']} | Rows: {stats['rows']} | Distinct keys: {stats['unique_keys']} | "
+                       f"Looked up: {stats['planned_lookups']} | API requests: {stats['api_requests']}")
+            if stats["failed"]:
+                st.error(f"{stats['failed']} file(s) failed; see the per-file KPIs of _SUMMARY.")
+            files = [Path(p) for p in stats["outputs"] + ([stats["summary_xlsx"]] if stats["summary_xlsx"] else []) + stats["tables"]]
+            zip_path = work_dir / "enriched_outputs.zip"
+            with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+                for p in files:
+                    z.write(p, arcname=str(p.relative_to(bulk_dir)))
+            file_download_button("Download enriched outputs + _SUMMARY (ZIP)", zip_path, mime="application/zip")
 
         st.caption("Cache files are saved in the run folder during this session.")
@@ -0,0 +1,8 @@
+"""Benchmark suite for the DHL Team Tool workflows.
+
+- generators: deterministic synthetic input workbooks
+- stub_server: local stand-in for the DHL Location Finder API
+- run: times each workflow and appends results to a JSON history
+
+Usage: python -m benchmarks.run --tabs 5 --rows 2000 --items 3
+"""
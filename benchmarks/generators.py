@@ -0,0 +1,195 @@
+"""Deterministic synthetic workbooks for benchmarking.
+
+Every generator takes a seed, so the same arguments always produce the same
+file contents (and the same API keys for the enricher).
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import random
+
+import pandas as pd
+
+# (DHL country name, DHL code, dial code, cities, postcode pattern)
+COUNTRIES = [
+    ('EGYPT', 'EG', '20', ['CAIRO', 'GIZA', 'ALEXANDRIA', 'MAADI', '6TH OF OCTOBER'], '#####'),
+    ('UNITED ARAB EMIRATES', 'AE', '971', ['DUBAI', 'ABU DHABI', 'SHARJAH'], ''),
+    ('SAUDI ARABIA', 'SA', '966', ['RIYADH', 'JEDDAH', 'DAMMAM'], '#####'),
+    ('UNITED KINGDOM', 'GB', '44', ['LONDON', 'MANCHESTER', 'LEEDS'], '@# #@@'),
+    ('UNITED STATES OF AMERICA', 'US', '1', ['NEW YORK', 'CHICAGO', 'HOUSTON'], '#####'),
+    ('GERMANY', 'DE', '49', ['BERLIN', 'HAMBURG', 'MUNICH'], '#####'),
+    ('FRANCE', 'FR', '33', ['PARIS', 'LYON', 'MARSEILLE'], '#####'),
+    ('KENYA', 'KE', '254', ['NAIROBI', 'MOMBASA'], '#####'),
+]
+
+# raw spellings as they appear in AF Inputs (exercise COUNTRY_ALIASES)
+COUNTRY_SPELLINGS = {
+    'UNITED ARAB EMIRATES': ['UAE', 'United Arab Emirates'],
+    'UNITED KINGDOM': ['UK', 'United Kingdom'],
+    'UNITED STATES OF AMERICA': ['USA', 'United States of America'],
+}
+
+FIRST = ['Ahmed', 'Sara', 'John', 'Maria', 'Omar', 'Fatma', 'Peter', 'Laila', 'Hassan', 'Nour']
+LAST = ['Hassan', 'Smith', 'Mostafa', 'Schmidt', 'Dubois', 'Kamau', 'Ali', 'Brown']
+TITLES = ['Mr.', 'Mrs.', 'Ms.', 'Dr.', '']
+DEPARTMENTS = ['Sales', 'Marketing', 'Finance', 'Operations', 'HR']
+STREETS = ['Tahrir St', 'King Fahd Rd', 'High Street', 'Main St', 'Hauptstrasse', 'Rue de Rivoli']
+
+TEMPLATE_HEADERS = [
+    'Order Number', 'Date', 'To Name', 'Destination Building', 'Destination Street', 'Destination Suburb',
+    'Destination City', 'Destination Postcode', 'Destination State', 'Destination Country',
+    'Destination Email', 'Destination Phone', 'Company', 'Country Code', 'DDP',
+    'Service', 'Pieces', 'Weight', 'Currency', 'Description',
+]
+TEMPLATE_CONSTANTS = {'Service': 'P', 'Pieces': 1, 'Weight': 0.5, 'Currency': 'USD', 'Description': 'Documents'}
+
+
+def _postcode(rng: random.Random, pattern: str) -> str:
+    out = []
+    for ch in pattern:
+        if ch == '#':
+            out.append(str(rng.randint(0, 9)))
+        elif ch == '@':
+            out.append(chr(rng.randint(65, 90)))
+        else:
+            out.append(ch)
+    return ''.join(out)
+
+
+def _contact(rng: random.Random, i: int) -> dict:
+    name, _, dial, cities, pc_pattern = rng.choice(COUNTRIES)
+    first, last = rng.choice(FIRST), rng.choice(LAST)
+    company = f'{last} Trading {i % 97}'
+    street = f'Building {rng.randint(1, 300)}, {rng.randint(1, 99)} {rng.choice(STREETS)}'
+    postcode = _postcode(rng, pc_pattern) if pc_pattern else ''
+    if postcode and rng.random() < 0.3:
+        # postcode only inside the street text
+        street = f'{street} {postcode}'
+        postcode = ''
+    phone_style = rng.random()
+    if phone_style < 0.4:
+        phone = f'+{dial} {rng.randint(100, 999)} {rng.randint(1000000, 9999999)}'
+    elif phone_style < 0.7:
+        phone = f'0{rng.randint(100000000, 999999999)}'
+    elif phone_style < 0.95:
+        phone = f'00{dial}{rng.randint(100000000, 999999999)}'
+    else:
+        phone = ''
+    return {
+        'Department': rng.choice(DEPARTMENTS),
+        'Title': rng.choice(TITLES),
+        'Gender': rng.choice(['M', 'F']),
+        'Full Name': f'{first} {last}' if rng.random() > 0.02 else '',
+        'Position': 'Manager',
+        'Company': company,
+        'City': rng.choice(cities) if rng.random() > 0.05 else '',
+        'Country': rng.choice(COUNTRY_SPELLINGS.get(name, [name, name.title()])),
+        'Language': 'EN',
+        'Street Address2': street,
+        'Telephone / Mobile3': phone,
+        'Postal Code': postcode,
+        'Email': f'{first}.{last}{i}@example.com'.lower() if rng.random() > 0.2 else '',
+    }
+
+
+def tab_names(tabs: int):
+    return [f'Campaign {t + 1}' for t in range(tabs)]
+
+
+def make_af_input(path: Path, tabs: int = 3, rows: int = 1000, seed: int = 1) -> Path:
+    """AF Input / per-tab MAIN workbook: `tabs` sheets x `rows` contacts."""
+    rng = random.Random(seed)
+    path = Path(path)
+    with pd.ExcelWriter(path, engine='openpyxl') as w:
+        pd.DataFrame({'Department': DEPARTMENTS}).to_excel(w, sheet_name='ALL DEPARTMENTS', index=False)
+        i = 0
+        for sheet in tab_names(tabs):
+            recs = []
+            for _ in range(rows):
+                recs.append(_contact(rng, i))
+                i += 1
+            pd.DataFrame(recs).to_excel(w, sheet_name=sheet, index=False)
+    return path
+
+
+def make_country_code(path: Path) -> Path:
+    path = Path(path)
+    cc = pd.DataFrame(
+        [(code, name) for name, code, _, _, _ in COUNTRIES],
+        columns=['Country Code', 'Country Name'],
+    )
+    ddp = pd.DataFrame({'DDP': ['Kenya', 'Egypt']})
+    with pd.ExcelWriter(path, engine='openpyxl') as w:
+        cc.to_excel(w, sheet_name='country code', index=False)
+        ddp.to_excel(w, sheet_name='DDP', index=False)
+    return path
+
+
+def make_template(path: Path) -> Path:
+    path = Path(path)
+    row2 = [TEMPLATE_CONSTANTS.get(h) for h in TEMPLATE_HEADERS]
+    pd.DataFrame([row2], columns=TEMPLATE_HEADERS).to_excel(path, index=False, engine='openpyxl')
+    return path
+
+
+def make_items(path: Path, items: int = 3, seed: int = 1) -> Path:
+    rng = random.Random(seed)
+    path = Path(path)
+    pd.DataFrame({
+        'Item Name': [f'Sample item {i + 1}' for i in range(items)],
+        'Value': [round(rng.uniform(1, 50), 2) for _ in range(items)],
+        'Pc Weight': [round(rng.uniform(0.05, 2.0), 2) for _ in range(items)],
+    }).to_excel(path, index=False, engine='openpyxl')
+    return path
+
+
+def make_enrichment_input(path: Path, tabs: int = 2, rows: int = 1000, seed: int = 1, unique_cities: int = 0) -> Path:
+    """Enricher input. `unique_cities` > 0 adds synthetic cities so the number
+    of distinct (country, city) API keys can be scaled independently of rows."""
+    rng = random.Random(seed)
+    path = Path(path)
+    enrich_countries = [c for c in COUNTRIES if c[1] in {'EG', 'AE', 'SA', 'GB', 'US'}]
+    extra = [f'TOWN {n}' for n in range(unique_cities)]
+    with pd.ExcelWriter(path, engine='openpyxl') as w:
+        for sheet in tab_names(tabs):
+            recs = []
+            for _ in range(rows):
+                name, code, _, cities, _ = rng.choice(enrich_countries)
+                city = rng.choice(cities + extra) if extra else rng.choice(cities)
+                use_code = rng.random() < 0.5
+                recs.append({
+                    'Name': f'{rng.choice(FIRST)} {rng.choice(LAST)}',
+                    'Country': '' if use_code else rng.choice(COUNTRY_SPELLINGS.get(name, [name])),
+                    'Country Code': code if use_code else '',
+                    'City': city.title() if rng.random() < 0.5 else city,
+                    'Postal Code': '',
+                })
+            pd.DataFrame(recs).to_excel(w, sheet_name=sheet, index=False)
+    return path
+
+
+def make_geonames_tsv(path: Path, seed: int = 1, postcodes_per_city: int = 3) -> Path:
+    """GeoNames-style postal TSV covering the generator's cities (for the offline gazetteer)."""
+    rng = random.Random(seed)
+    path = Path(path)
+    with open(path, 'w', encoding='utf-8') as f:
+        for name, code, _, cities, _ in COUNTRIES:
+            for city in cities:
+                for _ in range(postcodes_per_city):
+                    postal = f'{rng.randint(10000, 99999)}'
+                    lat, lon = rng.uniform(-60, 60), rng.uniform(-120, 120)
+                    f.write('\t'.join([code, postal, city.title(), name.title(), '', '', '', '', '', f'{lat:.4f}', f'{lon:.4f}', '4']) + '\n')
+    return path
+
+
+def make_all(out_dir: Path, tabs: int = 3, rows: int = 1000, items: int = 3, seed: int = 1) -> dict:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return {
+        'af_input': make_af_input(out_dir / 'AF Input.xlsx', tabs, rows, seed),
+        'country_code': make_country_code(out_dir / 'country code .xlsx'),
+        'template': make_template(out_dir / 'final AI template.xlsx'),
+        'items': make_items(out_dir / 'Items.xlsx', items, seed),
+        'enrich_input': make_enrichment_input(out_dir / 'input.xlsx', tabs, rows, seed),
+    }
@@ -0,0 +1,177 @@
+"""Import-time budget report (cold start after a PM2 restart).
+
+Each target is imported in a fresh interpreter under `python -X importtime`;
+the cumulative time of its top-level imports is compared with a budget and
+with the previous entry in the history file. The `app` target is the set of
+module-level imports of app.py, i.e. what every first page load pays before
+a workflow is selected.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --targets app --repeat 5 --top 10
+
+Exits non-zero when a target is over its budget.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+import argparse
+import ast
+import platform
+import re
+import subprocess
+import sys
+
+from .run import git_commit, load_history, save_history
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_HISTORY = Path(__file__).resolve().parent / 'importtime_history.json'
+
+# Milliseconds, fastest of --repeat runs, interpreter startup excluded;
+# streamlit alone is ~250-350 ms, pandas ~300 ms.
+BUDGETS_MS = {
+    'app': 600,
+    'admin_panel': 600,
+    'workflows.final_ai_standard': 900,
+    'workflows.final_ai_smart': 900,
+    'workflows.per_tab_zip': 900,
+    'workflows.postal_enricher': 1000,
+}
+TARGETS = list(BUDGETS_MS)
+
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def app_imports(app_path: Path = ROOT / 'app.py') -> list:
+    """Modules imported at module level of app.py (imports inside branches are lazy)."""
+    tree = ast.parse(app_path.read_text(encoding='utf-8'))
+    mods = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            mods.extend(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            mods.append(node.module)
+    return list(dict.fromkeys(mods))
+
+
+def parse_importtime(stderr: str) -> list:
+    """-> [(package, self_us, cumulative_us, depth)] in import order."""
+    out = []
+    for line in stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            out.append((name, int(self_us), int(cum_us), len(indent) // 2))
+    return out
+
+
+def _importtime(code: str) -> list:
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['']
+        raise RuntimeError(f'import failed: {code}: {tail[0]}')
+    return parse_importtime(proc.stderr)
+
+
+def startup_modules() -> set:
+    """Imported by the bare interpreter (site, encodings, ...), excluded from totals."""
+    return {name for name, _, _, depth in _importtime('pass') if depth == 0}
+
+
+def measure(modules: list, baseline: set) -> dict:
+    """Cumulative time of the new top-level imports; 'top' breaks the requested
+    modules down into their direct imports (children are printed before parents)."""
+    entries = _importtime('; '.join(f'import {m}' for m in modules))
+    total_us = 0
+    top = []
+    children = []
+    for name, self_us, cum_us, depth in entries:
+        if depth == 1:
+            children.append((name, cum_us))
+        elif depth == 0:
+            if name not in baseline:
+                total_us += cum_us
+                if name in modules:
+                    top.extend(children)
+                    top.append((f'{name} (self)', self_us))
+                else:
+                    top.append((name, cum_us))
+            children = []
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'modules': len(entries),
+        'top': sorted(top, key=lambda t: t[1], reverse=True),
+    }
+
+
+def run_report(targets, repeat: int = 3) -> list:
+    results = []
+    baseline = startup_modules()
+    for target in targets:
+        modules = app_imports() if target == 'app' else [target]
+        # first run also compiles .pyc files; keep the fastest
+        best = min((measure(modules, baseline) for _ in range(max(1, repeat))), key=lambda r: r['total_ms'])
+        results.append({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'target': target,
+            'total_ms': best['total_ms'],
+            'budget_ms': BUDGETS_MS.get(target),
+            'modules': best['modules'],
+            'top': [[name, round(cum / 1000, 1)] for name, cum in best['top']],
+        })
+    return results
+
+
+def previous_result(history: list, entry: dict):
+    for h in reversed(history):
+        if h.get('target') == entry['target']:
+            return h
+    return None
+
+
+def format_report(results: list, history: list, top: int = 5) -> str:
+    lines = [f"{'target':<30} {'ms':>8} {'budget':>8} {'modules':>8}  vs prev"]
+    for e in results:
+        prev = previous_result(history, e)
+        delta = ''
+        if prev and prev.get('total_ms'):
+            delta = f"{(e['total_ms'] - prev['total_ms']) / prev['total_ms'] * 100:+.1f}% ({prev.get('commit') or '?'})"
+        over = ' OVER' if e['budget_ms'] and e['total_ms'] > e['budget_ms'] else ''
+        lines.append(f"{e['target']:<30} {e['total_ms']:>8.1f} {e['budget_ms'] or 0:>8} {e['modules']:>8}  {delta}{over}")
+        for name, ms in e['top'][:top]:
+            lines.append(f"    {name:<34} {ms:>8.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Import-time budget report')
+    ap.add_argument('--targets', default=','.join(TARGETS), help='comma-separated subset of: ' + ', '.join(TARGETS))
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--top', type=int, default=5, help='heaviest top-level imports to list per target')
+    ap.add_argument('--history', type=Path, default=DEFAULT_HISTORY)
+    ap.add_argument('--no-save', action='store_true')
+    args = ap.parse_args(argv)
+
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        ap.error(f"unknown target(s): {', '.join(sorted(unknown))}")
+
+    history = load_history(args.history)
+    results = run_report(targets, args.repeat)
+    print(format_report(results, history, args.top))
+    if not args.no_save:
+        save_history(history + results, args.history)
+        print(f'History: {args.history}')
+    over = [e['target'] for e in results if e['budget_ms'] and e['total_ms'] > e['budget_ms']]
+    if over:
+        print(f"Over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""End-to-end check of the workflow metrics and their Prometheus text page.
+
+Runs the enricher against the local Location Finder stub (with a 429 on every
+Nth request, so retries happen), a Final AI build and a per-tab ZIP run in
+this process, then scrapes metrics_service over HTTP on a free local port and
+checks the scraped values against what the runs and the stub report:
+
+- one ok run and the input rows per workflow
+- API requests by status add up to the stub's request count, 429s are retried
+- lookups by source add up to the enricher's rows; the hit ratio matches the kpis
+
+No monitoring service is involved; the page is parsed here.
+
+    python -m benchmarks.metrics_check --rows 300
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from urllib.request import urlopen
+import argparse
+import json
+import re
+import sys
+import tempfile
+import time
+
+from . import generators
+from .stub_server import StubLocationFinder
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_exposition(text: str) -> dict:
+    """Prometheus text -> {(name, frozenset of label pairs): value}."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        m = SAMPLE_RE.match(line)
+        if m is None:
+            raise ValueError(f'Malformed sample line: {line!r}')
+        name, labels, value = m.groups()
+        samples[(name, frozenset(LABEL_RE.findall(labels or '')))] = float(value)
+    return samples
+
+
+def total(samples: dict, name: str, **labels) -> float:
+    """Sum of name over the samples carrying all the given labels."""
+    want = {(k, str(v)) for k, v in labels.items()}
+    return sum(v for (n, ls), v in samples.items() if n == name and want <= ls)
+
+
+def run_check(rows: int, throttle_every: int = 25, seed: int = 1) -> dict:
+    sys.path.insert(0, str(ROOT))
+    from metrics_service import start_metrics_server
+    from workflows.final_ai_standard import run_final_ai_standard
+    from workflows.metrics import REGISTRY
+    from workflows.per_tab_zip import PerTabZipOptions, run_per_tab_zip
+    from workflows.postal_enricher import EnricherOptions, run_postal_enricher
+
+    REGISTRY.reset()
+    server = start_metrics_server(port=0)
+    if server is None:
+        raise RuntimeError('Metrics server could not start (DHL_METRICS=0?)')
+    host, port = server.server_address[:2]
+
+    with tempfile.TemporaryDirectory(prefix='dhl_metrics_check_') as tmp:
+        tmp = Path(tmp)
+        inputs = generators.make_all(tmp / 'inputs', tabs=2, rows=rows, seed=seed)
+        # enough distinct cities that the run makes real API calls
+        generators.make_enrichment_input(inputs['enrich_input'], tabs=2, rows=rows, seed=seed, unique_cities=rows // 4)
+        t0 = time.perf_counter()
+        with StubLocationFinder(throttle_every=throttle_every) as stub:
+            opts = EnricherOptions(api_base=stub.url, request_delay_sec=0.0)
+            enrich = run_postal_enricher(inputs['enrich_input'], tmp / 'enriched_output.xlsx', dhl_api_key='check', opts=opts)
+            stub_calls = stub.calls
+        final_ai = run_final_ai_standard(inputs['af_input'], inputs['country_code'], inputs['template'], tmp / 'final_AI_output.xlsx')
+        per_tab = run_per_tab_zip(inputs['af_input'], inputs['items'], PerTabZipOptions(out_root=str(tmp)))
+        wall = time.perf_counter() - t0
+
+        with urlopen(f'http://{host}:{port}/metrics', timeout=10) as r:
+            content_type = r.headers.get('Content-Type', '')
+            samples = parse_exposition(r.read().decode('utf-8'))
+
+    api_total = total(samples, 'dhl_api_requests_total')
+    throttled = total(samples, 'dhl_api_requests_total', status=429)
+    lookups = total(samples, 'dhl_enrich_lookups_total')
+    checks = {
+        'content_type': content_type.startswith('text/plain; version=0.0.4'),
+        'runs_ok': all(total(samples, 'dhl_workflow_runs_total', workflow=w, status='ok') == 1
+                       for w in ('enrich', 'final_ai', 'per_tab')),
+        'no_errors': total(samples, 'dhl_workflow_runs_total', status='error') == 0,
+        'in_progress_zero': total(samples, 'dhl_workflow_in_progress') == 0,
+        'enrich_rows': total(samples, 'dhl_workflow_rows_total', workflow='enrich') == enrich['rows'],
+        'final_ai_rows': total(samples, 'dhl_workflow_rows_total', workflow='final_ai') == final_ai['rows'],
+        'per_tab_rows': total(samples, 'dhl_workflow_rows_total', workflow='per_tab') == 2 * rows,
+        'stage_timings': all(total(samples, 'dhl_workflow_stage_seconds_count', workflow='enrich', stage=s) == 1
+                             for s in ('read', 'lookup', 'write', 'total')),
+        'api_requests_match_stub': api_total == stub_calls == enrich['api_requests'],
+        'api_latency_count': total(samples, 'dhl_api_request_seconds_count') == api_total,
+        'retries': throttled > 0 and total(samples, 'dhl_api_retries_total', status=429) == throttled,
+        'lookups_cover_rows': lookups <= enrich['rows'] and total(samples, 'dhl_enrich_lookups_total', source='api') == enrich['api_calls'],
+        'cache_hit_ratio': enrich['cache_hit_ratio'] is None
+                           or abs(total(samples, 'dhl_enrich_cache_hit_ratio') - enrich['cache_hit_ratio']) < 1e-3,
+    }
+    return {
+        'rows': rows,
+        'wall_s': round(wall, 2),
+        'series': len(samples),
+        'api_requests': int(api_total),
+        'api_429': int(throttled),
+        'api_calls': enrich['api_calls'],
+        'cache_hit_ratio': enrich['cache_hit_ratio'],
+        'per_tab_count': per_tab['per_tab_count'],
+        'checks': checks,
+        'ok': all(checks.values()),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Check the workflow metrics through their Prometheus text page')
+    ap.add_argument('--rows', type=int, default=300, help='rows per tab of the generated inputs')
+    ap.add_argument('--throttle-every', type=int, default=25, help='the stub answers 429 to every Nth request')
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args(argv)
+    result = run_check(args.rows, args.throttle_every, args.seed)
+    print(json.dumps(result))
+    if not result['ok']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
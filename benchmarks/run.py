@@ -0,0 +1,192 @@
+"""Benchmark runner: wall time, rows/s and peak RSS per workflow.
+
+Each workflow runs in a fresh child process so peak RSS is not polluted by
+earlier runs. Results are appended to a JSON history tagged with the current
+git commit, and compared with the previous entry for the same workflow/size.
+
+    python -m benchmarks.run --tabs 5 --rows 2000 --items 3
+    python -m benchmarks.run --workflows enrich --api-latency 0.01
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import generators
+from .stub_server import StubLocationFinder
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_HISTORY = Path(__file__).resolve().parent / 'history.json'
+WORKFLOWS = ['standard', 'standard_chunked', 'standard_cf', 'smart', 'per_tab', 'per_tab_xlsxwriter', 'enrich', 'enrich_xlsxwriter']
+
+
+def peak_rss_mb() -> float:
+    # VmHWM belongs to the current address space; ru_maxrss survives fork+exec
+    # and would report the (larger) parent's peak for spawned children
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _run_workflow(name: str, inputs: dict, out_dir: str, api_url: str) -> dict:
+    """Executed in the child process."""
+    sys.path.insert(0, str(ROOT))
+    out_dir = Path(out_dir)
+    t0 = time.perf_counter()
+    if name == 'standard':
+        from workflows.final_ai_standard import run_final_ai_standard
+        stats = run_final_ai_standard(inputs['af_input'], inputs['country_code'], inputs['template'], out_dir / 'final_AI_output.xlsx')
+    elif name == 'standard_chunked':
+        from workflows.final_ai_standard import run_final_ai_standard
+        stats = run_final_ai_standard(inputs['af_input'], inputs['country_code'], inputs['template'], out_dir / 'final_AI_output.xlsx',
+                                      chunk_rows=5000)
+    elif name == 'standard_cf':
+        from workflows.final_ai_standard import run_final_ai_standard
+        stats = run_final_ai_standard(inputs['af_input'], inputs['country_code'], inputs['template'], out_dir / 'final_AI_output.xlsx',
+                                      highlight='conditional')
+    elif name == 'smart':
+        from workflows.final_ai_smart import run_final_ai_smart
+        stats = run_final_ai_smart(inputs['af_input'], inputs['country_code'], inputs['template'], out_dir / 'final_AI_smart_output.xlsx')
+    elif name in ('per_tab', 'per_tab_xlsxwriter'):
+        from workflows.per_tab_zip import run_per_tab_zip, PerTabZipOptions
+        opts = PerTabZipOptions(excel_writer='xlsxwriter' if name.endswith('_xlsxwriter') else 'openpyxl')
+        stats = run_per_tab_zip(inputs['af_input'], inputs['items'], options=opts)
+    elif name in ('enrich', 'enrich_xlsxwriter'):
+        from workflows.postal_enricher import run_postal_enricher, EnricherOptions
+        opts = EnricherOptions(api_base=api_url, request_delay_sec=0.0,
+                               excel_writer='xlsxwriter' if name.endswith('_xlsxwriter') else 'openpyxl')
+        stats = run_postal_enricher(inputs['enrich_input'], out_dir / 'enriched_output.xlsx', dhl_api_key='bench', opts=opts)
+    else:
+        raise ValueError(f'Unknown workflow: {name}')
+    wall = time.perf_counter() - t0
+    return {
+        'wall_s': round(wall, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stats': {k: (v if isinstance(v, (int, float, str, bool)) or v is None else str(v)) for k, v in stats.items()},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ''
+
+
+def load_history(path: Path) -> list:
+    if path.exists():
+        try:
+            return json.loads(path.read_text())
+        except Exception:
+            return []
+    return []
+
+
+def save_history(history: list, path: Path):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(history, indent=2))
+    tmp.replace(path)
+
+
+def previous_result(history: list, entry: dict):
+    for h in reversed(history):
+        if all(h.get(k) == entry[k] for k in ('workflow', 'tabs', 'rows', 'items')):
+            return h
+    return None
+
+
+def run_benchmarks(workflows, tabs: int, rows: int, items: int, seed: int = 1, api_latency: float = 0.0, repeat: int = 1):
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory(prefix='dhl_bench_') as tmp, StubLocationFinder(api_latency) as stub:
+        inputs_dir = Path(tmp) / 'inputs'
+        inputs = {k: str(v) for k, v in generators.make_all(inputs_dir, tabs, rows, items, seed).items()}
+        for name in workflows:
+            for r in range(repeat):
+                run_dir = Path(tmp) / f'{name}_{r}'
+                run_dir.mkdir()
+                # copy inputs so per-run caches and per-tab output folders start cold
+                run_inputs = {}
+                for k, v in inputs.items():
+                    dst = run_dir / Path(v).name
+                    dst.write_bytes(Path(v).read_bytes())
+                    run_inputs[k] = str(dst)
+                calls_before = stub.calls
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    res = pool.submit(_run_workflow, name, run_inputs, str(run_dir), stub.url).result()
+                input_rows = tabs * rows
+                results.append({
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'commit': git_commit(),
+                    'python': platform.python_version(),
+                    'workflow': name,
+                    'tabs': tabs,
+                    'rows': rows,
+                    'items': items,
+                    'input_rows': input_rows,
+                    'wall_s': res['wall_s'],
+                    'rows_per_s': round(input_rows / res['wall_s'], 1) if res['wall_s'] else None,
+                    'peak_rss_mb': res['peak_rss_mb'],
+                    'api_calls': stub.calls - calls_before,
+                    'stats': res['stats'],
+                })
+    return results
+
+
+def format_table(results: list, history: list) -> str:
+    lines = [f"{'workflow':<18} {'rows':>8} {'wall_s':>8} {'rows/s':>10} {'rss_mb':>8} {'api':>6}  vs prev"]
+    for e in results:
+        prev = previous_result(history, e)
+        delta = ''
+        if prev and prev.get('wall_s'):
+            delta = f"{(e['wall_s'] - prev['wall_s']) / prev['wall_s'] * 100:+.1f}% time ({prev.get('commit') or '?'})"
+        lines.append(f"{e['workflow']:<18} {e['input_rows']:>8} {e['wall_s']:>8.2f} {e['rows_per_s'] or 0:>10.0f} {e['peak_rss_mb']:>8.1f} {e['api_calls']:>6}  {delta}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmark DHL Team Tool workflows')
+    ap.add_argument('--workflows', default=','.join(WORKFLOWS), help='comma-separated subset of: ' + ', '.join(WORKFLOWS))
+    ap.add_argument('--tabs', type=int, default=3)
+    ap.add_argument('--rows', type=int, default=1000, help='rows per tab')
+    ap.add_argument('--items', type=int, default=3, help='item lines for per-tab ZIP')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--repeat', type=int, default=1)
+    ap.add_argument('--api-latency', type=float, default=0.0, help='stub API latency in seconds')
+    ap.add_argument('--history', type=Path, default=DEFAULT_HISTORY)
+    ap.add_argument('--no-save', action='store_true')
+    args = ap.parse_args(argv)
+
+    workflows = [w.strip() for w in args.workflows.split(',') if w.strip()]
+    unknown = set(workflows) - set(WORKFLOWS)
+    if unknown:
+        ap.error(f"unknown workflow(s): {', '.join(sorted(unknown))}")
+
+    history = load_history(args.history)
+    results = run_benchmarks(workflows, args.tabs, args.rows, args.items, args.seed, args.api_latency, args.repeat)
+    print(format_table(results, history))
+    if not args.no_save:
+        save_history(history + results, args.history)
+        print(f'History: {args.history}')
+
+
+if __name__ == '__main__':
+    main()
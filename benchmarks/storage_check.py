@@ -0,0 +1,111 @@
+"""Multi-process check of the shared state store (storage.py).
+
+Starts N worker processes against one state directory, the way N Streamlit
+instances share it, and has each of them hammer the same records:
+
+- update(): increment one shared counter and append to one shared list
+- insert(): every worker tries to create the same user (exactly one may win)
+- append(): activity log with a cap
+
+then verifies that no update was lost. --legacy runs the same counter through
+the old load-JSON/modify/dump-JSON cycle for comparison.
+
+    python -m benchmarks.storage_check --workers 8 --ops 500
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+LOG_KEEP = 1000
+
+
+def _worker(state_dir: str, worker: int, ops: int) -> float:
+    sys.path.insert(0, str(ROOT))
+    from storage import SQLiteStorage, STATE_DB
+
+    storage = SQLiteStorage(Path(state_dir) / STATE_DB)
+    storage.insert('users', 'race', {'role': 'user', 'worker': worker})
+    t0 = time.perf_counter()
+    for i in range(ops):
+        storage.update('counters', 'hits', lambda n: n + 1, default=0)
+        storage.update('uploads', 'shared', lambda ups: ups + [f'{worker}:{i}'], default=[])
+        storage.append('activity', {'worker': worker, 'i': i}, keep=LOG_KEEP)
+    return time.perf_counter() - t0
+
+
+def _legacy_worker(state_dir: str, worker: int, ops: int) -> float:
+    path = Path(state_dir) / 'counter.json'
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            data = {'hits': 0}
+        data['hits'] += 1
+        path.write_text(json.dumps(data))
+    return time.perf_counter() - t0
+
+
+def run_check(workers: int, ops: int, legacy: bool = False) -> dict:
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='dhl_state_check_') as state_dir:
+        fn = _legacy_worker if legacy else _worker
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            times = list(pool.map(fn, [state_dir] * workers, range(workers), [ops] * workers))
+        wall = time.perf_counter() - t0
+        expected = workers * ops
+        if legacy:
+            try:
+                hits = json.loads((Path(state_dir) / 'counter.json').read_text())['hits']
+            except (OSError, ValueError):
+                hits = 0
+            return {'backend': 'json', 'expected': expected, 'counter': hits, 'lost_updates': expected - hits,
+                    'wall_s': round(wall, 2), 'ok': hits == expected}
+
+        sys.path.insert(0, str(ROOT))
+        from storage import SQLiteStorage, STATE_DB
+        storage = SQLiteStorage(Path(state_dir) / STATE_DB)
+        hits = storage.get('counters', 'hits', 0)
+        shared = storage.get('uploads', 'shared', [])
+        log = storage.tail('activity')
+        checks = {
+            'counter': hits == expected,
+            'list': len(shared) == expected and len(set(shared)) == expected,
+            'user_race': len(storage.items('users')) == 1,
+            'log_cap': len(log) == min(expected, LOG_KEEP),
+        }
+        return {
+            'backend': 'sqlite', 'expected': expected, 'counter': hits, 'lost_updates': expected - hits,
+            'wall_s': round(wall, 2), 'updates_per_s': round(3 * expected / max(times), 0),
+            'checks': checks, 'ok': all(checks.values()),
+        }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Check the shared state store under concurrent processes')
+    ap.add_argument('--workers', type=int, default=4)
+    ap.add_argument('--ops', type=int, default=300, help='read-modify-write cycles per worker and record')
+    ap.add_argument('--legacy', action='store_true', help='also run the old JSON-file read-modify-write')
+    args = ap.parse_args(argv)
+
+    results = [run_check(args.workers, args.ops)]
+    if args.legacy:
+        results.append(run_check(args.workers, args.ops, legacy=True))
+    for r in results:
+        print(json.dumps(r))
+    if not results[0]['ok']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Local stand-in for the DHL Location Finder /find-by-address endpoint.
+
+Answers deterministically from the query (postal code derived from a hash of
+country + city), optionally with an artificial latency and a 429 on every
+Nth request, so enricher runs (and their retries) can be timed offline. Point EnricherOptions.api_base at StubLocationFinder.url.
+"""
+
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import hashlib
+import json
+import threading
+import time
+
+UNKNOWN_COUNTRIES = {'XX', 'ZZ'}
+
+
+def stub_payload(country: str, city: str) -> dict | None:
+    """None -> unknown country; empty locations for cities starting with 'NOWHERE'."""
+    if country in UNKNOWN_COUNTRIES:
+        return None
+    if not city or city.upper().startswith('NOWHERE'):
+        return {'locations': []}
+    h = int(hashlib.sha1(f'{country}|{city.upper()}'.encode()).hexdigest(), 16)
+    return {'locations': [{
+        'name': f'DHL {city.title()} {i}',
+        'distance': (h >> (8 * i)) % 30000,
+        'serviceTypes': ['parcel:pick-up', 'express:drop-off'],
+        'place': {'address': {
+            'postalCode': f'{(h >> (8 * i)) % 100000:05d}',
+            'addressLocality': city.title(),
+            'countryCode': country,
+        }},
+    } for i in range(3)]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith('/find-by-address'):
+            self.send_error(404)
+            return
+        q = parse_qs(url.query)
+        country = (q.get('countryCode') or [''])[0].upper()
+        city = (q.get('addressLocality') or [''])[0]
+        self.server.calls += 1
+        if self.server.latency_sec:
+            time.sleep(self.server.latency_sec)
+
+        payload = stub_payload(country, city)
+        if self.server.throttle_every and self.server.calls % self.server.throttle_every == 0:
+            body, status = json.dumps({'title': 'Too Many Requests', 'status': 429}).encode(), 429
+        elif payload is None:
+            body, status = json.dumps({'title': 'Unknown Country', 'status': 400}).encode(), 400
+        else:
+            body, status = json.dumps(payload).encode(), 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubLocationFinder:
+    """Context manager running the stub on a free local port in a daemon thread."""
+
+    def __init__(self, latency_sec: float = 0.0, host: str = '127.0.0.1', port: int = 0, throttle_every: int = 0):
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.latency_sec = latency_sec
+        self.server.throttle_every = throttle_every
+        self.server.calls = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/location-finder/v1'
+
+    @property
+    def calls(self) -> int:
+        return self.server.calls
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    ap = argparse.ArgumentParser(description='Run the stub DHL Location Finder')
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--latency', type=float, default=0.0)
+    args = ap.parse_args()
+    stub = StubLocationFinder(args.latency, port=args.port).start()
+    print(f'Stub Location Finder at {stub.url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,206 @@
+"""Streams output files to the browser outside the Streamlit script run.
+
+st.download_button embeds the file's bytes in the session, so every rerun
+while a button is visible holds the whole ZIP/workbook in memory. Instead a
+small HTTP server thread in the same process serves files straight from disk
+in chunks, and the page only holds a link carrying a short-lived HMAC-signed
+token (path, download name, expiry).
+
+The service is opt-in: tunnels and hosted platforms (ngrok, Streamlit Cloud,
+PythonAnywhere) only expose the Streamlit port, where links to a second port
+would be dead. Without it, downloads use st.download_button.
+
+Configuration (environment):
+    DHL_DOWNLOAD_PORT      port of the side server (default 8502; expose it like 8501)
+    DHL_DOWNLOAD_HOST      bind address (default 0.0.0.0)
+    DHL_DOWNLOAD_BASE_URL  public URL of the server when behind a proxy/tunnel;
+                           "/" for links relative to the app's own origin
+    DHL_DOWNLOAD_SECRET    signing key; set the same value on every instance
+                           (default: random per process)
+    DHL_DOWNLOAD_SERVICE=1 enable (default: enabled only when DHL_DOWNLOAD_BASE_URL
+                           is set; 0 always falls back to st.download_button)
+
+Only files under ALLOWED_ROOTS are served, whatever the token says.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, urlsplit
+import base64
+import hashlib
+import hmac
+import json
+import mimetypes
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+
+import streamlit as st
+
+DOWNLOAD_PORT = int(os.environ.get("DHL_DOWNLOAD_PORT", "8502"))
+DOWNLOAD_HOST = os.environ.get("DHL_DOWNLOAD_HOST", "0.0.0.0")
+DOWNLOAD_BASE_URL = os.environ.get("DHL_DOWNLOAD_BASE_URL", "")
+ENABLED = os.environ.get("DHL_DOWNLOAD_SERVICE", "1" if DOWNLOAD_BASE_URL else "0") != "0"
+TOKEN_TTL_SEC = 15 * 60
+STREAM_CHUNK_BYTES = 1024 * 1024
+
+# Session work folders live under the temp dir (tempfile.mkdtemp(prefix="dhl_team_tool_"))
+ALLOWED_ROOTS = [Path(tempfile.gettempdir()).resolve()]
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+SHARED_SECRET = os.environ.get("DHL_DOWNLOAD_SECRET", "").encode()
+_SECRET = SHARED_SECRET or secrets.token_bytes(32)
+_server = None
+_bind_failed = False
+_server_lock = threading.Lock()
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def sign_token(path, file_name=None, ttl_sec=TOKEN_TTL_SEC, now=None):
+    """-> token granting a download of path until now + ttl_sec."""
+    path = Path(path).resolve()
+    payload = json.dumps({
+        "p": str(path),
+        "n": file_name or path.name,
+        "e": int((now or time.time()) + ttl_sec),
+    }, separators=(",", ":")).encode("utf-8")
+    sig = hmac.new(_SECRET, payload, hashlib.sha256).digest()
+    return f"{_b64(payload)}.{_b64(sig)}"
+
+
+def verify_token(token, now=None):
+    """-> (path, file_name) for a valid, unexpired token, else None."""
+    try:
+        payload_b64, sig_b64 = token.split(".", 1)
+        payload = _unb64(payload_b64)
+        if not hmac.compare_digest(hmac.new(_SECRET, payload, hashlib.sha256).digest(), _unb64(sig_b64)):
+            return None
+        data = json.loads(payload)
+    except (ValueError, TypeError):
+        return None
+    if data.get("e", 0) < (now or time.time()):
+        return None
+    path = Path(data.get("p", "")).resolve()
+    if not any(path.is_relative_to(root) for root in ALLOWED_ROOTS):
+        return None
+    return path, data.get("n") or path.name
+
+
+def _content_disposition(file_name):
+    ascii_name = file_name.encode("ascii", "replace").decode("ascii").replace('"', "")
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(file_name)}"
+
+
+class DownloadHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        url = urlsplit(self.path)
+        token = parse_qs(url.query).get("t", [""])[0]
+        granted = verify_token(token) if url.path == "/download" else None
+        if granted is None:
+            self.send_error(403, "Invalid or expired download link")
+            return
+        path, file_name = granted
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(404, "File no longer available")
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            mime = XLSX_MIME if path.suffix.lower() in (".xlsx", ".xlsm") else (mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+            self.send_response(200)
+            self.send_header("Content-Type", mime)
+            self.send_header("Content-Length", str(size))
+            self.send_header("Content-Disposition", _content_disposition(file_name))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            if send_body:
+                try:
+                    shutil.copyfileobj(f, self.wfile, STREAM_CHUNK_BYTES)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_download_server(host=DOWNLOAD_HOST, port=DOWNLOAD_PORT):
+    """Start the server thread once per process. Returns it, or None if disabled or the port is taken."""
+    global _server, _bind_failed
+    if not ENABLED:
+        return None
+    with _server_lock:
+        if _server is None and not _bind_failed:
+            try:
+                server = ThreadingHTTPServer((host, port), DownloadHandler)
+            except OSError:
+                _bind_failed = True
+                return None
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="download-service", daemon=True).start()
+            _server = server
+        return _server
+
+
+def download_port():
+    """Port serving this process's links: its own server, or, when another
+    instance already holds the port and the signing key is shared, that one."""
+    server = start_download_server()
+    if server is not None:
+        return server.server_address[1]
+    if ENABLED and SHARED_SECRET:
+        return DOWNLOAD_PORT
+    return None
+
+
+def public_base_url(port):
+    if DOWNLOAD_BASE_URL:
+        return DOWNLOAD_BASE_URL.rstrip("/")
+    host = "localhost"
+    scheme = "http"
+    try:
+        headers = st.context.headers
+        host = (headers.get("X-Forwarded-Host") or headers.get("Host") or host).split(",")[0].strip()
+        scheme = headers.get("X-Forwarded-Proto", scheme).split(",")[0].strip()
+    except Exception:
+        pass
+    hostname = host.rsplit(":", 1)[0] if not host.endswith("]") else host
+    return f"{scheme}://{hostname}:{port}"
+
+
+def download_url(path, file_name=None):
+    """Signed link for path, or None when the download service is unavailable."""
+    port = download_port()
+    if port is None:
+        return None
+    return f"{public_base_url(port)}/download?t={sign_token(path, file_name)}"
+
+
+def file_download_button(label, path, file_name=None, mime=None, key=None, use_container_width=False):
+    """Link to a streamed download; falls back to st.download_button without the service."""
+    path = Path(path)
+    file_name = file_name or path.name
+    url = download_url(path, file_name)
+    if url is not None:
+        st.link_button(label, url, use_container_width=use_container_width)
+        return
+    with open(path, "rb") as f:
+        st.download_button(label, data=f, file_name=file_name, mime=mime, key=key,
+                           use_container_width=use_container_width)
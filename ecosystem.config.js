@@ -1,8 +1,16 @@
+// DHL_INSTANCES=1 (default): one Streamlit process on 8501, as before.
+// DHL_INSTANCES=N: N processes on 8511..8510+N behind a local reverse proxy
+// listening on 8501 (see deploy/nginx.multi.conf.example). Shared state lives
+// in .streamlit/state.sqlite (storage.py); set DHL_DOWNLOAD_SECRET so every
+// instance signs download links with the same key.
+const INSTANCES = parseInt(process.env.DHL_INSTANCES || '1', 10);
+const BASE_PORT = INSTANCES > 1 ? 8511 : 8501;
+
 module.exports = {
-  apps: [{
-    name: 'dhl-team-tool',
+  apps: Array.from({ length: INSTANCES }, (_, i) => ({
+    name: INSTANCES > 1 ? `dhl-team-tool-${i}` : 'dhl-team-tool',
     script: 'python3',
-    args: '-m streamlit run app.py --server.port=8501 --server.address=0.0.0.0',
+    args: `-m streamlit run app.py --server.port=${BASE_PORT + i} --server.address=${INSTANCES > 1 ? '127.0.0.1' : '0.0.0.0'}`,
     instances: 1,
     exec_mode: 'fork',
     watch: false,
@@ -15,7 +23,18 @@ module.exports = {
     min_uptime: '10s',
     restart_delay: 4000,
     env: {
-      NODE_ENV: 'production'
+      NODE_ENV: 'production',
+      // side server streaming output downloads (download_service.py); expose it like 8501
+      DHL_DOWNLOAD_SERVICE: '1',
+      DHL_DOWNLOAD_PORT: '8502',
+      // behind the proxy, links are same-origin and the proxy forwards /download
+      DHL_DOWNLOAD_HOST: INSTANCES > 1 ? '127.0.0.1' : '0.0.0.0',
+      DHL_DOWNLOAD_BASE_URL: INSTANCES > 1 ? '/' : '',
+      DHL_DOWNLOAD_SECRET: process.env.DHL_DOWNLOAD_SECRET || '',
+      // presence snapshots are kept per instance (presence.py)
+      DHL_INSTANCE: String(i),
+      // Prometheus text page of each instance's metrics (metrics_service.py), local only
+      DHL_METRICS_PORT: String(9108 + i)
     }
-  }]
-};
\ No newline at end of file
+  }))
+};
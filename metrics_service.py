@@ -0,0 +1,84 @@
+"""Prometheus text page for the workflow metrics (workflows/metrics.py).
+
+A small HTTP server thread in the app process answers GET /metrics with the
+registry in the Prometheus text format, for a Prometheus scrape job or plain
+curl; nothing external is needed to read it. The registry is per process, so
+every instance serves its own numbers on its own port.
+
+Configuration (environment):
+    DHL_METRICS_PORT   port of the metrics page (default 9108; one per instance)
+    DHL_METRICS_HOST   bind address (default 127.0.0.1: local scrapes only)
+    DHL_METRICS=0      disable
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+import os
+import threading
+
+from workflows.metrics import REGISTRY
+
+METRICS_PORT = int(os.environ.get("DHL_METRICS_PORT", "9108"))
+METRICS_HOST = os.environ.get("DHL_METRICS_HOST", "127.0.0.1")
+ENABLED = os.environ.get("DHL_METRICS", "1") != "0"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_server = None
+_bind_failed = False
+_server_lock = threading.Lock()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        if urlsplit(self.path).path not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if send_body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Start the server thread once per process. Returns it, or None if disabled or the port is taken."""
+    global _server, _bind_failed
+    if not ENABLED:
+        return None
+    with _server_lock:
+        if _server is None and not _bind_failed:
+            try:
+                server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError:
+                _bind_failed = True
+                return None
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-service", daemon=True).start()
+            _server = server
+        return _server
+
+
+def metrics_url():
+    """Where this process serves its metrics, or None when the page is unavailable."""
+    server = start_metrics_server()
+    if server is None:
+        return None
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/metrics"
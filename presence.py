@@ -0,0 +1,177 @@
+"""In-memory presence registry for the "Online Users" admin view.
+
+Every rerun of a logged-in session touches the registry (O(1) under a lock);
+sessions that stop touching it expire after ONLINE_TIMEOUT_SEC through a timer
+wheel: each session sits in the slot of the tick it expires on, so expiring is
+a walk over the slots that elapsed since the last check, not a scan of all
+sessions. The registry is one object per process (st.cache_resource) and is
+snapshotted to the shared state database (storage.py) every
+SNAPSHOT_INTERVAL_SEC, under this instance's id, so a PM2 restart does not
+show everybody offline and the admin view can include sessions served by the
+other instances (as of their last snapshot).
+"""
+
+from datetime import datetime
+import os
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+from storage import get_storage
+
+ONLINE_TIMEOUT_SEC = 15 * 60
+TICK_SEC = 10
+SNAPSHOT_INTERVAL_SEC = 30
+PRESENCE_NS = "presence"
+
+
+def instance_id():
+    """Stable across restarts of the same instance: DHL_INSTANCE, else the server port."""
+    return os.environ.get("DHL_INSTANCE") or str(st.get_option("server.port"))
+
+
+class PresenceRegistry:
+    def __init__(self, storage=None, instance="0", timeout_sec=ONLINE_TIMEOUT_SEC, tick_sec=TICK_SEC):
+        self.storage = storage
+        self.instance = instance
+        self.timeout_sec = timeout_sec
+        self.tick_sec = tick_sec
+        self._lock = threading.Lock()
+        # session id -> {"username", "login", "last", "tick"} (times are epoch seconds)
+        self._sessions = {}
+        self._wheel = [set() for _ in range(int(timeout_sec // tick_sec) + 2)]
+        self._expired_through = self._tick(time.time())
+        self._last_snapshot = 0.0
+        self._dirty = False
+        self._peers = []
+        self._peers_read = 0.0
+        self._load()
+
+    def _tick(self, t):
+        return int(t // self.tick_sec)
+
+    def _schedule(self, sid, entry):
+        old = entry.get("tick")
+        if old is not None:
+            self._wheel[old % len(self._wheel)].discard(sid)
+        entry["tick"] = self._tick(entry["last"] + self.timeout_sec) + 1
+        self._wheel[entry["tick"] % len(self._wheel)].add(sid)
+
+    def _expire(self, now):
+        current = self._tick(now)
+        # after a long idle period every slot has elapsed at most once
+        start = max(self._expired_through + 1, current - len(self._wheel) + 1)
+        for tick in range(start, current + 1):
+            slot = self._wheel[tick % len(self._wheel)]
+            for sid in [s for s in slot if self._sessions[s]["tick"] <= tick]:
+                slot.discard(sid)
+                del self._sessions[sid]
+                self._dirty = True
+        self._expired_through = current
+
+    def touch(self, sid, username, now=None):
+        now = now or time.time()
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None or entry["username"] != username:
+                if entry is not None:
+                    self._wheel[entry["tick"] % len(self._wheel)].discard(sid)
+                entry = self._sessions[sid] = {"username": username, "login": now, "last": now, "tick": None}
+            entry["last"] = now
+            self._schedule(sid, entry)
+            self._dirty = True
+            self._expire(now)
+        self._maybe_snapshot(now)
+
+    def leave(self, sid):
+        with self._lock:
+            entry = self._sessions.pop(sid, None)
+            if entry is not None:
+                self._wheel[entry["tick"] % len(self._wheel)].discard(sid)
+                self._dirty = True
+        self._maybe_snapshot(time.time(), force=True)
+
+    def _peer_sessions(self, now):
+        """Other instances' sessions from their last snapshots (re-read at most every SNAPSHOT_INTERVAL_SEC)."""
+        if self.storage is None:
+            return []
+        if now - self._peers_read >= SNAPSHOT_INTERVAL_SEC:
+            peers = []
+            try:
+                for instance, snap in self.storage.items(PRESENCE_NS).items():
+                    if instance != self.instance:
+                        peers.extend(snap.get("sessions", {}).values())
+            except Exception:
+                pass
+            self._peers = peers
+            self._peers_read = now
+        return [e for e in self._peers if now - e["last"] < self.timeout_sec]
+
+    def online_users(self, now=None, include_peers=True):
+        """One row per user (earliest login, latest activity over their sessions), most recent first."""
+        now = now or time.time()
+        peers = self._peer_sessions(now) if include_peers else []
+        with self._lock:
+            self._expire(now)
+            users = {}
+            for entry in list(self._sessions.values()) + peers:
+                u = users.setdefault(entry["username"], {"login": entry["login"], "last": entry["last"], "sessions": 0})
+                u["login"] = min(u["login"], entry["login"])
+                u["last"] = max(u["last"], entry["last"])
+                u["sessions"] += 1
+        return [
+            {
+                "username": name,
+                "login_time": datetime.fromtimestamp(u["login"]).isoformat(),
+                "last_activity": datetime.fromtimestamp(u["last"]).isoformat(),
+                "session_duration": str(datetime.fromtimestamp(now) - datetime.fromtimestamp(u["login"])).split(".")[0],
+                "sessions": u["sessions"],
+            }
+            for name, u in sorted(users.items(), key=lambda kv: kv[1]["last"], reverse=True)
+        ]
+
+    def _maybe_snapshot(self, now, force=False):
+        if self.storage is None or not self._dirty:
+            return
+        if not force and now - self._last_snapshot < SNAPSHOT_INTERVAL_SEC:
+            return
+        with self._lock:
+            data = {sid: {"username": e["username"], "login": e["login"], "last": e["last"]} for sid, e in self._sessions.items()}
+            self._dirty = False
+            self._last_snapshot = now
+        try:
+            self.storage.put(PRESENCE_NS, self.instance, {"saved": now, "sessions": data})
+        except Exception:
+            pass
+
+    def _load(self):
+        if self.storage is None:
+            return
+        try:
+            data = self.storage.get(PRESENCE_NS, self.instance, {}).get("sessions", {})
+        except Exception:
+            return
+        now = time.time()
+        for sid, e in data.items():
+            if now - e.get("last", 0) < self.timeout_sec:
+                entry = self._sessions[sid] = {"username": e["username"], "login": e["login"], "last": e["last"], "tick": None}
+                self._schedule(sid, entry)
+
+
+@st.cache_resource
+def get_presence_registry():
+    return PresenceRegistry(get_storage(), instance_id())
+
+
+def touch_presence(username):
+    """Mark this browser session as active; call on every rerun."""
+    sid = st.session_state.setdefault("presence_id", uuid.uuid4().hex)
+    get_presence_registry().touch(sid, username)
+
+
+def leave_presence():
+    sid = st.session_state.get("presence_id")
+    if sid:
+        get_presence_registry().leave(sid)
@@ -0,0 +1,208 @@
+"""Shared application state (users, sessions, uploads, activity, presence).
+
+All app-level state goes through the Storage interface so that several
+Streamlit instances can run side by side behind a reverse proxy. The backend
+is SQLiteStorage: one database in DHL_STATE_DIR (default .streamlit) in WAL
+mode, shared by every process on the host. Read-modify-write goes through
+update()/insert(), which hold SQLite's write lock for the whole cycle, so
+concurrent instances never lose each other's changes the way the old
+load-JSON/modify/dump-JSON cycle did.
+
+The directory must be on a local disk (SQLite locking is unreliable on
+network filesystems). On first open, the legacy JSON files in the state
+directory (users.json, sessions.json, uploads.json, activity.json) are
+imported once.
+"""
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STATE_DIR = Path(os.environ.get("DHL_STATE_DIR", ".streamlit"))
+STATE_DB = "state.sqlite"
+BUSY_TIMEOUT_SEC = 15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS log_name ON log (name, id);
+"""
+
+# legacy file -> kv namespace (dict files) or log name (list files)
+LEGACY_KV_FILES = {"users.json": "users", "sessions.json": "sessions", "uploads.json": "uploads"}
+LEGACY_LOG_FILES = {"activity.json": "activity"}
+
+
+class Storage(ABC):
+    """Namespaced JSON records plus capped append-only logs.
+
+    A backend must implement every method; an incomplete one fails at construction.
+    """
+
+    @abstractmethod
+    def get(self, ns, key, default=None):
+        """-> the stored value, or default if key is absent."""
+
+    @abstractmethod
+    def items(self, ns):
+        """-> {key: value} for the whole namespace."""
+
+    @abstractmethod
+    def put(self, ns, key, value):
+        """Store value under key, replacing any previous one."""
+
+    @abstractmethod
+    def insert(self, ns, key, value):
+        """Store value only if key is absent. -> True if stored."""
+
+    @abstractmethod
+    def update(self, ns, key, fn, default=None):
+        """Atomically replace the value with fn(current or default). -> new value."""
+
+    @abstractmethod
+    def delete(self, ns, key):
+        """-> True if key existed."""
+
+    @abstractmethod
+    def append(self, name, record, keep=None):
+        """Append to log `name`, keeping only the newest `keep` records."""
+
+    @abstractmethod
+    def tail(self, name, n=None):
+        """Newest n records of a log (all if n is None), oldest first."""
+
+    @abstractmethod
+    def clear_log(self, name):
+        """Drop every record of log `name`."""
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Streamlit runs each session's script in its own thread
+        self._local = threading.local()
+        self._con().executescript(SCHEMA)
+        self._import_legacy()
+
+    def _con(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SEC, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _write(self):
+        return _Transaction(self._con())
+
+    def get(self, ns, key, default=None):
+        row = self._con().execute("SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def items(self, ns):
+        rows = self._con().execute("SELECT key, value FROM kv WHERE ns = ? ORDER BY key", (ns,)).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def put(self, ns, key, value):
+        with self._write() as con:
+            con.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)", (ns, key, json.dumps(value), time.time()))
+
+    def insert(self, ns, key, value):
+        with self._write() as con:
+            cur = con.execute("INSERT OR IGNORE INTO kv VALUES (?, ?, ?, ?)", (ns, key, json.dumps(value), time.time()))
+            return cur.rowcount == 1
+
+    def update(self, ns, key, fn, default=None):
+        with self._write() as con:
+            row = con.execute("SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+            value = fn(json.loads(row[0]) if row else default)
+            con.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)", (ns, key, json.dumps(value), time.time()))
+            return value
+
+    def delete(self, ns, key):
+        with self._write() as con:
+            return con.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key)).rowcount == 1
+
+    def append(self, name, record, keep=None):
+        with self._write() as con:
+            cur = con.execute("INSERT INTO log (name, value) VALUES (?, ?)", (name, json.dumps(record)))
+            if keep:
+                con.execute("DELETE FROM log WHERE name = ? AND id <= ?", (name, cur.lastrowid - keep))
+
+    def tail(self, name, n=None):
+        rows = self._con().execute(
+            "SELECT value FROM log WHERE name = ? ORDER BY id DESC LIMIT ?", (name, -1 if n is None else n)
+        ).fetchall()
+        return [json.loads(v) for (v,) in reversed(rows)]
+
+    def clear_log(self, name):
+        with self._write() as con:
+            con.execute("DELETE FROM log WHERE name = ?", (name,))
+
+    def _import_legacy(self):
+        with self._write() as con:
+            if con.execute("SELECT 1 FROM kv WHERE ns = 'meta' AND key = 'legacy_imported'").fetchone():
+                return
+            now = time.time()
+            for file_name, ns in LEGACY_KV_FILES.items():
+                data = _read_json(self.path.parent / file_name, {})
+                if isinstance(data, dict):
+                    con.executemany("INSERT OR IGNORE INTO kv VALUES (?, ?, ?, ?)",
+                                    [(ns, k, json.dumps(v), now) for k, v in data.items()])
+            for file_name, name in LEGACY_LOG_FILES.items():
+                data = _read_json(self.path.parent / file_name, [])
+                if isinstance(data, list):
+                    con.executemany("INSERT INTO log (name, value) VALUES (?, ?)", [(name, json.dumps(r)) for r in data])
+            con.execute("INSERT INTO kv VALUES ('meta', 'legacy_imported', ?, ?)", (json.dumps(now), now))
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT: takes the write lock up front, so a
+    read-modify-write cannot interleave with another process's."""
+
+    def __init__(self, con):
+        self.con = con
+
+    def __enter__(self):
+        self.con.execute("BEGIN IMMEDIATE")
+        return self.con
+
+    def __exit__(self, exc_type, exc, tb):
+        self.con.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+def _read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Process-wide storage backend (one per process, shared state on disk)."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = SQLiteStorage(STATE_DIR / STATE_DB)
+        return _storage
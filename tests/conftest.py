@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# workflows/ and the app modules are imported from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,79 @@
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import threading
+
+import pytest
+
+import download_service
+from download_service import DownloadHandler, sign_token, verify_token
+
+NOW = 1_800_000_000
+
+
+@pytest.fixture
+def output(tmp_path):
+    path = tmp_path / 'final_AI_output.xlsx'
+    path.write_bytes(b'PK' + bytes(range(256)) * 10)
+    return path
+
+
+def test_a_signed_token_grants_its_file_until_it_expires(output):
+    token = sign_token(output, 'report.xlsx', ttl_sec=60, now=NOW)
+    assert verify_token(token, now=NOW) == (output.resolve(), 'report.xlsx')
+    assert verify_token(token, now=NOW + 60) == (output.resolve(), 'report.xlsx')
+    assert verify_token(token, now=NOW + 61) is None
+
+
+def test_the_download_name_defaults_to_the_file_name(output):
+    assert verify_token(sign_token(output, now=NOW), now=NOW) == (output.resolve(), output.name)
+
+
+@pytest.mark.parametrize('token', ['', 'no-dot', 'a.b', '!!!.###'])
+def test_malformed_tokens_are_rejected(token):
+    assert verify_token(token, now=NOW) is None
+
+
+def test_a_tampered_token_is_rejected(output, tmp_path):
+    token = sign_token(output, now=NOW)
+    other = sign_token(tmp_path / 'other.xlsx', now=NOW)
+    # another file's payload under this token's signature
+    assert verify_token(other.split('.')[0] + '.' + token.split('.')[1], now=NOW) is None
+    assert verify_token(token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB'), now=NOW) is None
+
+
+def test_a_token_signed_with_another_key_is_rejected(output, monkeypatch):
+    token = sign_token(output, now=NOW)
+    monkeypatch.setattr(download_service, '_SECRET', b'another instance')
+    assert verify_token(token, now=NOW) is None
+
+
+def test_paths_outside_the_allowed_roots_are_refused(output, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_service, 'ALLOWED_ROOTS', [(tmp_path / 'work').resolve()])
+    (tmp_path / 'work').mkdir()
+    inside = tmp_path / 'work' / 'out.xlsx'
+    inside.write_bytes(b'x')
+    link = tmp_path / 'work' / 'link.xlsx'
+    link.symlink_to(output)
+
+    assert verify_token(sign_token(inside, now=NOW), now=NOW) == (inside.resolve(), 'out.xlsx')
+    assert verify_token(sign_token(output, now=NOW), now=NOW) is None
+    assert verify_token(sign_token(tmp_path / 'work' / '..' / output.name, now=NOW), now=NOW) is None
+    assert verify_token(sign_token(link, now=NOW), now=NOW) is None
+
+
+def test_the_server_streams_the_file_for_a_valid_link_only(output):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DownloadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}/download?t='
+    try:
+        with urlopen(base + sign_token(output, 'Résumé.xlsx'), timeout=10) as r:
+            assert r.read() == output.read_bytes()
+            assert r.headers['Content-Type'] == download_service.XLSX_MIME
+            assert "filename*=UTF-8''R%C3%A9sum%C3%A9.xlsx" in r.headers['Content-Disposition']
+        with pytest.raises(HTTPError) as err:
+            urlopen(base + sign_token(output, ttl_sec=-1), timeout=10)
+        assert err.value.code == 403
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from benchmarks.stub_server import StubLocationFinder
+from workflows.postal_enricher import EnricherOptions, run_postal_enricher
+
+
+@pytest.fixture
+def enrich(tmp_path):
+    inp = tmp_path / 'input.xlsx'
+    pd.DataFrame({
+        'Name': ['Ann', 'Bob', 'Cy'],
+        'Country': ['', '', ''],
+        'Country Code': ['EG', 'EG', ''],
+        'City': ['Cairo', 'giza', 'Paris'],
+        'Postal Code': ['99999', '', 'KEEP'],
+    }).to_excel(inp, index=False, sheet_name='Contacts')
+
+    def run(**options):
+        out = tmp_path / 'out.xlsx'
+        with StubLocationFinder() as stub:
+            opts = EnricherOptions(api_base=stub.url, request_delay_sec=0.0, checkpoint=False, **options)
+            run_postal_enricher(inp, out, 'test', opts)
+        return pd.read_excel(out, sheet_name='Contacts', dtype=str, keep_default_na=False)
+
+    return run
+
+
+def test_results_overwrite_by_default_and_leave_unresolved_rows_alone(enrich):
+    out = enrich()
+    assert out['Original City'].tolist() == ['Cairo', 'giza', 'Paris']
+    assert out.loc[0, 'Postal Code'] not in ('', '99999')
+    assert out.loc[1, 'Postal Code'] != ''
+    assert out.loc[:1, 'City'].tolist() == ['CAIRO', 'GIZA']
+    # no country: nothing to look up
+    assert out.loc[2, ['City', 'Postal Code']].tolist() == ['Paris', 'KEEP']
+
+
+def test_only_empty_fills_blank_cells_only(enrich):
+    full = enrich()
+    out = enrich(only_empty=True)
+    assert out.loc[0, ['City', 'Postal Code']].tolist() == ['Cairo', '99999']
+    assert out.loc[1, ['City', 'Postal Code']].tolist() == ['giza', full.loc[1, 'Postal Code']]
+    assert out.loc[2, ['City', 'Postal Code']].tolist() == ['Paris', 'KEEP']
+    assert out['Original City'].tolist() == ['Cairo', 'giza', 'Paris']
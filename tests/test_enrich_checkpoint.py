@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from benchmarks import generators
+from benchmarks.stub_server import StubLocationFinder
+from workflows import postal_enricher
+from workflows.postal_enricher import EnrichCheckpoint, EnricherOptions, checkpoint_path, run_postal_enricher
+
+
+def test_load_replays_the_journal_and_skips_a_torn_line(tmp_path):
+    path = tmp_path / 'run.ckpt.jsonl'
+    ckpt = EnrichCheckpoint(path, flush_every=2)
+    ckpt.lookup(('EG', 'CAIRO'), {'postal': '11511', 'city': 'CAIRO'})
+    ckpt.negative(('EG', 'NOWHERE', 'fuzzy'), 1700000000.0)
+    ckpt.row('Sheet1', 0, [('Original City', 'Cairo'), ('City', 'CAIRO')], {'sheet': 'Sheet1', 'row': 1})
+    ckpt.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"t": "row", "s": "Sheet1", "i"')
+
+    lookups, negatives, rows = EnrichCheckpoint(path).load()
+    assert lookups == {('EG', 'CAIRO'): {'postal': '11511', 'city': 'CAIRO'}}
+    assert negatives == {('EG', 'NOWHERE', 'fuzzy'): 1700000000.0}
+    assert rows == {('Sheet1', 0): ([('Original City', 'Cairo'), ('City', 'CAIRO')], {'sheet': 'Sheet1', 'row': 1})}
+
+    EnrichCheckpoint(path).remove()
+    assert not path.exists()
+
+
+def test_an_interrupted_run_resumes_from_its_checkpoint(tmp_path, monkeypatch):
+    inp = generators.make_enrichment_input(tmp_path / 'input.xlsx', tabs=1, rows=40, seed=3, unique_cities=12)
+
+    def options(name):
+        (tmp_path / name).mkdir()
+        return EnricherOptions(api_base=stub.url, request_delay_sec=0.0, checkpoint_every=1,
+                               cache_file=str(tmp_path / name / 'cache.csv'),
+                               city_index_file=str(tmp_path / name / 'city_index.csv'),
+                               neg_cache_file=str(tmp_path / name / 'neg_cache.csv'))
+
+    with StubLocationFinder() as stub:
+        reference = run_postal_enricher(inp, tmp_path / 'reference.xlsx', 'test', options('reference'))
+
+        request = postal_enricher.dhl_request_find_by_address
+        calls = []
+
+        def failing_request(*args, **kwargs):
+            calls.append(1)
+            if len(calls) > reference['api_calls'] // 2:
+                raise RuntimeError('connection lost')
+            return request(*args, **kwargs)
+
+        opts = options('resumed')
+        monkeypatch.setattr(postal_enricher, 'dhl_request_find_by_address', failing_request)
+        with pytest.raises(RuntimeError, match='connection lost'):
+            run_postal_enricher(inp, tmp_path / 'resumed.xlsx', 'test', opts)
+        monkeypatch.undo()
+
+        ckpt = checkpoint_path(inp, inp.parent, opts)
+        lookups, _, done_rows = EnrichCheckpoint(ckpt).load()
+        assert lookups and 0 < len(done_rows) < reference['rows']
+
+        resumed = run_postal_enricher(inp, tmp_path / 'resumed.xlsx', 'test', opts)
+
+    assert resumed['resumed_rows'] == len(done_rows)
+    assert resumed['api_requests'] < reference['api_requests']
+    assert not ckpt.exists()
+    expected = pd.read_excel(tmp_path / 'reference.xlsx', sheet_name=None, dtype=str)
+    actual = pd.read_excel(tmp_path / 'resumed.xlsx', sheet_name=None, dtype=str)
+    data_sheets = [s for s in expected if not s.startswith('_')]
+    assert data_sheets
+    for sheet in data_sheets:
+        pd.testing.assert_frame_equal(actual[sheet], expected[sheet])
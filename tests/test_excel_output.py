@@ -0,0 +1,53 @@
+from datetime import date, datetime
+
+from openpyxl import load_workbook
+import numpy as np
+import pandas as pd
+import pytest
+
+from workflows.common import EXCEL_WRITERS, ExcelOutput
+
+pytest.importorskip('xlsxwriter')
+
+
+def frames():
+    data = pd.DataFrame({
+        'Text': ['Cairo', '', None, 'https://example.com'],
+        'Email': ['a@example.com', 'b@example.com', None, 'c@example.com'],
+        'Int': np.array([1, 2, 3, 4], dtype='int64'),
+        'Float': [0.5, np.nan, float('inf'), -2.25],
+        'Flag': [True, False, True, False],
+        'When': pd.to_datetime(['2026-01-02 03:04:05', None, '2026-02-03 00:00:00', '2026-03-04 12:00:00']),
+        'Day': [date(2026, 1, 2), None, date(2026, 2, 3), date(2026, 3, 4)],
+        'Stamp': [datetime(2026, 5, 6, 7, 8, 9), None, None, None],
+    })
+    summary = pd.DataFrame({'Metric': ['rows', 'files'], 'Value': [4, 1]})
+    return data, summary
+
+
+def write(path, backend):
+    data, summary = frames()
+    with ExcelOutput(path, backend) as out:
+        out.write(data, 'Data')
+        out.write(summary, '_SUMMARY')
+        out.write(summary, '_SUMMARY', startrow=len(summary) + 2)
+    return load_workbook(path)
+
+
+def cells(ws):
+    """Values, plus the number format of date cells."""
+    return [[(c.value, c.number_format if c.is_date else None) for c in row] for row in ws.iter_rows()]
+
+
+def test_both_backends_write_the_same_cells(tmp_path):
+    expected, actual = (write(tmp_path / f'{b}.xlsx', b) for b in EXCEL_WRITERS)
+    assert actual.sheetnames == expected.sheetnames == ['Data', '_SUMMARY']
+    for name in expected.sheetnames:
+        assert cells(actual[name]) == cells(expected[name])
+    assert actual['Data']['A5'].hyperlink is None
+    assert actual['Data']['D4'].value == 'inf'
+
+
+def test_unknown_backends_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Unknown Excel writer'):
+        ExcelOutput(tmp_path / 'out.xlsx', 'xlwt')
@@ -0,0 +1,35 @@
+import zipfile
+
+import pandas as pd
+
+from benchmarks import generators
+from workflows.final_ai_standard import BATCH_ZIP, QC_SUMMARY_XLSX, run_final_ai_batch
+
+
+def test_batch_summary_and_zip_cover_every_input_including_a_failing_one(tmp_path):
+    refs = generators.make_all(tmp_path / 'refs', tabs=1, rows=5)
+    good = [generators.make_af_input(tmp_path / f'af_{i}.xlsx', tabs=2, rows=8, seed=i) for i in (1, 2)]
+    broken = tmp_path / 'af_broken.xlsx'
+    broken.write_bytes(b'not a workbook')
+    out_dir = tmp_path / 'out'
+
+    stats = run_final_ai_batch([good[0], broken, good[1]], refs['country_code'], refs['template'], out_dir, workers=1)
+
+    assert (stats['files'], stats['failed'], stats['rows']) == (3, 1, 32)
+    summary = pd.read_excel(out_dir / QC_SUMMARY_XLSX, sheet_name=None, keep_default_na=False)
+    assert list(summary) == ['Files', 'Issues', 'Flagged']
+    files = summary['Files'].set_index('File')
+    assert list(files.index) == ['af_1.xlsx', 'af_broken.xlsx', 'af_2.xlsx']
+    assert files.loc['af_broken.xlsx', 'Error'] != ''
+    assert (files.loc[['af_1.xlsx', 'af_2.xlsx'], 'Error'] == '').all()
+    assert files['Rows'].tolist() == [16, 0, 16]
+
+    # every highlighted contact is listed under its file, and counted per issue type
+    flagged = summary['Flagged']
+    assert len(flagged) > 0
+    assert flagged['File'].value_counts().to_dict() == {f: n for f, n in files['Highlighted'].items() if n}
+    assert summary['Issues']['Rows'].sum() >= len(flagged)
+
+    with zipfile.ZipFile(out_dir / BATCH_ZIP) as z:
+        assert sorted(z.namelist()) == [QC_SUMMARY_XLSX, 'af_1_final_AI_output.xlsx', 'af_2_final_AI_output.xlsx']
+        assert z.testzip() is None
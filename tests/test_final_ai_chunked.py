@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from benchmarks import generators
+from workflows.final_ai_standard import iter_contact_chunks, run_final_ai_standard
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    return generators.make_all(tmp_path / 'inputs', tabs=3, rows=11)
+
+
+def test_chunks_cover_every_contact_once(inputs):
+    chunks = list(iter_contact_chunks(inputs['af_input'], chunk_rows=4))
+    assert all(len(c) <= 4 for _, c in chunks)
+    assert [sheet for sheet, _ in chunks] == [s for s in generators.tab_names(3) for _ in range(3)]
+    assert sum(len(c) for _, c in chunks) == 33
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 4, 11, 1000])
+def test_chunked_output_matches_the_in_memory_build(inputs, tmp_path, chunk_rows):
+    def build(name, rows):
+        out = tmp_path / name
+        stats = run_final_ai_standard(inputs['af_input'], inputs['country_code'], inputs['template'], out, chunk_rows=rows)
+        return stats, pd.read_excel(out, sheet_name=None, dtype=str)
+
+    expected_stats, expected = build('in_memory.xlsx', 0)
+    stats, actual = build('chunked.xlsx', chunk_rows)
+    assert stats['rows'] == expected_stats['rows'] == 33
+    assert list(actual) == list(expected)
+    for sheet in expected:
+        pd.testing.assert_frame_equal(actual[sheet], expected[sheet])
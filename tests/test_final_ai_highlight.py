@@ -0,0 +1,50 @@
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+import pytest
+
+from benchmarks import generators
+from workflows.final_ai_standard import run_final_ai_standard
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    return generators.make_all(tmp_path / 'inputs', tabs=2, rows=12)
+
+
+def output_sheets(wb):
+    """One sheet per source sheet; _QC is laid out differently."""
+    return [ws for ws in wb.worksheets if not ws.title.startswith('_')]
+
+
+def is_filled(cell):
+    return cell.fill is not None and cell.fill.fill_type == 'solid'
+
+
+@pytest.mark.parametrize('chunk_rows', [0, 5])
+def test_conditional_mode_flags_the_same_rows_with_one_rule_per_sheet(inputs, tmp_path, chunk_rows):
+    def build(highlight):
+        out = tmp_path / f'{highlight}.xlsx'
+        stats = run_final_ai_standard(inputs['af_input'], inputs['country_code'], inputs['template'], out,
+                                      chunk_rows=chunk_rows, highlight=highlight)
+        return stats, load_workbook(out)
+
+    fill_stats, fill_wb = build('fill')
+    cf_stats, cf_wb = build('conditional')
+    assert cf_stats['highlighted'] == fill_stats['highlighted'] > 0
+
+    n_cols = len(generators.TEMPLATE_HEADERS)
+    flag = get_column_letter(n_cols + 1)
+    fill_sheets, cf_sheets = output_sheets(fill_wb), output_sheets(cf_wb)
+    assert [ws.title for ws in cf_sheets] == [ws.title for ws in fill_sheets] != []
+    for fill_ws, cf_ws in zip(fill_sheets, cf_sheets):
+        last = fill_ws.max_row
+        filled = [r for r in range(3, last + 1) if is_filled(fill_ws.cell(row=r, column=1))]
+        flagged = [r for r in range(3, last + 1) if cf_ws[f'{flag}{r}'].value == 1]
+        assert filled == flagged
+        assert not any(is_filled(c) for row in cf_ws.iter_rows(min_row=3, max_col=n_cols) for c in row)
+        assert cf_ws.column_dimensions[flag].hidden
+
+        rules = [(str(rng.sqref), rule.formula) for rng in cf_ws.conditional_formatting for rule in rng.rules]
+        assert rules == [(f'A3:{get_column_letter(n_cols)}{last}', [f'${flag}3=1'])]
+
+        assert [row[:n_cols] for row in cf_ws.iter_rows(values_only=True)] == list(fill_ws.iter_rows(values_only=True))
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from workflows.final_ai_smart import content_scores, infer_column_roles
+
+
+def sparse_frame():
+    # headers no hint matches, so the roles can only come from the cells
+    return pd.DataFrame({
+        'Col A': ['Ann Lee', 'Bob Ray', 'Cy Day', 'Di Fox'],
+        'Col B': ['+20 100 123 4567', None, float('nan'), None],
+        'Col C': [None, 'ann@example.com', None, None],
+    }, dtype=object)
+
+
+def test_missing_cells_do_not_dilute_content_scores():
+    scores = content_scores(sparse_frame(), set())
+    assert scores.at[1, 'Phone'] == 1.0
+    assert scores.at[2, 'Email'] == 1.0
+
+
+def test_sparse_columns_with_unknown_headers_are_mapped_by_content():
+    assert infer_column_roles(sparse_frame(), set()) == {1: 'Phone', 2: 'Email'}
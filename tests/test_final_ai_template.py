@@ -0,0 +1,44 @@
+from openpyxl import load_workbook
+import pytest
+
+from benchmarks import generators
+from workflows.common import normalize_text
+from workflows.final_ai_standard import COMPUTED_COLS, compile_template, run_final_ai_standard
+
+FORMULA = '=ROUND(0.25*2,2)'
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    paths = generators.make_all(tmp_path / 'inputs', tabs=1, rows=5)
+    wb = load_workbook(paths['template'])
+    ws = wb.active
+    weight_col = [c.value for c in ws[1]].index('Weight') + 1
+    ws.cell(row=2, column=weight_col, value=FORMULA)
+    wb.save(paths['template'])
+    return paths
+
+
+def baseline_constants(template_xlsx):
+    """Row 2 constants as the full-mode openpyxl read of the template gives them."""
+    ws = load_workbook(template_xlsx).active
+    headers = [normalize_text(c.value) for c in ws[1]]
+    return {h: c.value for h, c in zip(headers, ws[2])
+            if c.value is not None and str(c.value).strip() != '' and h not in COMPUTED_COLS}
+
+
+def test_formula_constants_are_compiled_as_formulas(inputs):
+    tpl = compile_template(inputs['template'])
+    assert tpl.constants['Weight'] == FORMULA
+    assert tpl.constants == baseline_constants(inputs['template'])
+
+
+@pytest.mark.parametrize('chunk_rows', [0, 2])
+def test_formula_constants_are_copied_to_every_row(inputs, tmp_path, chunk_rows):
+    out = tmp_path / 'final_AI_output.xlsx'
+    stats = run_final_ai_standard(inputs['af_input'], inputs['country_code'], inputs['template'], out, chunk_rows=chunk_rows)
+    ws = load_workbook(out).active
+    weight_col = [c.value for c in ws[1]].index('Weight') + 1
+    values = [ws.cell(row=r, column=weight_col).value for r in range(3, 3 + stats['rows'])]
+    assert stats['rows'] > 0
+    assert values == [FORMULA] * stats['rows']
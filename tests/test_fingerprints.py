@@ -0,0 +1,78 @@
+import pandas as pd
+
+from benchmarks import generators
+from workflows.final_ai_standard import run_final_ai_standard
+from workflows.fingerprints import context_digest, open_fingerprints, row_fingerprint
+
+CONTEXT = context_digest('test', 'refs-v1')
+
+
+def test_no_path_disables_diff_mode():
+    assert open_fingerprints('', CONTEXT) is None
+
+
+def test_committed_results_are_reused_by_the_next_run(tmp_path):
+    path = tmp_path / 'run.fp.sqlite'
+    a, b, c = (row_fingerprint(['Ann', 'Cairo', i]) for i in range(3))
+
+    first = open_fingerprints(path, CONTEXT)
+    assert not first.has_previous
+    first.put(a, {'city': 'Cairo'})
+    first.put(b, ['x', 1])
+    assert first.commit() == {'reused_rows': 0, 'computed_rows': 2}
+
+    second = open_fingerprints(path, CONTEXT)
+    assert second.has_previous
+    assert second.get(a) == {'city': 'Cairo'}
+    assert second.get(c) is None
+    second.put(c, 'new')
+    assert second.commit() == {'reused_rows': 1, 'computed_rows': 1}
+
+    # b was not seen by the second run, so it dropped out of the sidecar
+    third = open_fingerprints(path, CONTEXT)
+    assert (third.get(a), third.get(b), third.get(c)) == ({'city': 'Cairo'}, None, 'new')
+    third.discard()
+
+
+def test_discard_keeps_the_previous_sidecar(tmp_path):
+    path = tmp_path / 'run.fp.sqlite'
+    fp = row_fingerprint(['Ann'])
+    first = open_fingerprints(path, CONTEXT)
+    first.put(fp, 1)
+    first.commit()
+
+    failed = open_fingerprints(path, CONTEXT)
+    failed.put(row_fingerprint(['Bob']), 2)
+    failed.discard()
+    assert [p.name for p in tmp_path.iterdir()] == ['run.fp.sqlite']
+    assert open_fingerprints(path, CONTEXT).get(fp) == 1
+
+
+def test_a_different_context_ignores_the_previous_sidecar(tmp_path):
+    path = tmp_path / 'run.fp.sqlite'
+    fp = row_fingerprint(['Ann'])
+    first = open_fingerprints(path, CONTEXT)
+    first.put(fp, 1)
+    first.commit()
+
+    other = open_fingerprints(path, context_digest('test', 'refs-v2'))
+    assert not other.has_previous
+    assert other.get(fp) is None
+    other.discard()
+
+
+def test_diff_run_reuses_every_unchanged_contact(tmp_path):
+    inputs = generators.make_all(tmp_path / 'inputs', tabs=2, rows=10)
+    sidecar = tmp_path / 'final_ai.fp.sqlite'
+    runs = [run_final_ai_standard(inputs['af_input'], inputs['country_code'], inputs['template'],
+                                  tmp_path / f'out_{n}.xlsx', fingerprint_file=sidecar) for n in range(2)]
+    assert runs[0]['reused_rows'] == 0
+    assert runs[1]['reused_rows'] == runs[1]['rows'] == runs[0]['computed_rows']
+    assert runs[1]['computed_rows'] == 0
+    first, second = (pd.read_excel(tmp_path / f'out_{n}.xlsx', sheet_name=None, dtype=str) for n in range(2))
+    assert first.keys() == second.keys()
+    for name in first:
+        # _QC's Reused column is the one expected difference
+        pd.testing.assert_frame_equal(first[name].drop(columns='Reused', errors='ignore'),
+                                      second[name].drop(columns='Reused', errors='ignore'))
+    assert (second['_QC']['Reused'] == 'Y').all()
@@ -0,0 +1,32 @@
+import zipfile
+
+import pytest
+
+from workflows.gazetteer import build_gazetteer, open_gazetteer
+
+
+def test_build_from_zip(tmp_path):
+    src = tmp_path / 'EG.zip'
+    with zipfile.ZipFile(src, 'w') as z:
+        z.writestr('readme.txt', 'not data')
+        z.writestr('EG.txt', 'EG\t11511\tCairo\nEG\t11311\tCairo\nEG\t21500\tAlexandria\n')
+    info = build_gazetteer(src, tmp_path / 'gaz.sqlite')
+    assert (info['rows_read'], info['places'], info['countries']) == (3, 2, 1)
+    assert open_gazetteer(tmp_path / 'gaz.sqlite').lookup('EG', 'cairo')['postal'] == '11311'
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith('.tmp')] == []
+
+
+@pytest.mark.parametrize('name, content', [
+    ('bad.txt', b'EG\t11511\tCa\xffiro\n'),   # not UTF-8
+    ('bad.zip', None),                       # archive without a data member
+])
+def test_failed_build_leaves_no_temp_file(tmp_path, name, content):
+    src = tmp_path / name
+    if content is None:
+        with zipfile.ZipFile(src, 'w') as z:
+            z.writestr('readme.txt', 'no data here')
+    else:
+        src.write_bytes(content)
+    with pytest.raises((UnicodeDecodeError, ValueError)):
+        build_gazetteer(src, tmp_path / 'gaz.sqlite')
+    assert sorted(p.name for p in tmp_path.iterdir()) == [name]
@@ -0,0 +1,86 @@
+from http.server import ThreadingHTTPServer
+from urllib.request import urlopen
+import threading
+
+import pytest
+
+from benchmarks.metrics_check import parse_exposition, total
+from metrics_service import CONTENT_TYPE, MetricsHandler
+from workflows.metrics import REGISTRY, Registry, track_run
+
+
+def test_counter_gauge_and_histogram_render_in_prometheus_text_format():
+    registry = Registry()
+    runs = registry.counter('runs_total', 'Runs.', ('workflow', 'status'))
+    rows = registry.counter('rows_total', 'Rows.')
+    ratio = registry.gauge('hit_ratio', 'Hit ratio.')
+    latency = registry.histogram('latency_seconds', 'Latency.', (), buckets=(0.1, 1.0))
+    registry.callback('cache_entries', 'Entries.', lambda: 3)
+
+    # unlabelled counters and histograms start at zero; an unset gauge has no sample
+    assert registry.render() == '\n'.join([
+        '# HELP runs_total Runs.', '# TYPE runs_total counter',
+        '# HELP rows_total Rows.', '# TYPE rows_total counter', 'rows_total 0',
+        '# HELP hit_ratio Hit ratio.', '# TYPE hit_ratio gauge',
+        '# HELP latency_seconds Latency.', '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 0', 'latency_seconds_bucket{le="1"} 0', 'latency_seconds_bucket{le="+Inf"} 0',
+        'latency_seconds_sum 0', 'latency_seconds_count 0',
+        '# HELP cache_entries Entries.', '# TYPE cache_entries gauge', 'cache_entries 3',
+    ]) + '\n'
+
+    runs.inc(workflow='enrich', status='ok')
+    runs.inc(2, workflow='say "hi"\n', status='error')
+    rows.inc(1500)
+    ratio.set(0.75)
+    for v in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(v)
+    text = registry.render()
+    assert 'runs_total{workflow="enrich",status="ok"} 1\n' in text
+    assert 'runs_total{workflow="say \\"hi\\"\\n",status="error"} 2\n' in text
+    assert 'rows_total 1500\n' in text
+    assert 'hit_ratio 0.75\n' in text
+    assert ('latency_seconds_bucket{le="0.1"} 2\nlatency_seconds_bucket{le="1"} 3\n'
+            'latency_seconds_bucket{le="+Inf"} 4\nlatency_seconds_sum 3.65\nlatency_seconds_count 4\n') in text
+
+    samples = parse_exposition(text)
+    assert total(samples, 'runs_total') == 3
+    assert latency.stats() == {'count': 4, 'sum': 3.65, 'mean': 0.9125, 'p50': 0.1, 'p95': float('inf')}
+
+    registry.reset()
+    assert total(parse_exposition(registry.render()), 'runs_total') == 0
+
+
+def test_labels_must_match_the_registration():
+    registry = Registry()
+    runs = registry.counter('runs_total', 'Runs.', ('workflow',))
+    assert registry.counter('runs_total', 'Runs.', ('workflow',)) is runs
+    with pytest.raises(ValueError):
+        registry.gauge('runs_total', 'Runs.', ('workflow',))
+    with pytest.raises(ValueError):
+        runs.inc(status='ok')
+    with pytest.raises(ValueError):
+        runs.inc(-1, workflow='enrich')
+
+
+def test_track_run_counts_outcomes_and_the_endpoint_serves_them():
+    REGISTRY.reset()
+    with track_run('test') as run:
+        run.rows(5)
+    with pytest.raises(RuntimeError):
+        with track_run('test'):
+            raise RuntimeError('boom')
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics', timeout=10) as r:
+            assert r.headers['Content-Type'] == CONTENT_TYPE
+            samples = parse_exposition(r.read().decode('utf-8'))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert total(samples, 'dhl_workflow_runs_total', workflow='test', status='ok') == 1
+    assert total(samples, 'dhl_workflow_runs_total', workflow='test', status='error') == 1
+    assert total(samples, 'dhl_workflow_rows_total', workflow='test') == 5
+    assert total(samples, 'dhl_workflow_in_progress', workflow='test') == 0
+    assert total(samples, 'dhl_workflow_stage_seconds_count', workflow='test', stage='total') == 2
@@ -0,0 +1,63 @@
+import time
+
+import pandas as pd
+import pytest
+
+from benchmarks.stub_server import StubLocationFinder
+from workflows.postal_enricher import EnricherOptions, load_negative_cache, run_postal_enricher, save_negative_cache
+
+TTL = 3600.0
+
+
+def test_entries_older_than_the_ttl_are_dropped(tmp_path):
+    path = tmp_path / 'neg.csv'
+    now = time.time()
+    save_negative_cache({('EG', 'OLD', 'fuzzy'): now - 2 * TTL, ('EG', 'NEW', 'fuzzy'): now - 10}, path, TTL)
+    assert set(pd.read_csv(path)['city']) == {'NEW'}
+    assert load_negative_cache(path, TTL) == {('EG', 'NEW', 'fuzzy'): pytest.approx(now - 10)}
+    # a shorter ttl on load expires what the longer one kept
+    assert load_negative_cache(path, 5) == {}
+
+
+@pytest.fixture
+def enrich(tmp_path):
+    inp = tmp_path / 'input.xlsx'
+    pd.DataFrame({
+        'Name': ['Ann', 'Bob'],
+        'Country': ['', ''],
+        'Country Code': ['EG', 'EG'],
+        'City': ['Cairo', 'Nowhere Ville'],
+        'Postal Code': ['', ''],
+    }).to_excel(inp, index=False)
+    with StubLocationFinder() as stub:
+        opts = EnricherOptions(api_base=stub.url, request_delay_sec=0.0, fallback_to_capital=False,
+                               negative_ttl_sec=TTL, checkpoint=False)
+        yield lambda: run_postal_enricher(inp, tmp_path / 'out.xlsx', 'test', opts), tmp_path
+
+
+def test_fallback_misses_live_only_in_the_negative_cache(enrich):
+    run, folder = enrich
+    first = run()
+    assert first['api_requests'] > 0
+    assert first['neg_cache_size'] > 0
+    cache = pd.read_csv(folder / EnricherOptions.cache_file, dtype=str)
+    assert cache['city_seed'].tolist() == ['CAIRO']
+    neg = pd.read_csv(folder / EnricherOptions.neg_cache_file, dtype=str)
+    assert set(neg['city']) == {'NOWHERE VILLE'}
+
+    second = run()
+    assert second['api_requests'] == 0
+    assert (second['cache_hits'], second['neg_cached']) == (1, 1)
+
+
+def test_an_expired_miss_is_looked_up_again(enrich):
+    run, folder = enrich
+    first = run()
+    neg_path = folder / EnricherOptions.neg_cache_file
+    neg = pd.read_csv(neg_path, dtype=str)
+    neg['ts'] = time.time() - 2 * TTL
+    neg.to_csv(neg_path, index=False)
+
+    second = run()
+    assert second['neg_cached'] == 0
+    assert second['api_requests'] == first['api_requests'] - 1
@@ -0,0 +1,70 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from workflows import common
+from workflows.common import ParseCache, read_excel_cached
+
+
+def frame(rows):
+    return pd.DataFrame({'a': ['x' * 100] * rows})
+
+
+def test_entries_are_evicted_oldest_first_by_size():
+    # room for two frames, not three
+    cache = ParseCache(max_mb=2.5 * common._frames_nbytes(frame(100)) / (1024 * 1024), rss_limit_mb=0)
+    for key in 'abc':
+        cache.put(key, frame(100))
+    assert cache.get('a') is None
+    assert cache.get('b') is not None and cache.get('c') is not None
+    # 'b' was used last, so 'c' goes first
+    cache.get('b')
+    cache.put('d', frame(100))
+    assert (cache.get('c'), cache.get('b') is not None) == (None, True)
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_nothing_is_cached_when_too_big_or_under_memory_pressure():
+    disabled = ParseCache(max_mb=0)
+    disabled.put('a', frame(1))
+    assert disabled.get('a') is None
+
+    pressured = ParseCache(max_mb=10, rss_limit_mb=0)
+    pressured.put('a', frame(1))
+    pressured.rss_limit_mb = 1  # any real process is above 1 MB
+    pressured.put('b', frame(1))
+    assert pressured.info()['entries'] == 0
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ParseCache(max_mb=10, rss_limit_mb=0)
+    monkeypatch.setattr(common, 'PARSE_CACHE', cache)
+    return cache
+
+
+def test_same_content_is_parsed_once_whatever_the_path(tmp_path, cache):
+    first = tmp_path / 'upload_1.xlsx'
+    pd.DataFrame({'City': ['Cairo', 'Giza']}).to_excel(first, index=False)
+    second = tmp_path / 'upload_2.xlsx'
+    shutil.copy(first, second)
+
+    df = read_excel_cached(first, dtype=str)
+    df.loc[0, 'City'] = 'changed'
+    again = read_excel_cached(second, dtype=str)
+    assert again['City'].tolist() == ['Cairo', 'Giza']
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # other arguments are another entry
+    read_excel_cached(first, sheet_name=None, dtype=str)
+    assert cache.misses == 2
+
+
+def test_changed_content_is_parsed_again(tmp_path, cache):
+    path = tmp_path / 'input.xlsx'
+    pd.DataFrame({'City': ['Cairo']}).to_excel(path, index=False)
+    assert read_excel_cached(path)['City'].tolist() == ['Cairo']
+    pd.DataFrame({'City': ['Alexandria', 'Giza']}).to_excel(path, index=False)
+    assert read_excel_cached(path)['City'].tolist() == ['Alexandria', 'Giza']
+    assert (cache.hits, cache.misses) == (0, 2)
@@ -0,0 +1,45 @@
+from pathlib import Path
+import json
+
+import pandas as pd
+
+from benchmarks import generators
+from benchmarks.stub_server import StubLocationFinder
+from workflows import __main__ as cli
+from workflows.common import tables_dir
+from workflows.postal_enricher import EnricherOptions, run_postal_enricher_bulk
+
+
+def bulk_inputs(tmp_path):
+    good = [generators.make_enrichment_input(tmp_path / f'region_{i}.xlsx', tabs=1, rows=20, seed=i) for i in (1, 2)]
+    broken = tmp_path / 'broken.xlsx'
+    broken.write_bytes(b'not a workbook')
+    return [good[0], broken, good[1]]
+
+
+def test_a_failing_file_is_recorded_and_the_others_still_run(tmp_path):
+    out_dir = tmp_path / 'out'
+    with StubLocationFinder() as stub:
+        opts = EnricherOptions(api_base=stub.url, request_delay_sec=0.0, output_formats=('xlsx', 'csv'),
+                               cache_file=str(tmp_path / 'cache.json'), city_index_file=str(tmp_path / 'city_index.json'),
+                               neg_cache_file=str(tmp_path / 'neg_cache.json'))
+        stats = run_postal_enricher_bulk(bulk_inputs(tmp_path), out_dir, 'test', opts)
+
+    assert (stats['files'], stats['failed'], stats['rows']) == (3, 1, 40)
+    assert [Path(p).name for p in stats['outputs']] == ['region_1_enriched_output.xlsx', 'region_2_enriched_output.xlsx']
+    assert Path(stats['summary_xlsx']).exists()
+    files = pd.read_csv(tables_dir(stats['summary_xlsx']) / '_SUMMARY_FILES.csv', keep_default_na=False).set_index('file')
+    assert list(files.index) == ['region_1.xlsx', 'broken.xlsx', 'region_2.xlsx']
+    assert files.loc['broken.xlsx', 'error'].startswith('BadZipFile')
+    assert files.loc['broken.xlsx', 'rows'] == 0
+    assert (files.loc[['region_1.xlsx', 'region_2.xlsx'], 'error'] == '').all()
+
+
+def test_cli_exits_non_zero_when_a_bulk_file_fails(tmp_path, capsys):
+    inputs = bulk_inputs(tmp_path)
+    with StubLocationFinder() as stub:
+        code = cli.main(['enrich', '--bulk', '--no-limits', '--api-key', 'test', '--api-base', stub.url,
+                         '--request-delay', '0', '--out-dir', str(tmp_path / 'out'), '--input', *map(str, inputs)])
+    rec = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert code == 1
+    assert (rec['ok'], rec['files'], rec['failed']) == (True, 3, 1)
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from workflows.postcodes import resolve_postcode, resolve_postcodes
+
+
+def test_numeric_zip_gets_its_leading_zero_back():
+    assert resolve_postcode('2134.0', '', 'US') == ('02134', True)
+    assert resolve_postcode('1000', '', 'FR') == ('01000', True)
+
+
+def test_padding_leaves_other_postcodes_alone():
+    assert resolve_postcode('123456', '', 'US') == ('123456', False)
+    assert resolve_postcode('SW1A 1AA', '', 'GB') == ('SW1A 1AA', True)
+    assert resolve_postcode('1234', '', 'XX') == ('1234', True)
+
+
+def test_vectorized_matches_per_row():
+    rows = [('2134.0', '', 'US'), ('1000', '', 'FR'), ('123456', '', 'US'), ('', '5 Main St, Boston 02134', 'US'),
+            ('SW1A 1AA', '', 'GB'), ('1234', '', 'XX'), ('012345', '', 'IL')]
+    postcode, valid = resolve_postcodes(pd.Series([r[0] for r in rows]), pd.Series([r[1] for r in rows]),
+                                        pd.Series([r[2] for r in rows]))
+    assert list(zip(postcode, valid)) == [resolve_postcode(*r) for r in rows]
+    assert postcode[0] == '02134' and valid[0]
+
+
+def test_only_values_shorter_than_the_shortest_format_are_padded():
+    rows = [('49309.0', '', 'SA'), ('4930.0', '', 'SA'), ('12345678', '', 'SA')]
+    postcode, valid = resolve_postcodes(pd.Series([r[0] for r in rows]), pd.Series([r[1] for r in rows]),
+                                        pd.Series([r[2] for r in rows]))
+    assert list(postcode) == ['49309', '04930', '12345678']
+    assert list(valid) == [True, True, False]
+    assert list(zip(postcode, valid)) == [resolve_postcode(*r) for r in rows]
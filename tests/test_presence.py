@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from presence import PresenceRegistry
+from storage import SQLiteStorage
+
+TIMEOUT = 60
+TICK = 10
+
+
+@pytest.fixture
+def now():
+    # the registry's timer wheel starts at the current time
+    return time.time()
+
+
+def names(registry, now, **kwargs):
+    return [u['username'] for u in registry.online_users(now, **kwargs)]
+
+
+def test_sessions_expire_after_the_timeout(now):
+    registry = PresenceRegistry(timeout_sec=TIMEOUT, tick_sec=TICK)
+    registry.touch('s1', 'ann', now)
+    registry.touch('s2', 'bob', now + 30)
+
+    assert names(registry, now + 30) == ['bob', 'ann']
+    assert names(registry, now + TIMEOUT - 1) == ['bob', 'ann']
+    # expiry is rounded up to the next tick, never early
+    assert names(registry, now + TIMEOUT + 2 * TICK) == ['bob']
+    assert names(registry, now + 30 + TIMEOUT + 2 * TICK) == []
+
+
+def test_touching_again_keeps_a_session_online(now):
+    registry = PresenceRegistry(timeout_sec=TIMEOUT, tick_sec=TICK)
+    for t in range(0, 5 * TIMEOUT, TIMEOUT // 2):
+        registry.touch('s1', 'ann', now + t)
+    assert names(registry, now + 5 * TIMEOUT) == ['ann']
+    user, = registry.online_users(now + 5 * TIMEOUT)
+    assert user['sessions'] == 1
+
+
+def test_sessions_of_one_user_are_merged(now):
+    registry = PresenceRegistry(timeout_sec=TIMEOUT, tick_sec=TICK)
+    registry.touch('s1', 'ann', now)
+    registry.touch('s2', 'ann', now + 20)
+    user, = registry.online_users(now + 20)
+    assert user['sessions'] == 2
+    assert user['session_duration'] == '0:00:20'
+    # the first session expires, the second keeps the user online
+    user, = registry.online_users(now + TIMEOUT + 2 * TICK)
+    assert user['sessions'] == 1
+
+
+def test_leave_and_a_long_idle_period(now):
+    registry = PresenceRegistry(timeout_sec=TIMEOUT, tick_sec=TICK)
+    registry.touch('s1', 'ann', now)
+    registry.touch('s2', 'bob', now)
+    registry.leave('s1')
+    assert names(registry, now) == ['bob']
+    # far more ticks than the wheel has slots
+    assert names(registry, now + 100 * TIMEOUT) == []
+    registry.touch('s3', 'cy', now + 100 * TIMEOUT)
+    assert names(registry, now + 100 * TIMEOUT) == ['cy']
+
+
+def test_snapshots_restore_and_show_other_instances(now, tmp_path):
+    storage = SQLiteStorage(tmp_path / 'state.sqlite')
+    first = PresenceRegistry(storage, instance='1', timeout_sec=TIMEOUT, tick_sec=TICK)
+    first.touch('s1', 'ann', now)
+
+    restarted = PresenceRegistry(storage, instance='1', timeout_sec=TIMEOUT, tick_sec=TICK)
+    assert names(restarted, now, include_peers=False) == ['ann']
+
+    other = PresenceRegistry(storage, instance='2', timeout_sec=TIMEOUT, tick_sec=TICK)
+    other.touch('s2', 'bob', now + 1)
+    assert names(other, now + 1, include_peers=False) == ['bob']
+    assert names(other, now + 1) == ['bob', 'ann']
+    assert names(other, now + TIMEOUT + 2 * TICK) == []
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import multiprocessing
+
+import pytest
+
+from storage import SQLiteStorage, Storage
+
+WRITERS = 4
+INCREMENTS = 50
+
+
+def hammer(storages):
+    """Writers increment one shared counter and race to insert one key. -> how many inserts of it succeeded."""
+    def work(n):
+        storage = storages[n % len(storages)]
+        won = 0
+        for i in range(INCREMENTS):
+            storage.update('counters', 'hits', lambda v: v + 1, default=0)
+            assert storage.insert('claims', f'{n}-{i}', n)
+            won += storage.insert('claims', 'first', n)
+            storage.append('activity', {'writer': n, 'i': i})
+        return won
+
+    with ThreadPoolExecutor(WRITERS) as pool:
+        return sum(pool.map(work, range(WRITERS)))
+
+
+@pytest.mark.parametrize('instances', [1, 2], ids=['threads', 'two_connections'])
+def test_concurrent_writers_lose_no_updates(tmp_path, instances):
+    # one instance: a connection per thread; two instances: two stores on one file, as two app processes
+    storages = [SQLiteStorage(tmp_path / 'state.sqlite') for _ in range(instances)]
+    assert hammer(storages) == 1
+
+    reader = SQLiteStorage(tmp_path / 'state.sqlite')
+    assert reader.get('counters', 'hits') == WRITERS * INCREMENTS
+    claims = reader.items('claims')
+    assert len(claims) == WRITERS * INCREMENTS + 1
+    assert claims['first'] in range(WRITERS)
+    assert len(reader.tail('activity')) == WRITERS * INCREMENTS
+
+
+def increment(path):
+    storage = SQLiteStorage(path)
+    for _ in range(INCREMENTS):
+        storage.update('counters', 'hits', lambda v: v + 1, default=0)
+
+
+def test_concurrent_processes_lose_no_updates(tmp_path):
+    path = tmp_path / 'state.sqlite'
+    SQLiteStorage(path)
+    ctx = multiprocessing.get_context('spawn')
+    procs = [ctx.Process(target=increment, args=(path,)) for _ in range(2)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert [p.exitcode for p in procs] == [0, 0]
+    assert SQLiteStorage(path).get('counters', 'hits') == 2 * INCREMENTS
+
+
+def test_legacy_json_files_are_imported_once(tmp_path):
+    users = {'ann': {'role': 'admin'}, 'bob': {'role': 'user'}}
+    sessions = {'ann_1': {'username': 'ann', 'login': '2026-01-02T03:04:05'}}
+    uploads = {'u1': {'file': 'AF Input.xlsx'}}
+    activity = [{'user': 'ann', 'action': 'login'}, {'user': 'bob', 'action': 'run'}]
+    for name, data in (('users', users), ('sessions', sessions), ('uploads', uploads), ('activity', activity)):
+        (tmp_path / f'{name}.json').write_text(json.dumps(data))
+
+    storage = SQLiteStorage(tmp_path / 'state.sqlite')
+    assert storage.items('users') == users
+    assert storage.items('sessions') == sessions
+    assert storage.items('uploads') == uploads
+    assert storage.tail('activity') == activity
+
+    # later changes win over the files, which are not read again
+    storage.delete('users', 'bob')
+    storage.clear_log('activity')
+    (tmp_path / 'users.json').write_text(json.dumps({'cy': {}}))
+    reopened = SQLiteStorage(tmp_path / 'state.sqlite')
+    assert reopened.items('users') == {'ann': {'role': 'admin'}}
+    assert reopened.tail('activity') == []
+
+
+def test_unreadable_legacy_files_are_skipped(tmp_path):
+    (tmp_path / 'users.json').write_text('{not json')
+    (tmp_path / 'activity.json').write_text(json.dumps({'not': 'a list'}))
+    storage = SQLiteStorage(tmp_path / 'state.sqlite')
+    assert storage.items('users') == {}
+    assert storage.tail('activity') == []
+
+
+def test_an_incomplete_backend_cannot_be_created():
+    class Partial(Storage):
+        def get(self, ns, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        Partial()
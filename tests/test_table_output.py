@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+from workflows.common import TableOutput
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def test_chunks_with_different_value_types_share_one_parquet_file(tmp_path):
+    first = pd.DataFrame({'Postcode': [12345, 67890], 'Weight': [0.5, 1.0], 'Date': pd.to_datetime(['2026-01-02'] * 2)})
+    second = pd.DataFrame({'Postcode': ['AB12 3CD', None], 'Weight': ['n/a', 2.0], 'Date': pd.to_datetime(['2026-01-03'] * 2)})
+    with TableOutput(tmp_path, ('parquet', 'csv')) as tables:
+        tables.write(first, 'Sheet')
+        tables.write(second, 'Sheet')
+
+    out = pq.read_table(tmp_path / 'Sheet.parquet').to_pydict()
+    assert out['Postcode'] == ['12345', '67890', 'AB12 3CD', None]
+    assert out['Weight'] == ['0.5', '1.0', 'n/a', '2.0']
+    assert [d.day for d in out['Date']] == [2, 2, 3, 3]
+    assert len(pd.read_csv(tmp_path / 'Sheet.csv')) == 4
@@ -1,71 +1,62 @@
 import streamlit as st
 import hashlib
-import json
-import os
 from datetime import datetime
 
-USERS_FILE = ".streamlit/users.json"
+from storage import get_storage
+
+# Users live in the shared state database (storage.py), namespace "users";
+# a legacy .streamlit/users.json is imported on first start.
+USERS_NS = "users"
 
 def hash_password(password):
     """Hash password using SHA256"""
     return hashlib.sha256(password.encode()).hexdigest()
 
 def load_users():
-    """Load users from JSON file"""
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    """Load all users"""
+    return get_storage().items(USERS_NS)
 
 def save_users(users):
-    """Save users to JSON file"""
-    os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=4)
+    """Replace all users"""
+    storage = get_storage()
+    for username in set(storage.items(USERS_NS)) - set(users):
+        storage.delete(USERS_NS, username)
+    for username, user in users.items():
+        storage.put(USERS_NS, username, user)
 
 def create_user(username, password, role="user"):
     """Create a new user"""
-    users = load_users()
-    
-    if username in users:
-        return False, "User already exists"
-    
-    users[username] = {
+    created = get_storage().insert(USERS_NS, username, {
         "password_hash": hash_password(password),
         "role": role,
         "created_at": datetime.now().isoformat()
-    }
-    
-    save_users(users)
+    })
+    if not created:
+        return False, "User already exists"
     return True, "User created successfully"
 
 def verify_user(username, password):
     """Verify user credentials"""
-    users = load_users()
+    user = get_storage().get(USERS_NS, username)
     
-    if username not in users:
+    if user is None:
         return False
     
     password_hash = hash_password(password)
-    return users[username]["password_hash"] == password_hash
+    return user["password_hash"] == password_hash
 
 def get_user_role(username):
     """Get user role"""
-    users = load_users()
-    return users.get(username, {}).get("role", "user")
+    user = get_storage().get(USERS_NS, username) or {}
+    return user.get("role", "user")
 
 def delete_user(username):
     """Delete a user"""
-    users = load_users()
-    
-    if username not in users:
+    if not get_storage().delete(USERS_NS, username):
         return False, "User not found"
-    
-    del users[username]
-    save_users(users)
     return True, "User deleted successfully"
 
 def list_all_users():
     """List all users (for admin only)"""
     users = load_users()
-    return {username: user.get("role") for username, user in users.items()}
\ No newline at end of file
+    return {username: user.get("role") for username, user in users.items()}
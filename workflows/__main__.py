@@ -0,0 +1,252 @@
+"""Headless CLI for batch runs (no Streamlit).
+
+    python -m workflows standard --af "inputs/*.xlsx" --country-code cc.xlsx --template tpl.xlsx --out-dir out/
+    python -m workflows per-tab --main "tabs/*.xlsx" --items Items.xlsx --out-dir out/ --workers 4
+    python -m workflows standard ... --formats csv,parquet   (machine-readable tables, no workbook)
+    python -m workflows standard --af "inputs/*.xlsx" ... --out-dir out/ --batch   (ZIP + aggregate QC summary)
+    python -m workflows enrich --input "regions/*.xlsx" --out-dir out/   (key from --api-key or DHL_API_KEY)
+    python -m workflows enrich --input "regions/*.xlsx" --out-dir out/ --bulk   (one batch, shared cache)
+    python -m workflows gazetteer --tsv allCountries.zip --db gazetteer.sqlite --countries EG,AE,SA
+
+Each input file is one job; jobs run in a process pool and every finished
+job prints one JSON line with the stats dict returned by the run_* function.
+enrich --bulk instead runs all inputs as one batch in this process (one
+cache and HTTP session, each distinct key looked up once) and prints one line;
+standard/smart --batch parse the country code list and template once, share
+them with the workers and print one line for the whole batch.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from .common import OUTPUT_FORMATS, check_output_formats, unique_stems
+from .preflight import WORKFLOW_LIMITS, check_workbook, inspect_workbook
+
+LIMITS_KEY = {'standard': 'standard', 'smart': 'smart', 'per-tab': 'per_tab', 'enrich': 'enrich'}
+
+
+def expand_inputs(patterns):
+    files = []
+    seen = set()
+    for pat in patterns:
+        matches = sorted(glob.glob(pat, recursive=True)) or ([pat] if Path(pat).exists() else [])
+        for m in matches:
+            p = Path(m).resolve()
+            if p.suffix.lower() in {'.xlsx', '.xlsm'} and not p.name.startswith('~$') and p not in seen:
+                seen.add(p)
+                files.append(p)
+    return files
+
+
+def _fingerprint_file(args: dict, out_dir: Path, stem: str, kind: str) -> str:
+    # keyed by input stem, so next week's file of the same name diffs against this run
+    return str(out_dir / f'{stem}.{kind}.fingerprints.sqlite') if args.get('diff') else ''
+
+
+def _formats_arg(value: str) -> tuple:
+    try:
+        return check_output_formats(value.split(','))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def run_job(command: str, input_path: str, stem: str, args: dict) -> dict:
+    input_path = Path(input_path)
+    out_dir = Path(args['out_dir'])
+    if args.get('check_limits', True):
+        errors, _ = check_workbook(inspect_workbook(input_path), WORKFLOW_LIMITS[LIMITS_KEY[command]])
+        if errors:
+            raise ValueError('; '.join(errors))
+
+    if command == 'standard':
+        from .final_ai_standard import run_final_ai_standard
+        return run_final_ai_standard(input_path, args['country_code'], args['template'], out_dir / f'{stem}_final_AI_output.xlsx',
+                                     chunk_rows=args['chunk_rows'], highlight=args['highlight'],
+                                     fingerprint_file=_fingerprint_file(args, out_dir, stem, 'final_ai'),
+                                     formats=args['formats'])
+    if command == 'smart':
+        from .final_ai_smart import run_final_ai_smart
+        return run_final_ai_smart(input_path, args['country_code'], args['template'], out_dir / f'{stem}_final_AI_smart_output.xlsx',
+                                  chunk_rows=args['chunk_rows'], highlight=args['highlight'],
+                                  fingerprint_file=_fingerprint_file(args, out_dir, stem, 'final_ai_smart'),
+                                  formats=args['formats'])
+    if command == 'per-tab':
+        from .per_tab_zip import run_per_tab_zip, PerTabZipOptions
+        opts = PerTabZipOptions(keep_phone_on_all_item_lines=args['keep_phone_all_lines'], out_root=str(out_dir / stem),
+                                excel_writer=args['excel_writer'], output_formats=args['formats'])
+        return run_per_tab_zip(input_path, args['items'], options=opts)
+    if command == 'enrich':
+        from .postal_enricher import run_postal_enricher
+        opts = _enricher_options(args, out_dir, _fingerprint_file(args, out_dir, stem, 'enrich'))
+        return run_postal_enricher(input_path, out_dir / f'{stem}_enriched_output.xlsx', dhl_api_key=args['api_key'], opts=opts)
+    raise ValueError(f'Unknown command: {command}')
+
+
+def _enricher_options(args: dict, out_dir: Path, fingerprint_file: str):
+    from .postal_enricher import EnricherOptions
+    opts = EnricherOptions(
+        provider_type=args['provider'],
+        strict_city_from_dhl=args['strict_city'],
+        only_empty=args['only_empty'],
+        request_delay_sec=args['request_delay'],
+        # shared across the batch instead of next to each input
+        cache_file=str(out_dir / EnricherOptions.cache_file),
+        city_index_file=str(out_dir / EnricherOptions.city_index_file),
+        fingerprint_file=fingerprint_file,
+        excel_writer=args['excel_writer'],
+        output_formats=args['formats'],
+    )
+    if args.get('api_base'):
+        opts.api_base = args['api_base']
+    if args.get('gazetteer'):
+        opts.gazetteer_file = args['gazetteer']
+    return opts
+
+
+def run_bulk_enrich(inputs, args: dict) -> dict:
+    from .postal_enricher import run_postal_enricher_bulk
+    out_dir = Path(args['out_dir'])
+    if args.get('check_limits', True):
+        for p in inputs:
+            errors, _ = check_workbook(inspect_workbook(p), WORKFLOW_LIMITS['enrich'])
+            if errors:
+                raise ValueError(f'{p.name}: ' + '; '.join(errors))
+    # one sidecar per input, derived from this name by run_postal_enricher_bulk
+    opts = _enricher_options(args, out_dir, _fingerprint_file(args, out_dir, 'bulk', 'enrich'))
+    return run_postal_enricher_bulk(inputs, out_dir, args['api_key'], opts)
+
+
+def run_batch_final_ai(command: str, inputs, args: dict) -> dict:
+    from .final_ai_standard import run_final_ai_batch
+    out_dir = Path(args['out_dir'])
+    if args.get('check_limits', True):
+        for p in inputs:
+            errors, _ = check_workbook(inspect_workbook(p), WORKFLOW_LIMITS[LIMITS_KEY[command]])
+            if errors:
+                raise ValueError(f'{p.name}: ' + '; '.join(errors))
+    kind = 'final_ai' if command == 'standard' else 'final_ai_smart'
+    # one sidecar per input, derived from this name by run_final_ai_batch
+    return run_final_ai_batch(inputs, args['country_code'], args['template'], out_dir, workers=args['workers'],
+                              chunk_rows=args['chunk_rows'], highlight=args['highlight'],
+                              fingerprint_file=_fingerprint_file(args, out_dir, 'batch', kind),
+                              formats=args['formats'], smart=command == 'smart')
+
+
+def _timed_job(command, input_path, stem, args):
+    t0 = time.perf_counter()
+    stats = run_job(command, input_path, stem, args)
+    return stats, time.perf_counter() - t0
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog='python -m workflows', description='Run DHL Team Tool workflows headlessly.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--out-dir', required=True, type=Path)
+    common.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    common.add_argument('--no-limits', dest='check_limits', action='store_false', help='skip the pre-flight size limits')
+    common.add_argument('--formats', type=_formats_arg, default=('xlsx',),
+                        help=f"comma-separated outputs from {','.join(OUTPUT_FORMATS)} (default: xlsx); "
+                             "csv/parquet write one file per sheet, leave out xlsx to skip the workbook")
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    for name in ('standard', 'smart'):
+        p = sub.add_parser(name, parents=[common], help=f'Final AI Builder ({name.title()})')
+        p.add_argument('--af', nargs='+', required=True, help='AF Input file(s) or glob(s)')
+        p.add_argument('--country-code', required=True, type=Path)
+        p.add_argument('--template', required=True, type=Path)
+        p.add_argument('--chunk-rows', type=int, default=0, help='stream the AF Input in chunks of N rows (bounded memory)')
+        p.add_argument('--diff', action='store_true', help='reuse results for rows unchanged since the last --diff run into --out-dir')
+        p.add_argument('--highlight', choices=['fill', 'conditional'], default='fill',
+                       help="'conditional': hidden flag column + one conditional-format rule instead of per-cell fills")
+        p.add_argument('--batch', action='store_true',
+                       help='one batch: references parsed once, FINAL_AI_OUTPUTS.zip + aggregate _QC_SUMMARY.xlsx')
+
+    p = sub.add_parser('per-tab', parents=[common], help='Per-tab ZIP + Items')
+    p.add_argument('--main', nargs='+', required=True, help='MAIN workbook(s) or glob(s)')
+    p.add_argument('--items', required=True, type=Path)
+    p.add_argument('--blank-phone-on-continuation', dest='keep_phone_all_lines', action='store_false')
+    p.add_argument('--excel-writer', choices=['openpyxl', 'xlsxwriter'], default='openpyxl',
+                   help="'xlsxwriter': stream rows in constant memory (faster, needs xlsxwriter)")
+
+    p = sub.add_parser('enrich', parents=[common], help='Postal/City Enricher (DHL Location Finder)')
+    p.add_argument('--input', nargs='+', required=True, help='workbook(s) or glob(s) to enrich')
+    p.add_argument('--api-key', default=os.environ.get('DHL_API_KEY', ''))
+    p.add_argument('--provider', choices=['express', 'parcel'], default='express')
+    p.add_argument('--no-strict-city', dest='strict_city', action='store_false')
+    p.add_argument('--only-empty', action='store_true')
+    p.add_argument('--diff', action='store_true', help='reuse results for rows unchanged since the last --diff run into --out-dir')
+    p.add_argument('--bulk', action='store_true',
+                   help='one batch: shared cache and HTTP session, each distinct key looked up once, combined _SUMMARY.xlsx')
+    p.add_argument('--request-delay', type=float, default=0.2)
+    p.add_argument('--api-base', default='', help='override the Location Finder base URL (e.g. a local stub)')
+    p.add_argument('--gazetteer', type=Path, default=None, help='offline gazetteer consulted before the API')
+    p.add_argument('--excel-writer', choices=['openpyxl', 'xlsxwriter'], default='openpyxl',
+                   help="'xlsxwriter': stream rows in constant memory (faster, needs xlsxwriter)")
+
+    p = sub.add_parser('gazetteer', help='Build the offline gazetteer from a GeoNames postal TSV')
+    p.add_argument('--tsv', required=True, type=Path, help='GeoNames postal TSV (.txt or .zip)')
+    p.add_argument('--db', required=True, type=Path)
+    p.add_argument('--countries', default='', help='comma-separated ISO2 codes to keep (default: all)')
+    return ap
+
+
+def main(argv=None) -> int:
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    if args.command == 'gazetteer':
+        from .gazetteer import build_gazetteer
+        countries = [c for c in args.countries.split(',') if c.strip()] or None
+        print(json.dumps(build_gazetteer(args.tsv, args.db, countries), default=str))
+        return 0
+    patterns = {'standard': 'af', 'smart': 'af', 'per-tab': 'main', 'enrich': 'input'}[args.command]
+    inputs = expand_inputs(getattr(args, patterns))
+    if not inputs:
+        ap.error('no input files matched')
+    if args.command == 'enrich' and not args.api_key:
+        ap.error('DHL API key is required (--api-key or DHL_API_KEY)')
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+
+    job_args = {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items() if k not in {'af', 'main', 'input', 'command'}}
+    batch = args.bulk if args.command == 'enrich' else getattr(args, 'batch', False)
+    if batch:
+        t0 = time.perf_counter()
+        rec = {'workflow': args.command + ('-bulk' if args.command == 'enrich' else '-batch'), 'inputs': len(inputs)}
+        try:
+            if args.command == 'enrich':
+                stats = run_bulk_enrich(inputs, job_args)
+            else:
+                stats = run_batch_final_ai(args.command, inputs, job_args)
+            rec.update({'ok': True, 'seconds': round(time.perf_counter() - t0, 3), **stats})
+        except Exception as e:
+            rec.update({'ok': False, 'error': f'{type(e).__name__}: {e}'})
+        print(json.dumps(rec, default=str), flush=True)
+        return 0 if rec['ok'] and not rec.get('failed') else 1
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(inputs)))) as pool:
+        futures = {
+            pool.submit(_timed_job, args.command, str(p), stem, job_args): p
+            for p, stem in zip(inputs, unique_stems(inputs))
+        }
+        for fut in as_completed(futures):
+            rec = {'workflow': args.command, 'input': str(futures[fut])}
+            try:
+                stats, seconds = fut.result()
+                rec.update({'ok': True, 'seconds': round(seconds, 3), **stats})
+            except Exception as e:
+                failures += 1
+                rec.update({'ok': False, 'error': f'{type(e).__name__}: {e}'})
+            print(json.dumps(rec, default=str), flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
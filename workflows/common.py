@@ -1,16 +1,30 @@
 from __future__ import annotations
 
+import hashlib
+import os
 import re
+import threading
 import unicodedata
-from datetime import datetime
+from collections import OrderedDict
+from datetime import date, datetime
+from pathlib import Path
 from zoneinfo import ZoneInfo
 
 import pandas as pd
+from openpyxl import load_workbook
+
+from .metrics import REGISTRY
 
 DATE_TZ = 'Africa/Cairo'
 DATE_FMT = '%d-%m-%Y'
 TRUNC_LIMIT = 45
 
+# Parsed-workbook cache: total size of the cached DataFrames, and the process
+# RSS above which nothing new is cached (PM2 restarts the app at 500 MB).
+PARSE_CACHE_MB = float(os.environ.get('DHL_PARSE_CACHE_MB', 120))
+PARSE_CACHE_RSS_MB = float(os.environ.get('DHL_PARSE_CACHE_RSS_MB', 350))
+HASH_CHUNK_BYTES = 1024 * 1024
+
 
 def normalize_text(x) -> str:
     if x is None:
@@ -32,6 +46,17 @@ def norm_key(s: str) -> str:
     return s.strip()
 
 
+def unique_stems(paths):
+    """Output name per input; inputs with the same file name in different folders get a suffix."""
+    used = {}
+    out = []
+    for p in paths:
+        n = used.get(p.stem, 0)
+        used[p.stem] = n + 1
+        out.append(p.stem if n == 0 else f'{p.stem}_{n + 1}')
+    return out
+
+
 def trunc(s: str, n: int = TRUNC_LIMIT) -> str:
     return normalize_text(s)[:n]
 
@@ -45,3 +70,392 @@ def today_str() -> str:
 
 def only_digits(s: str) -> str:
     return re.sub(r'[^0-9]', '', s or '')
+
+
+_digest_memo = {}
+
+
+def file_digest(path: Path) -> str:
+    """SHA-1 of the file content, memoized per (path, size, mtime)."""
+    path = Path(path)
+    st = path.stat()
+    memo_key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    digest = _digest_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        if len(_digest_memo) >= 1024:
+            _digest_memo.clear()
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def current_rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def _frames_nbytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sum(_frames_nbytes(v) for v in value.values())
+    if isinstance(value, list):
+        return sum(len(str(v)) for v in value) + 64
+    return 64
+
+
+def _copy_frames(value):
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _copy_frames(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+class ParseCache:
+    """LRU of parsed workbooks keyed by file content hash, bounded by DataFrame bytes.
+
+    Entries are evicted oldest first once the total exceeds max_mb; nothing is
+    added while the process RSS is above rss_limit_mb. Callers get copies, so
+    cached frames are never mutated.
+    """
+
+    def __init__(self, max_mb: float = PARSE_CACHE_MB, rss_limit_mb: float = PARSE_CACHE_RSS_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.rss_limit_mb = rss_limit_mb
+        self._entries = OrderedDict()   # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        nbytes = _frames_nbytes(value)
+        if self.max_bytes <= 0 or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if self.rss_limit_mb and current_rss_mb() > self.rss_limit_mb:
+                # under memory pressure: give memory back instead of growing
+                self._entries.clear()
+                self._bytes = 0
+                return
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, n) = self._entries.popitem(last=False)
+                self._bytes -= n
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'mb': round(self._bytes / (1024 * 1024), 1),
+                    'max_mb': self.max_bytes / (1024 * 1024), 'hits': self.hits, 'misses': self.misses}
+
+
+PARSE_CACHE = ParseCache()
+
+REGISTRY.callback('dhl_parse_cache_hits_total', 'Parsed-workbook cache hits.', lambda: PARSE_CACHE.hits, kind='counter')
+REGISTRY.callback('dhl_parse_cache_misses_total', 'Parsed-workbook cache misses.', lambda: PARSE_CACHE.misses, kind='counter')
+REGISTRY.callback('dhl_parse_cache_bytes', 'Size of the DataFrames in the parsed-workbook cache.', lambda: PARSE_CACHE._bytes)
+REGISTRY.callback('dhl_process_resident_memory_bytes', 'Resident memory of this process (PM2 restarts it at 500 MB).',
+                  lambda: current_rss_mb() * 1024 * 1024)
+
+
+def read_excel_cached(path: Path, sheet_name=0, **kwargs):
+    """pd.read_excel through PARSE_CACHE: the same file content is parsed once per process."""
+    key = (file_digest(path), 'read_excel', repr(sheet_name), repr(sorted(kwargs.items())))
+    value = PARSE_CACHE.get(key)
+    if value is None:
+        value = pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+        PARSE_CACHE.put(key, value)
+    return _copy_frames(value)
+
+
+def excel_sheet_names(path: Path) -> list:
+    key = (file_digest(path), 'sheet_names')
+    names = PARSE_CACHE.get(key)
+    if names is None:
+        with pd.ExcelFile(path) as xls:
+            names = list(xls.sheet_names)
+        PARSE_CACHE.put(key, names)
+    return list(names)
+
+
+def pandas_headers(values) -> list:
+    """Header names the way pandas.read_excel would produce them."""
+    out, seen = [], {}
+    for i, v in enumerate(values):
+        name = f'Unnamed: {i}' if v is None or str(v).strip() == '' else v
+        n = seen.get(name, 0)
+        seen[name] = n + 1
+        out.append(name if n == 0 else f'{name}.{n}')
+    return out
+
+
+def iter_sheet_frames(xlsx_path: Path, chunk_rows: int = 5000, max_rows: int = 0, skip_sheet=None):
+    """Yield (sheet title, DataFrame) per chunk of data rows, streaming with openpyxl read-only.
+
+    The first row is the header. max_rows > 0 stops each sheet after that many
+    data rows (previews); skip_sheet(title) -> True skips a sheet unread.
+    """
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            if skip_sheet is not None and skip_sheet(ws.title):
+                continue
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            columns = pandas_headers(header)
+            buf = []
+            n = 0
+            for r in rows:
+                if len(r) < len(columns):
+                    r = tuple(r) + (None,) * (len(columns) - len(r))
+                buf.append(r[:len(columns)])
+                n += 1
+                if len(buf) >= chunk_rows:
+                    yield ws.title, pd.DataFrame(buf, columns=columns)
+                    buf = []
+                if max_rows and n >= max_rows:
+                    break
+            if buf:
+                yield ws.title, pd.DataFrame(buf, columns=columns)
+    finally:
+        wb.close()
+
+
+# Excel output backends. 'openpyxl' is pandas' ExcelWriter; 'xlsxwriter'
+# streams rows through xlsxwriter in constant_memory mode, so a sheet never
+# exists in memory as a cell tree. Both write the same sheet names, headers,
+# column order and cell values; rows of one sheet must be written in order
+# (true for every caller: frames, then summary blocks at increasing startrow).
+EXCEL_WRITERS = ('openpyxl', 'xlsxwriter')
+DATETIME_FMT = 'YYYY-MM-DD HH:MM:SS'  # pandas' defaults
+DATE_ONLY_FMT = 'YYYY-MM-DD'
+
+
+class PandasExcelOutput:
+    def __init__(self, path: Path):
+        self._writer = pd.ExcelWriter(path, engine='openpyxl')
+
+    def write(self, df: pd.DataFrame, sheet_name: str, startrow: int = 0):
+        df.to_excel(self._writer, index=False, sheet_name=sheet_name, startrow=startrow)
+
+    def close(self):
+        self._writer.close()
+
+
+class StreamingExcelOutput:
+    def __init__(self, path: Path):
+        import xlsxwriter
+
+        # strings_to_urls off: pandas/openpyxl store URLs and e-mails as plain text
+        self._wb = xlsxwriter.Workbook(str(path), {'constant_memory': True, 'strings_to_urls': False})
+        # pandas' header style: bold, thin border, centered
+        self._header_fmt = self._wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self._datetime_fmt = self._wb.add_format({'num_format': DATETIME_FMT})
+        self._date_fmt = self._wb.add_format({'num_format': DATE_ONLY_FMT})
+        self._sheets = {}
+
+    def write(self, df: pd.DataFrame, sheet_name: str, startrow: int = 0):
+        ws = self._sheets.get(sheet_name)
+        if ws is None:
+            ws = self._sheets[sheet_name] = self._wb.add_worksheet(sheet_name)
+        for c, h in enumerate(df.columns):
+            ws.write(startrow, c, h, self._header_fmt)
+        # tolist() turns numpy scalars into Python ones, column by column
+        columns = [df.iloc[:, c].tolist() for c in range(df.shape[1])]
+        for r, values in enumerate(zip(*columns), start=startrow + 1):
+            for c, v in enumerate(values):
+                if v is None or v is pd.NaT:
+                    continue
+                if isinstance(v, float):
+                    if v != v:
+                        continue
+                    if v in (float('inf'), float('-inf')):
+                        ws.write_string(r, c, 'inf' if v > 0 else '-inf')  # pandas' inf_rep
+                        continue
+                if isinstance(v, datetime):
+                    ws.write_datetime(r, c, v.replace(tzinfo=None), self._datetime_fmt)
+                elif isinstance(v, date):
+                    ws.write_datetime(r, c, v, self._date_fmt)
+                else:
+                    ws.write(r, c, v)
+
+    def close(self):
+        self._wb.close()
+
+
+class ExcelOutput:
+    """Context manager writing DataFrames to one workbook with the chosen backend.
+
+        with ExcelOutput(path, 'xlsxwriter') as out:
+            out.write(df, 'Sheet1')
+            out.write(summary, '_SUMMARY', startrow=5)
+    """
+
+    def __init__(self, path: Path, backend: str = 'openpyxl'):
+        if backend not in EXCEL_WRITERS:
+            raise ValueError(f'Unknown Excel writer {backend!r}; choose one of {", ".join(EXCEL_WRITERS)}')
+        self._out = StreamingExcelOutput(path) if backend == 'xlsxwriter' else PandasExcelOutput(path)
+
+    def write(self, df: pd.DataFrame, sheet_name: str, startrow: int = 0):
+        self._out.write(df, sheet_name, startrow)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._out.close()
+
+
+# Machine-readable outputs, written next to or instead of the workbook: one
+# file per sheet and format. CSV is UTF-8 with a header row and no index;
+# Parquet (needs pyarrow) keeps datetime columns typed and stores every other
+# column as strings (see _parquet_frame).
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet')
+TABLE_FORMATS = ('csv', 'parquet')
+
+
+def check_output_formats(formats) -> tuple:
+    formats = tuple(dict.fromkeys(f.strip().lower() for f in formats if f.strip()))
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f'Unknown output format(s) {", ".join(unknown)}; choose from {", ".join(OUTPUT_FORMATS)}')
+    if not formats:
+        raise ValueError('At least one output format is required')
+    return formats
+
+
+def tables_dir(out_xlsx: Path) -> Path:
+    """Folder holding the CSV/Parquet versions of out_xlsx's sheets."""
+    out_xlsx = Path(out_xlsx)
+    return out_xlsx.with_name(out_xlsx.stem + '_tables')
+
+
+def _parquet_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Unique column names (pandas' 'name.1' style) and every column but datetimes as nullable strings.
+
+    A chunked table is written with the first chunk's schema, and a column that
+    is all numbers in one chunk can hold text in the next, so no column is
+    typed from its values.
+    """
+    seen = {}
+    names = []
+    for c in map(str, df.columns):
+        n = seen.get(c, 0)
+        seen[c] = n + 1
+        names.append(c if n == 0 else f'{c}.{n}')
+    out = {}
+    for name, (_, col) in zip(names, df.items()):
+        if not pd.api.types.is_datetime64_any_dtype(col.dtype):
+            col = pd.Series([None if v is None or v is pd.NaT or (isinstance(v, float) and v != v) else str(v)
+                             for v in col.tolist()], index=col.index, dtype=object)
+        out[name] = col
+    return pd.DataFrame(out, index=df.index)
+
+
+class TableOutput:
+    """Writes DataFrames as <out_dir>/<name>.csv and/or .parquet.
+
+    Writing the same name again appends rows, so chunked pipelines hold only
+    the current chunk. formats may include 'xlsx', which is ignored here; with
+    no table format every write is a no-op. replace=True first removes earlier
+    CSV/Parquet files from out_dir (for a folder owned by one output).
+    """
+
+    def __init__(self, out_dir: Path, formats=(), replace: bool = False):
+        self.out_dir = Path(out_dir)
+        self.formats = [f for f in check_output_formats(formats or ('xlsx',)) if f in TABLE_FORMATS]
+        self.paths = []
+        self._stems = {}      # table name -> file stem
+        self._parquet = {}    # table name -> pyarrow ParquetWriter
+        if not self.formats:
+            return
+        if 'parquet' in self.formats:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise RuntimeError('Parquet output needs pyarrow (pip install pyarrow)') from None
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        if replace:
+            for f in TABLE_FORMATS:
+                for stale in self.out_dir.glob(f'*.{f}'):
+                    stale.unlink()
+
+    def _stem(self, name: str) -> str:
+        # keeps a leading underscore, so '_QC' stays '_QC.csv'
+        base = re.sub(r'[^A-Za-z0-9\-\_]+', '_', normalize_text(name))[:80] or 'TABLE'
+        used = set(self._stems.values())
+        stem, n = base, 1
+        while stem in used:
+            n += 1
+            stem = f'{base}_{n}'
+        self._stems[name] = stem
+        return stem
+
+    def write(self, df: pd.DataFrame, name: str):
+        if not self.formats:
+            return
+        first = name not in self._stems
+        stem = self._stem(name) if first else self._stems[name]
+        if 'csv' in self.formats:
+            path = self.out_dir / f'{stem}.csv'
+            df.to_csv(path, index=False, encoding='utf-8', mode='w' if first else 'a', header=first)
+            if first:
+                self.paths.append(path)
+        if 'parquet' in self.formats:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(_parquet_frame(df), preserve_index=False)
+            # an all-empty text column would otherwise be typed null for the whole file
+            schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema])
+            if schema != table.schema:
+                table = table.cast(schema)
+            writer = self._parquet.get(name)
+            if writer is None:
+                path = self.out_dir / f'{stem}.parquet'
+                writer = self._parquet[name] = pq.ParquetWriter(path, table.schema)
+                self.paths.append(path)
+            elif table.schema != writer.schema:
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+
+    def close(self):
+        for writer in self._parquet.values():
+            writer.close()
+        self._parquet.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,16 +1,216 @@
 """Final AI Builder (Smart mapping).
 
-Enabled workflow.
+Same output as the standard builder, but AF Input columns are mapped by
+inferring each column's role from its header text *and* a sample of its
+cells, so files with unusual headers ("Contact No.", "E-mail", "PLZ",
+an unlabelled phone column, ...) still land in the right template fields.
 
-Current behavior: runs the standard builder.
-Next enhancement: migrate AI-assisted mapping from your SMART_AI notebook.
+- Header hints: an extended keyword list on top of AF_HEADER_MAP
+- Content scores (phone/email/postcode/country likeness) computed vectorized
+  over the non-empty cells of the first SAMPLE_ROWS rows, all columns at once
+- Mappings are memoized by a hash of the normalized header row, so repeated
+  sheets (and chunks) with the same layout skip inference entirely
+
+Runs fully offline; country likeness uses the uploaded DHL country list.
 """
 
 from __future__ import annotations
 
+from collections import OrderedDict
 from pathlib import Path
-from .final_ai_standard import run_final_ai_standard
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .common import norm_key
+from .final_ai_standard import AF_HEADER_MAP, COUNTRY_ALIASES, PREVIEW_ROWS, preview_final_ai, run_final_ai_standard
+
+SAMPLE_ROWS = 200
+MIN_SCORE = 0.35
+HEADER_WEIGHT = 0.6
+CONTENT_WEIGHT = 0.4
+ROLE_CACHE_MAX = 256
+
+CONTENT_ROLES = ('Phone', 'Email', 'Postcode', 'Country')
+
+# Checked in order after AF_HEADER_MAP; first keyword contained in the header wins.
+EXTRA_HEADER_HINTS = {
+    'E MAIL': 'Email',
+    'MAIL': 'Email',
+    'PHONE': 'Phone',
+    'TEL': 'Phone',
+    'CELL': 'Phone',
+    'GSM': 'Phone',
+    'WHATSAPP': 'Phone',
+    'CONTACT NO': 'Phone',
+    'POSTCODE': 'Postcode',
+    'POST CODE': 'Postcode',
+    'POSTAL': 'Postcode',
+    'PLZ': 'Postcode',
+    'PIN CODE': 'Postcode',
+    'TOWN': 'City',
+    'LOCALITY': 'City',
+    'NATION': 'Country',
+    'ORG': 'Company',
+    'EMPLOYER': 'Company',
+    'FIRM': 'Company',
+    'CONTACT NAME': 'Full Name',
+    'NAME': 'Full Name',
+    'CONTACT': 'Full Name',
+    'SALUTATION': 'Title',
+    'JOB': 'Position',
+    'DESIGNATION': 'Position',
+    'ROLE': 'Position',
+    'DEPT': 'Department',
+    'SEX': 'Gender',
+    'ADDR': 'Street',
+}
+
+EMAIL_RE = r'^[^@\s]+@[^@\s]+\.[A-Za-z]{2,}$'
+PHONE_RE = r'^\+?[0-9][0-9\s\-\(\)\./]{6,}$'
+POSTCODE_RE = r'^(?=.*\d)[A-Z0-9][A-Z0-9\- ]{1,8}[A-Z0-9]$'
+
+
+def header_hint(header) -> str | None:
+    hk = norm_key(header)
+    if not hk:
+        return None
+    for k, v in AF_HEADER_MAP.items():
+        if k in hk:
+            return v
+    for k, v in EXTRA_HEADER_HINTS.items():
+        if k in hk:
+            return v
+    return None
+
+
+def header_signature(columns) -> str:
+    return hashlib.sha1('\x1f'.join(norm_key(c) for c in columns).encode('utf-8')).hexdigest()
+
+
+def known_country_keys(dhl_df: pd.DataFrame | None) -> set:
+    keys = set(COUNTRY_ALIASES) | {norm_key(v) for v in COUNTRY_ALIASES.values()}
+    if dhl_df is not None and not dhl_df.empty:
+        keys |= set(dhl_df['key'])
+    return keys
+
+
+def content_scores(df: pd.DataFrame, country_keys: set, sample_rows: int = SAMPLE_ROWS) -> pd.DataFrame:
+    """Share of sampled non-empty cells per column that look like each content role.
+
+    All columns are stacked into one Series so every regex runs once over the
+    whole sample, regardless of how wide the sheet is.
+    """
+    n_cols = df.shape[1]
+    if n_cols == 0:
+        return pd.DataFrame(columns=list(CONTENT_ROLES))
+    sample = df.iloc[:sample_rows].set_axis(range(n_cols), axis=1)
+    stacked = sample.stack()
+    # pandas 3 keeps missing cells in stack(); as text they would read 'nan'/'None'
+    stacked = stacked[stacked.notna()]
+    if stacked.empty:
+        return pd.DataFrame(0.0, index=range(n_cols), columns=list(CONTENT_ROLES))
+
+    col_pos = stacked.index.get_level_values(1)
+    values = stacked.astype(str).str.strip()
+    # integers read as floats ("201001234567.0")
+    values = values.str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+    non_empty = values != ''
+    upper = values.str.upper()
+    digits = values.str.count(r'\d')
+
+    is_email = values.str.match(EMAIL_RE)
+    is_phone = values.str.match(PHONE_RE) & (digits >= 7)
+    is_postcode = upper.str.match(POSTCODE_RE) & (digits <= 8) & ~is_phone
+    keys = upper.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    keys = keys.str.replace(r'[^A-Z0-9]+', ' ', regex=True).str.strip()
+    is_country = keys.isin(country_keys)
+
+    flags = pd.DataFrame({
+        'Phone': is_phone, 'Email': is_email, 'Postcode': is_postcode, 'Country': is_country,
+    }).astype(float)
+    flags = flags[non_empty.to_numpy()]
+    flags['col'] = np.asarray(col_pos)[non_empty.to_numpy()]
+    scores = flags.groupby('col').mean()
+    return scores.reindex(range(n_cols), fill_value=0.0)
+
+
+def infer_column_roles(df: pd.DataFrame, country_keys: set) -> dict:
+    """-> {column position: role}; each role is assigned to at most one column."""
+    hints = [header_hint(c) for c in df.columns]
+    scores = content_scores(df, country_keys)
+
+    candidates = []
+    for pos, hint in enumerate(hints):
+        for role in CONTENT_ROLES:
+            s = CONTENT_WEIGHT * float(scores.at[pos, role])
+            if hint == role:
+                s += HEADER_WEIGHT
+            if s >= MIN_SCORE:
+                candidates.append((s, -pos, pos, role))
+        if hint and hint not in CONTENT_ROLES:
+            candidates.append((HEADER_WEIGHT, -pos, pos, hint))
+
+    roles = {}
+    used_roles = set()
+    for _, _, pos, role in sorted(candidates, reverse=True):
+        if pos in roles or role in used_roles:
+            continue
+        roles[pos] = role
+        used_roles.add(role)
+    return roles
+
+
+class SmartHeaderMapper:
+    """header_mapper for run_final_ai_standard with per-layout memoization."""
+
+    _cache: OrderedDict = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.inferred = 0
+        self.reused = 0
+        self._country_keys = None
+
+    def __call__(self, df: pd.DataFrame, dhl_df: pd.DataFrame | None = None) -> list:
+        sig = header_signature(df.columns)
+        with self._lock:
+            roles = self._cache.get(sig)
+            if roles is not None:
+                self._cache.move_to_end(sig)
+        if roles is None:
+            if self._country_keys is None:
+                self._country_keys = known_country_keys(dhl_df)
+            roles = infer_column_roles(df, self._country_keys)
+            with self._lock:
+                self._cache[sig] = roles
+                while len(self._cache) > ROLE_CACHE_MAX:
+                    self._cache.popitem(last=False)
+            self.inferred += 1
+        else:
+            self.reused += 1
+        return [roles.get(i, c) for i, c in enumerate(df.columns)]
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._lock:
+            cls._cache.clear()
+
+
+def run_final_ai_smart(af_input_xlsx: Path, country_code_xlsx: Path, template_xlsx: Path, out_xlsx: Path,
+                       chunk_rows: int = 0, highlight: str = 'fill', fingerprint_file='', formats=('xlsx',)):
+    mapper = SmartHeaderMapper()
+    stats = run_final_ai_standard(af_input_xlsx, country_code_xlsx, template_xlsx, out_xlsx,
+                                  chunk_rows=chunk_rows, header_mapper=mapper, highlight=highlight,
+                                  fingerprint_file=fingerprint_file, formats=formats, workflow='final_ai_smart')
+    stats['layouts_inferred'] = mapper.inferred
+    stats['layouts_reused'] = mapper.reused
+    return stats
 
 
-def run_final_ai_smart(af_input_xlsx: Path, country_code_xlsx: Path, template_xlsx: Path, out_xlsx: Path):
-    return run_final_ai_standard(af_input_xlsx, country_code_xlsx, template_xlsx, out_xlsx)
+def preview_final_ai_smart(af_input_xlsx: Path, country_code_xlsx: Path, template_xlsx: Path,
+                           n_rows: int = PREVIEW_ROWS) -> dict:
+    return preview_final_ai(af_input_xlsx, country_code_xlsx, template_xlsx, n_rows,
+                            header_mapper=SmartHeaderMapper(), sample_rows=SAMPLE_ROWS)
@@ -3,8 +3,11 @@
 Implements the core behavior from your notebook exports:
 - Reads AF Input.xlsx (all sheets)
 - Reads country code .xlsx (country list + DDP restrictions)
-- Reads final AI template (header row 1 + constants from row 2)
-- Writes an output workbook with one sheet per Source Sheet + _QC
+- Reads final AI template (header row 1 + constants from row 2), compiled once
+  per template content and reused across runs
+- Writes an output workbook with one sheet per Source Sheet + _QC, and/or
+  the same tables as CSV/Parquet files (data rows only; the template's
+  constants are already in every row)
 
 Rules:
 - Output schema locked to template headers and order
@@ -12,6 +15,9 @@ Rules:
 - Destination City & Destination Country are UPPERCASE
 - Phone normalized to +E.164
 - DDP = 'N' for countries listed in DDP sheet; otherwise 'Y'
+- Empty postcodes are extracted from the street with the destination
+  country's format (workflows.postcodes); a given postcode that does not fit
+  that format is a QC issue
 - Missing email is NOT treated as an issue
 
 This module is adapted from your 'AI DHL AF SINGLE' notebook. 
@@ -19,17 +25,43 @@ This module is adapted from your 'AI DHL AF SINGLE' notebook.
 
 from __future__ import annotations
 
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from pathlib import Path
+import csv
+import hashlib
+import multiprocessing
+import os
 import re
+import tempfile
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
 import pandas as pd
 import numpy as np
 from openpyxl import load_workbook, Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
 from openpyxl.styles import PatternFill
+from openpyxl.utils import get_column_letter
 
-from .common import normalize_text, norm_key, trunc, today_str, only_digits
+from .common import (ExcelOutput, TableOutput, check_output_formats, normalize_text, norm_key, trunc, today_str, only_digits,
+                     excel_sheet_names, file_digest, iter_sheet_frames, read_excel_cached, tables_dir, unique_stems)
+from .fingerprints import context_digest, open_fingerprints, row_fingerprint
+from .metrics import RunTracker, track_run
+from .postcodes import FORMATS_DIGEST, resolve_postcode, resolve_postcodes
+from .preflight import NS_MAIN, _sheet_targets
 
 HIGHLIGHT_FILL = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
 
+# 'fill': yellow fill on every cell of a flagged row.
+# 'conditional': hidden flag column after the template columns plus one
+# worksheet-level conditional-formatting rule, so no cell carries a style.
+HIGHLIGHT_MODES = ('fill', 'conditional')
+ISSUE_FLAG_HEADER = '_issue_flag'
+
 COUNTRY_ALIASES = {
     'IVORY COAST': 'COTE D IVOIRE',
     "COTE D'IVOIRE": 'COTE D IVOIRE',
@@ -62,9 +94,9 @@ DIAL_CODES = {
 
 def load_dhl_country_and_ddp(country_code_xlsx: Path):
     try:
-        dhl_df = pd.read_excel(country_code_xlsx, sheet_name=0, engine='openpyxl')
+        dhl_df = read_excel_cached(country_code_xlsx, sheet_name=0, engine='openpyxl')
     except Exception:
-        dhl_df = pd.read_excel(country_code_xlsx, sheet_name='country code', engine='openpyxl')
+        dhl_df = read_excel_cached(country_code_xlsx, sheet_name='country code', engine='openpyxl')
     dhl_df = dhl_df.loc[:, ~dhl_df.columns.duplicated()].copy()
 
     code_col = name_col = None
@@ -83,7 +115,7 @@ def load_dhl_country_and_ddp(country_code_xlsx: Path):
 
     # DDP sheet: listed countries -> DDP=N
     try:
-        ddp_df = pd.read_excel(country_code_xlsx, sheet_name='DDP', engine='openpyxl')
+        ddp_df = read_excel_cached(country_code_xlsx, sheet_name='DDP', engine='openpyxl')
         ddp_df = ddp_df.loc[:, ~ddp_df.columns.duplicated()].copy()
     except Exception:
         ddp_df = pd.DataFrame()
@@ -168,79 +200,366 @@ def normalize_phone_e164(phone_raw: str, country_name: str) -> str:
     return '+' + digits
 
 
-def build_contacts_from_af(af_input_xlsx: Path):
-    xls = pd.ExcelFile(af_input_xlsx)
-    contacts_all = []
+AF_HEADER_MAP = {
+    'DEPARTMENT': 'Department',
+    'TITLE': 'Title',
+    'GENDER': 'Gender',
+    'FULL NAME': 'Full Name',
+    'POSITION': 'Position',
+    'COMPANY': 'Company',
+    'CITY': 'City',
+    'COUNTRY': 'Country',
+    'LANGUAGE': 'Language',
+    'STREET ADDRESS2': 'Street',
+    'ADDRESS': 'Street',
+    'STREET': 'Street',
+    'TELEPHONE / MOBILE3': 'Phone',
+    'TELEPHONE': 'Phone',
+    'MOBILE': 'Phone',
+    'POSTAL CODE': 'Postcode',
+    'ZIP': 'Postcode',
+    'EMAIL': 'Email',
+}
 
-    header_map = {
-        'DEPARTMENT': 'Department',
-        'TITLE': 'Title',
-        'GENDER': 'Gender',
-        'FULL NAME': 'Full Name',
-        'POSITION': 'Position',
-        'COMPANY': 'Company',
-        'CITY': 'City',
-        'COUNTRY': 'Country',
-        'LANGUAGE': 'Language',
-        'STREET ADDRESS2': 'Street',
-        'ADDRESS': 'Street',
-        'STREET': 'Street',
-        'TELEPHONE / MOBILE3': 'Phone',
-        'TELEPHONE': 'Phone',
-        'MOBILE': 'Phone',
-        'POSTAL CODE': 'Postcode',
-        'ZIP': 'Postcode',
-        'EMAIL': 'Email',
-    }
+CONTACT_COLS = ['Department','Title','Gender','Full Name','Position','Company',
+                'City','Country','Language','Street','Phone','Postcode','Email']
+
+SKIP_SHEETS = {'ALL DEPARTMENTS', 'LANGUAGE'}
+
+QC_HEADERS = ['Order Number','Source Sheet','Name','Email','Phone Raw','Phone E164','Country (raw)','DHL Country','DHL Code','DDP','Issues']
+
+COMPUTED_COLS = {
+    'Order Number','Date','To Name',
+    'Destination Building','Destination Street','Destination Suburb','Destination City',
+    'Destination Postcode','Destination State','Destination Country',
+    'Destination Email','Destination Phone','Company','Country Code','DDP'
+}
+
+TEMPLATE_CACHE_MAX = 16
+PREVIEW_ROWS = 20
+
+# Resolved per block of contacts by add_postcodes, read by transform_contact
+POSTCODE_COL = '_postcode'
+POSTCODE_VALID_COL = '_postcode_valid'
+
+
+def is_skipped_sheet(sheet: str) -> bool:
+    return norm_key(sheet) in {norm_key(s) for s in SKIP_SHEETS}
+
+
+def map_af_headers(columns) -> list:
+    """Rename AF Input headers to contact fields by substring match on AF_HEADER_MAP."""
+    new_cols = []
+    for c in columns:
+        cu = norm_key(c)
+        mapped = None
+        for k, v in AF_HEADER_MAP.items():
+            if k in cu:
+                mapped = v
+                break
+        new_cols.append(mapped if mapped else c)
+    return new_cols
+
+
+def standard_header_mapper(df: pd.DataFrame, dhl_df: pd.DataFrame | None = None) -> list:
+    return map_af_headers(df.columns)
+
+
+def normalize_contacts(df: pd.DataFrame, sheet: str, header_mapper=None, dhl_df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Map headers, keep CONTACT_COLS and drop rows without country or name/company.
+
+    header_mapper(df, dhl_df) returns the new column names (standard_header_mapper by default).
+    """
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+    df.columns = (header_mapper or standard_header_mapper)(df, dhl_df)
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+
+    for kc in CONTACT_COLS:
+        if kc not in df.columns:
+            df[kc] = np.nan
+    df2 = df[CONTACT_COLS].copy()
+
+    for c in ['Full Name','Company','Email','Country']:
+        df2[c] = df2[c].apply(normalize_text)
 
-    skip_sheets = {'ALL DEPARTMENTS', 'LANGUAGE'}
+    df2 = df2[(df2['Country'] != '') & ((df2['Full Name'] != '') | (df2['Company'] != ''))]
+    df2['Source Sheet'] = sheet
+    return df2
 
-    for sheet in xls.sheet_names:
-        if norm_key(sheet) in {norm_key(s) for s in skip_sheets}:
+
+def build_contacts_from_af(af_input_xlsx: Path, header_mapper=None, dhl_df: pd.DataFrame | None = None):
+    contacts_all = []
+
+    for sheet in excel_sheet_names(af_input_xlsx):
+        if is_skipped_sheet(sheet):
             continue
         try:
-            df = pd.read_excel(af_input_xlsx, sheet_name=sheet, engine='openpyxl')
+            df = read_excel_cached(af_input_xlsx, sheet_name=sheet, engine='openpyxl')
         except Exception:
             continue
         if df.empty:
             continue
-        df = df.loc[:, ~df.columns.duplicated()].copy()
-
-        new_cols = []
-        for c in df.columns:
-            cu = norm_key(c)
-            mapped = None
-            for k, v in header_map.items():
-                if k in cu:
-                    mapped = v
-                    break
-            new_cols.append(mapped if mapped else c)
-        df.columns = new_cols
-        df = df.loc[:, ~df.columns.duplicated()].copy()
-
-        keep_cols = ['Department','Title','Gender','Full Name','Position','Company',
-                     'City','Country','Language','Street','Phone','Postcode','Email']
-        for kc in keep_cols:
-            if kc not in df.columns:
-                df[kc] = np.nan
-        df2 = df[keep_cols].copy()
-
-        for c in ['Full Name','Company','Email','Country']:
-            df2[c] = df2[c].apply(normalize_text)
-
-        df2 = df2[(df2['Country'] != '') & ((df2['Full Name'] != '') | (df2['Company'] != ''))]
+        df2 = normalize_contacts(df, sheet, header_mapper, dhl_df)
         if not df2.empty:
-            df2['Source Sheet'] = sheet
             contacts_all.append(df2)
 
     if contacts_all:
         return pd.concat(contacts_all, ignore_index=True)
 
-    return pd.DataFrame(columns=['Department','Title','Gender','Full Name','Position','Company',
-                                 'City','Country','Language','Street','Phone','Postcode','Email','Source Sheet'])
+    return pd.DataFrame(columns=CONTACT_COLS + ['Source Sheet'])
+
+
+def iter_contact_chunks(af_input_xlsx: Path, chunk_rows: int = 5000, header_mapper=None, dhl_df: pd.DataFrame | None = None,
+                        max_rows: int = 0):
+    """Yield (sheet, normalized contacts DataFrame) per chunk of source rows.
 
+    Reads with openpyxl read-only iter_rows, so memory is bounded by chunk_rows
+    rather than by sheet size. max_rows > 0 reads only the first rows of each sheet.
+    """
+    for sheet, raw in iter_sheet_frames(af_input_xlsx, chunk_rows, max_rows, skip_sheet=is_skipped_sheet):
+        df2 = normalize_contacts(raw, sheet, header_mapper, dhl_df)
+        if not df2.empty:
+            yield sheet, df2
+
+
+@dataclass
+class CompiledTemplate:
+    """Final AI template parsed once: headers, constants and a prebuilt output row."""
+    headers: list
+    constants: dict
+    positions: dict              # header -> column positions (0-based); duplicates keep every position
+    skeleton: list               # output row with constants placed, '' elsewhere
+    constants_row: list          # row 2 of the output (constants only, None elsewhere)
+    column_widths: dict = field(default_factory=dict)   # 1-based column -> width from the template's <cols>
+    digest: str = ''
+
+    def build_row(self, order_no, date_str: str, fields: dict) -> list:
+        values = self.skeleton.copy()
+        for h, v in (('Order Number', order_no), ('Date', date_str), *fields.items()):
+            for pos in self.positions.get(h, ()):
+                values[pos] = v
+        return values
+
+    def apply_column_widths(self, ws):
+        for col, width in self.column_widths.items():
+            ws.column_dimensions[get_column_letter(col)].width = width
+
+
+_template_cache: OrderedDict = OrderedDict()
+_template_lock = threading.Lock()
+
+
+def _template_column_widths(template_xlsx: Path, sheet_title: str) -> dict:
+    """<col min max width> entries of the sheet, read from the XML up to <sheetData>."""
+    widths = {}
+    with zipfile.ZipFile(template_xlsx) as z:
+        member = dict(_sheet_targets(z)).get(sheet_title)
+        if member is None or member not in z.namelist():
+            return widths
+        with z.open(member) as f:
+            for event, el in ET.iterparse(f, events=('start',)):
+                if el.tag == f'{NS_MAIN}sheetData':
+                    break
+                if el.tag == f'{NS_MAIN}col' and el.get('width'):
+                    for c in range(int(el.get('min', 1)), int(el.get('max', el.get('min', 1))) + 1):
+                        widths[c] = float(el.get('width'))
+    return widths
 
-def run_final_ai_standard(af_input_xlsx: Path, country_code_xlsx: Path, template_xlsx: Path, out_xlsx: Path):
+
+def compile_template(template_xlsx: Path) -> CompiledTemplate:
+    """Parse the template (header row 1 + constants row 2) read-only; memoized by file content hash."""
+    template_xlsx = Path(template_xlsx)
+    digest = hashlib.sha1(template_xlsx.read_bytes()).hexdigest()
+    with _template_lock:
+        tpl = _template_cache.get(digest)
+        if tpl is not None:
+            _template_cache.move_to_end(digest)
+            return tpl
+
+    wb = load_workbook(template_xlsx, read_only=True)
+    try:
+        ws = wb.active
+        rows = ws.iter_rows(min_row=1, max_row=2, values_only=True)
+        template_headers = [normalize_text(v) for v in next(rows, ())]
+        second_row_values = list(next(rows, ()))
+        sheet_title = ws.title
+    finally:
+        wb.close()
+    constants = {}
+    for h, v in zip(template_headers, second_row_values):
+        if v is not None and str(v).strip() != '' and h not in COMPUTED_COLS:
+            constants[h] = v
+
+    positions = {}
+    for i, h in enumerate(template_headers):
+        positions.setdefault(h, []).append(i)
+    positions = {h: tuple(p) for h, p in positions.items()}
+
+    skeleton = [''] * len(template_headers)
+    constants_row = [None] * len(template_headers)
+    for h, v in constants.items():
+        for pos in positions[h]:
+            skeleton[pos] = v
+            constants_row[pos] = v
+
+    widths = _template_column_widths(template_xlsx, sheet_title)
+    tpl = CompiledTemplate(
+        headers=template_headers,
+        constants=constants,
+        positions=positions,
+        skeleton=skeleton,
+        constants_row=constants_row,
+        column_widths={c: w for c, w in widths.items() if c <= len(template_headers)},
+        digest=digest,
+    )
+    with _template_lock:
+        _template_cache[digest] = tpl
+        while len(_template_cache) > TEMPLATE_CACHE_MAX:
+            _template_cache.popitem(last=False)
+    return tpl
+
+
+def add_issue_flag_rule(ws, n_cols: int, last_row: int):
+    """Highlight data rows (from row 3) whose hidden flag column, right after the n_cols template columns, is 1."""
+    if last_row < 3:
+        return
+    flag_col = get_column_letter(n_cols + 1)
+    ws.conditional_formatting.add(
+        f'A3:{get_column_letter(n_cols)}{last_row}',
+        FormulaRule(formula=[f'${flag_col}3=1'], fill=HIGHLIGHT_FILL),
+    )
+
+
+def _map_country(country_raw: str, dhl_df: pd.DataFrame, country_memo: dict | None = None):
+    if country_memo is None:
+        return map_country_to_dhl(country_raw, dhl_df)
+    if country_raw not in country_memo:
+        country_memo[country_raw] = map_country_to_dhl(country_raw, dhl_df)
+    return country_memo[country_raw]
+
+
+def add_postcodes(contacts: pd.DataFrame, dhl_df: pd.DataFrame, country_memo: dict | None = None) -> pd.DataFrame:
+    """Resolve the postcodes of a block of normalized contacts at once (see workflows.postcodes).
+
+    Adds POSTCODE_COL (given, else extracted from the street) and
+    POSTCODE_VALID_COL, grouped by the DHL code each Country maps to.
+    """
+    codes = {c: normalize_text(_map_country(c, dhl_df, country_memo)[1]).upper() for c in contacts['Country'].unique()}
+    postcode, valid = resolve_postcodes(contacts['Postcode'].map(normalize_text), contacts['Street'].map(normalize_text),
+                                        contacts['Country'].map(codes))
+    return contacts.assign(**{POSTCODE_COL: postcode, POSTCODE_VALID_COL: valid})
+
+
+def transform_contact(row, dhl_df: pd.DataFrame, ddp_norm: set, country_memo: dict | None = None):
+    """One normalized contact -> (computed template fields, QC fields, issues)."""
+    issues = []
+
+    title = normalize_text(row.get('Title',''))
+    full_name = normalize_text(row.get('Full Name',''))
+    tkey = title.replace('.', '').strip().upper()
+    if tkey in {'MR','MRS','MS','DR'} and full_name:
+        to_name = f"{title.replace('.', '').strip().title()} {full_name}".strip()
+    else:
+        to_name = full_name if full_name else normalize_text(row.get('Company',''))
+    if not to_name:
+        issues.append('Missing name and company')
+
+    company = normalize_text(row.get('Company',''))
+    country_raw = normalize_text(row.get('Country',''))
+    dhl_name, dhl_code = _map_country(country_raw, dhl_df, country_memo)
+    if not dhl_name:
+        issues.append(f"Unknown country: '{country_raw}'")
+    ddp = ddp_flag(dhl_name, ddp_norm) if dhl_name else ''
+
+    street_raw = normalize_text(row.get('Street',''))
+    street_parts = street_raw.split(',', 1)
+    dest_building = trunc(street_parts[0].strip() if street_parts else '')
+    dest_street = trunc(street_parts[1].strip() if len(street_parts) > 1 else street_raw)
+
+    city = normalize_text(row.get('City',''))
+    if POSTCODE_COL in row:
+        postcode, postcode_ok = row[POSTCODE_COL], row[POSTCODE_VALID_COL]
+    else:
+        postcode, postcode_ok = resolve_postcode(normalize_text(row.get('Postcode','')), street_raw,
+                                                 normalize_text(dhl_code).upper())
+
+    if not street_raw:
+        issues.append('Missing street')
+    if not city:
+        issues.append('Missing city')
+    if not postcode_ok:
+        issues.append(f"Invalid postcode: '{postcode}'")
+
+    email = normalize_text(row.get('Email',''))
+    phone_raw = normalize_text(row.get('Phone',''))
+    phone_e164 = normalize_phone_e164(phone_raw, dhl_name or country_raw)
+    if not phone_e164:
+        issues.append('Missing phone')
+
+    fields = {
+        'To Name': to_name,
+        'Destination Building': dest_building,
+        'Destination Street': dest_street,
+        'Destination Suburb': '',
+        'Destination City': city.upper(),
+        'Destination Postcode': postcode,
+        'Destination State': '',
+        'Destination Country': (dhl_name if dhl_name else country_raw).upper(),
+        'Destination Email': email,
+        'Destination Phone': phone_e164,
+        'Company': company,
+        'Country Code': dhl_code if dhl_code else '',
+        'DDP': ddp,
+    }
+    qc = {
+        'Name': to_name,
+        'Email': email,
+        'Phone Raw': phone_raw,
+        'Phone E164': phone_e164,
+        'Country (raw)': country_raw,
+        'DHL Country': dhl_name or '',
+        'DHL Code': dhl_code or '',
+        'DDP': ddp,
+        'Issues': '; '.join(issues) if issues else ''
+    }
+    return fields, qc, issues
+
+
+def contact_fingerprint(row) -> str:
+    return row_fingerprint(row.get(c, '') for c in CONTACT_COLS)
+
+
+def _transform(row, dhl_df, ddp_norm, country_memo, store=None):
+    """transform_contact, reusing the previous run's result for an unchanged contact -> (..., reused)."""
+    if store is None:
+        return (*transform_contact(row, dhl_df, ddp_norm, country_memo), False)
+    fp = contact_fingerprint(row)
+    prev = store.get(fp)
+    if prev is not None:
+        fields, qc, issues = prev
+        return fields, qc, issues, True
+    fields, qc, issues = transform_contact(row, dhl_df, ddp_norm, country_memo)
+    store.put(fp, [fields, qc, issues])
+    return fields, qc, issues, False
+
+
+def run_final_ai_standard(af_input_xlsx: Path, country_code_xlsx: Path, template_xlsx: Path, out_xlsx: Path,
+                          chunk_rows: int = 0, header_mapper=None, highlight: str = 'fill', fingerprint_file='',
+                          formats=('xlsx',), workflow: str = 'final_ai'):
+    """Build the final AI workbook.
+
+    chunk_rows > 0 switches to the bounded-memory chunked pipeline;
+    header_mapper replaces the AF_HEADER_MAP substring mapping (see normalize_contacts);
+    highlight is one of HIGHLIGHT_MODES;
+    fingerprint_file enables diff mode: contacts unchanged since the run that
+    wrote that sidecar reuse its results, and _QC gains a Reused column;
+    formats picks from common.OUTPUT_FORMATS: CSV/Parquet tables go to
+    tables_dir(out_xlsx), and out_xlsx is only written when 'xlsx' is included.
+    workflow labels the run in the metrics registry (workflows.metrics).
+    """
+    if highlight not in HIGHLIGHT_MODES:
+        raise ValueError(f'Unknown highlight mode: {highlight}')
+    formats = check_output_formats(formats)
     af_input_xlsx = Path(af_input_xlsx)
     country_code_xlsx = Path(country_code_xlsx)
     template_xlsx = Path(template_xlsx)
@@ -250,154 +569,443 @@ def run_final_ai_standard(af_input_xlsx: Path, country_code_xlsx: Path, template
         if not p.exists():
             raise FileNotFoundError(f'Missing file: {p}')
 
-    dhl_df, ddp_norm = load_dhl_country_and_ddp(country_code_xlsx)
-    contacts = build_contacts_from_af(af_input_xlsx)
-
-    wb_template = load_workbook(template_xlsx)
-    ws_template = wb_template.active
-
-    template_headers = [normalize_text(c.value) for c in next(ws_template.iter_rows(min_row=1, max_row=1))]
-    second_row_values = [c.value for c in next(ws_template.iter_rows(min_row=2, max_row=2))]
-
-    computed_cols = {
-        'Order Number','Date','To Name',
-        'Destination Building','Destination Street','Destination Suburb','Destination City',
-        'Destination Postcode','Destination State','Destination Country',
-        'Destination Email','Destination Phone','Company','Country Code','DDP'
-    }
-
-    constants = {}
-    for h, v in zip(template_headers, second_row_values):
-        if v is not None and str(v).strip() != '' and h not in computed_cols:
-            constants[h] = v
-
-    header_index = {h: i+1 for i, h in enumerate(template_headers)}
+    with track_run(workflow) as run:
+        with run.stage('load_references'):
+            dhl_df, ddp_norm = load_dhl_country_and_ddp(country_code_xlsx)
+            tpl = compile_template(template_xlsx)
+            store = open_fingerprints(fingerprint_file, context_digest('final_ai', file_digest(country_code_xlsx), FORMATS_DIGEST))
+        with run.stage('build'):
+            stats = _build_final_ai(af_input_xlsx, out_xlsx, dhl_df, ddp_norm, tpl, chunk_rows, header_mapper, highlight, store,
+                                    formats)
+        run.rows(stats['rows'])
+    return stats
+
+
+def _build_final_ai(af_input_xlsx: Path, out_xlsx: Path, dhl_df, ddp_norm, tpl: CompiledTemplate, chunk_rows: int = 0,
+                    header_mapper=None, highlight: str = 'fill', store=None, formats=('xlsx',), qc_sink: list = None):
+    """run_final_ai_standard on reference data that is already parsed; store is committed (or discarded) here.
+
+    qc_sink, if given, receives the QC row of every flagged contact.
+    """
+    wb_out_xlsx = out_xlsx if 'xlsx' in formats else None
+    try:
+        with TableOutput(tables_dir(out_xlsx), formats, replace=True) as tables:
+            if chunk_rows and chunk_rows > 0:
+                stats = _run_chunked(af_input_xlsx, wb_out_xlsx, dhl_df, ddp_norm, tpl, chunk_rows, header_mapper, highlight,
+                                     store, tables, qc_sink)
+            else:
+                stats = _run_in_memory(af_input_xlsx, wb_out_xlsx, dhl_df, ddp_norm, tpl, header_mapper, highlight, store, tables,
+                                       qc_sink)
+    except BaseException:
+        if store is not None:
+            store.discard()
+        raise
+    if store is not None:
+        stats.update(store.commit())
+    if tables.paths:
+        stats['tables'] = [str(p) for p in tables.paths]
+    return stats
+
+
+def _run_in_memory(af_input_xlsx: Path, out_xlsx, dhl_df, ddp_norm, tpl: CompiledTemplate, header_mapper=None,
+                   highlight: str = 'fill', store=None, tables: TableOutput = None, qc_sink: list = None):
+    """out_xlsx=None skips the workbook; tables gets one table per Source Sheet + _QC."""
+    contacts = build_contacts_from_af(af_input_xlsx, header_mapper, dhl_df)
+
+    n_cols = len(tpl.headers)
+    conditional = highlight == 'conditional'
+    qc_headers = QC_HEADERS + ['Reused'] if store is not None else QC_HEADERS
     date_str = today_str()
 
-    wb_out = Workbook()
-    if 'Sheet' in wb_out.sheetnames:
-        del wb_out['Sheet']
+    wb_out = None
+    if out_xlsx is not None:
+        wb_out = Workbook()
+        if 'Sheet' in wb_out.sheetnames:
+            del wb_out['Sheet']
 
     qc_rows = []
     total_highlighted = 0
+    country_memo = {}
 
     if contacts.empty:
-        qc_ws = wb_out.create_sheet('_QC')
-        qc_headers = ['Order Number','Source Sheet','Name','Email','Phone Raw','Phone E164','Country (raw)','DHL Country','DHL Code','DDP','Issues']
-        qc_ws.append(qc_headers)
-        wb_out.save(out_xlsx)
+        if wb_out is not None:
+            qc_ws = wb_out.create_sheet('_QC')
+            qc_ws.append(qc_headers)
+            wb_out.save(out_xlsx)
+        tables.write(pd.DataFrame(columns=qc_headers), '_QC')
         return {'rows': 0, 'highlighted': 0, 'qc_rows': 0}
+    contacts = add_postcodes(contacts, dhl_df, country_memo)
 
     for source_sheet, sheet_data in contacts.groupby('Source Sheet'):
-        ws = wb_out.create_sheet(title=str(source_sheet)[:31])
-
-        # headers
-        for j, h in enumerate(template_headers, start=1):
-            ws.cell(row=1, column=j, value=h)
-        # constants row
-        for h, col_idx in header_index.items():
-            if h in constants:
-                ws.cell(row=2, column=col_idx, value=constants[h])
+        ws = None
+        if wb_out is not None:
+            ws = wb_out.create_sheet(title=str(source_sheet)[:31])
+            tpl.apply_column_widths(ws)
+
+            # headers
+            for j, h in enumerate(tpl.headers, start=1):
+                ws.cell(row=1, column=j, value=h)
+            if conditional:
+                ws.cell(row=1, column=n_cols+1, value=ISSUE_FLAG_HEADER)
+                ws.column_dimensions[get_column_letter(n_cols+1)].hidden = True
+            # constants row
+            for j, v in enumerate(tpl.constants_row, start=1):
+                if v is not None:
+                    ws.cell(row=2, column=j, value=v)
 
         order_no = 1
         highlighted_sheet = 0
+        table_rows = []
 
         for _, row in sheet_data.iterrows():
-            issues = []
+            fields, qc, issues, reused = _transform(row, dhl_df, ddp_norm, country_memo, store)
 
-            title = normalize_text(row.get('Title',''))
-            full_name = normalize_text(row.get('Full Name',''))
-            tkey = title.replace('.', '').strip().upper()
-            if tkey in {'MR','MRS','MS','DR'} and full_name:
-                to_name = f"{title.replace('.', '').strip().title()} {full_name}".strip()
-            else:
-                to_name = full_name if full_name else normalize_text(row.get('Company',''))
-            if not to_name:
-                issues.append('Missing name and company')
-
-            company = normalize_text(row.get('Company',''))
-            country_raw = normalize_text(row.get('Country',''))
-            dhl_name, dhl_code = map_country_to_dhl(country_raw, dhl_df)
-            if not dhl_name:
-                issues.append(f"Unknown country: '{country_raw}'")
-            ddp = ddp_flag(dhl_name, ddp_norm) if dhl_name else ''
-
-            street_raw = normalize_text(row.get('Street',''))
-            street_parts = street_raw.split(',', 1)
-            dest_building = trunc(street_parts[0].strip() if street_parts else '')
-            dest_street = trunc(street_parts[1].strip() if len(street_parts) > 1 else street_raw)
-
-            city = normalize_text(row.get('City',''))
-            postcode = normalize_text(row.get('Postcode',''))
-            if not postcode:
-                m = re.search(r"\b\d{5}(-\d{4})?\b|\b[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}\b|\b\d{4,6}\b", street_raw, re.I)
-                if m:
-                    postcode = m.group(0).strip()
-
-            if not street_raw:
-                issues.append('Missing street')
-            if not city:
-                issues.append('Missing city')
-
-            email = normalize_text(row.get('Email',''))
-            phone_raw = normalize_text(row.get('Phone',''))
-            phone_e164 = normalize_phone_e164(phone_raw, dhl_name or country_raw)
-            if not phone_e164:
-                issues.append('Missing phone')
-
-            rec = {h: '' for h in template_headers}
-            rec.update(constants)
-            rec['Order Number'] = order_no
-            rec['Date'] = date_str
-            rec['To Name'] = to_name
-            rec['Destination Building'] = dest_building
-            rec['Destination Street'] = dest_street
-            rec['Destination Suburb'] = ''
-            rec['Destination City'] = city.upper()
-            rec['Destination Postcode'] = postcode
-            rec['Destination State'] = ''
-            rec['Destination Country'] = (dhl_name if dhl_name else country_raw).upper()
-            rec['Destination Email'] = email
-            rec['Destination Phone'] = phone_e164
-            rec['Company'] = company
-            rec['Country Code'] = dhl_code if dhl_code else ''
-            rec['DDP'] = ddp
-
-            highlight = bool(issues)
-            if highlight:
+            values = tpl.build_row(order_no, date_str, fields)
+
+            flagged = bool(issues)
+            if flagged:
                 highlighted_sheet += 1
 
-            out_row = 2 + order_no
-            for h, col_idx in header_index.items():
-                ws.cell(row=out_row, column=col_idx, value=rec.get(h, ''))
-            if highlight:
-                for c in range(1, len(template_headers)+1):
-                    ws.cell(row=out_row, column=c).fill = HIGHLIGHT_FILL
-
-            qc_rows.append({
-                'Order Number': order_no,
-                'Source Sheet': str(source_sheet),
-                'Name': to_name,
-                'Email': email,
-                'Phone Raw': phone_raw,
-                'Phone E164': phone_e164,
-                'Country (raw)': country_raw,
-                'DHL Country': dhl_name or '',
-                'DHL Code': dhl_code or '',
-                'DDP': ddp,
-                'Issues': '; '.join(issues) if issues else ''
-            })
+            if ws is not None:
+                out_row = 2 + order_no
+                for col_idx, v in enumerate(values, start=1):
+                    ws.cell(row=out_row, column=col_idx, value=v)
+                if flagged and conditional:
+                    ws.cell(row=out_row, column=n_cols+1, value=1)
+                elif flagged:
+                    for c in range(1, n_cols+1):
+                        ws.cell(row=out_row, column=c).fill = HIGHLIGHT_FILL
+            if tables.formats:
+                table_rows.append(values)
+
+            qc_rows.append({'Order Number': order_no, 'Source Sheet': str(source_sheet), **qc, 'Reused': 'Y' if reused else ''})
+            if flagged and qc_sink is not None:
+                qc_sink.append(qc_rows[-1])
 
             order_no += 1
 
+        if ws is not None and conditional:
+            add_issue_flag_rule(ws, n_cols, order_no + 1)
         total_highlighted += highlighted_sheet
+        if tables.formats:
+            tables.write(pd.DataFrame(table_rows, columns=tpl.headers), str(source_sheet))
 
     # QC sheet
-    qc_ws = wb_out.create_sheet('_QC')
-    qc_headers = ['Order Number','Source Sheet','Name','Email','Phone Raw','Phone E164','Country (raw)','DHL Country','DHL Code','DDP','Issues']
-    qc_ws.append(qc_headers)
-    for r in qc_rows:
-        qc_ws.append([r.get(h,'') for h in qc_headers])
-
-    wb_out.save(out_xlsx)
+    if wb_out is not None:
+        qc_ws = wb_out.create_sheet('_QC')
+        qc_ws.append(qc_headers)
+        for r in qc_rows:
+            qc_ws.append([r.get(h,'') for h in qc_headers])
+        wb_out.save(out_xlsx)
+    if tables.formats:
+        tables.write(pd.DataFrame([[r.get(h, '') for h in qc_headers] for r in qc_rows], columns=qc_headers), '_QC')
     return {'rows': len(qc_rows), 'highlighted': total_highlighted, 'qc_rows': len(qc_rows)}
+
+
+def _run_chunked(af_input_xlsx: Path, out_xlsx, dhl_df, ddp_norm, tpl: CompiledTemplate, chunk_rows: int,
+                 header_mapper=None, highlight: str = 'fill', store=None, tables: TableOutput = None, qc_sink: list = None):
+    """Chunked variant of run_final_ai_standard.
+
+    Source sheets are streamed in row chunks, output goes through a write-only
+    workbook (skipped when out_xlsx is None) and QC rows are spooled to a
+    temporary CSV, so memory is bounded by chunk_rows. Tables are appended
+    chunk by chunk. Output sheets follow source order.
+    """
+    date_str = today_str()
+    n_cols = len(tpl.headers)
+    conditional = highlight == 'conditional'
+    qc_headers = QC_HEADERS + ['Reused'] if store is not None else QC_HEADERS
+    wb_out = Workbook(write_only=True) if out_xlsx is not None else None
+    country_memo = {}
+    n_rows = 0
+    total_highlighted = 0
+
+    with tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as qc_spool:
+        qc_writer = csv.writer(qc_spool)
+        ws = None
+        current_sheet = None
+        order_no = 1
+
+        for source_sheet, chunk in iter_contact_chunks(af_input_xlsx, chunk_rows, header_mapper, dhl_df):
+            if source_sheet != current_sheet:
+                if ws is not None and conditional:
+                    add_issue_flag_rule(ws, n_cols, order_no + 1)
+                current_sheet = source_sheet
+                if wb_out is not None:
+                    ws = wb_out.create_sheet(title=str(source_sheet)[:31])
+                    # column styles must be set before the first row in write-only mode
+                    tpl.apply_column_widths(ws)
+                    if conditional:
+                        ws.column_dimensions[get_column_letter(n_cols+1)].hidden = True
+                        ws.append(tpl.headers + [ISSUE_FLAG_HEADER])
+                    else:
+                        ws.append(tpl.headers)
+                    ws.append(tpl.constants_row)
+                order_no = 1
+
+            table_rows, table_qc = [], []
+            chunk = add_postcodes(chunk, dhl_df, country_memo)
+            for row in chunk.to_dict('records'):
+                fields, qc, issues, reused = _transform(row, dhl_df, ddp_norm, country_memo, store)
+
+                values = tpl.build_row(order_no, date_str, fields)
+
+                if issues:
+                    total_highlighted += 1
+                if ws is not None:
+                    if issues and conditional:
+                        ws.append(values + [1])
+                    elif issues:
+                        cells = []
+                        for v in values:
+                            cell = WriteOnlyCell(ws, value=v)
+                            cell.fill = HIGHLIGHT_FILL
+                            cells.append(cell)
+                        ws.append(cells)
+                    else:
+                        ws.append(values)
+
+                qc_row = {'Order Number': order_no, 'Source Sheet': str(source_sheet), **qc, 'Reused': 'Y' if reused else ''}
+                qc_values = [qc_row.get(h, '') for h in qc_headers]
+                if issues and qc_sink is not None:
+                    qc_sink.append(qc_row)
+                if wb_out is not None:
+                    qc_writer.writerow(qc_values)
+                if tables.formats:
+                    table_rows.append(values)
+                    table_qc.append(qc_values)
+                order_no += 1
+                n_rows += 1
+
+            if tables.formats:
+                tables.write(pd.DataFrame(table_rows, columns=tpl.headers), str(source_sheet))
+                tables.write(pd.DataFrame(table_qc, columns=qc_headers), '_QC')
+
+        if ws is not None and conditional:
+            add_issue_flag_rule(ws, n_cols, order_no + 1)
+        if n_rows == 0:
+            tables.write(pd.DataFrame(columns=qc_headers), '_QC')
+
+        if wb_out is not None:
+            qc_ws = wb_out.create_sheet('_QC')
+            qc_ws.append(qc_headers)
+            qc_spool.seek(0)
+            for r in csv.reader(qc_spool):
+                r[0] = int(r[0])
+                qc_ws.append(r)
+
+            wb_out.save(out_xlsx)
+
+    return {'rows': n_rows, 'highlighted': total_highlighted, 'qc_rows': n_rows}
+
+
+BATCH_ZIP = 'FINAL_AI_OUTPUTS.zip'
+QC_SUMMARY_XLSX = '_QC_SUMMARY.xlsx'
+
+# (dhl_df, ddp_norm, tpl) of the batch this worker process serves
+_batch_refs = None
+
+
+def _init_batch_worker(dhl_df, ddp_norm, tpl):
+    """Pool initializer: the parsed reference data reaches each worker once, not with every task."""
+    global _batch_refs
+    _batch_refs = (dhl_df, ddp_norm, tpl)
+
+
+def issue_type(issue: str) -> str:
+    """"Unknown country: 'Narnia'" -> 'Unknown country'."""
+    return issue.split(':', 1)[0].strip()
+
+
+def _batch_job(af_input_xlsx: str, out_xlsx: str, chunk_rows: int, highlight: str, formats: tuple, smart: bool,
+               fingerprint_file: str, fingerprint_context: str, refs=None):
+    """One AF Input of a batch -> (stats, flagged QC rows)."""
+    dhl_df, ddp_norm, tpl = refs or _batch_refs
+    mapper = None
+    if smart:
+        from .final_ai_smart import SmartHeaderMapper
+        mapper = SmartHeaderMapper()
+    flagged = []
+    t0 = time.perf_counter()
+    stats = _build_final_ai(Path(af_input_xlsx), Path(out_xlsx), dhl_df, ddp_norm, tpl, chunk_rows, mapper, highlight,
+                            open_fingerprints(fingerprint_file, fingerprint_context), formats, flagged)
+    stats['seconds'] = round(time.perf_counter() - t0, 3)
+    if mapper is not None:
+        stats['layouts_inferred'] = mapper.inferred
+        stats['layouts_reused'] = mapper.reused
+    return stats, flagged
+
+
+def run_final_ai_batch(af_inputs: list, country_code_xlsx: Path, template_xlsx: Path, out_dir: Path, workers: int = 0,
+                       chunk_rows: int = 0, highlight: str = 'fill', fingerprint_file='', formats=('xlsx',),
+                       smart: bool = False, progress=None) -> dict:
+    """Build the final AI output for many AF Input files against one country code list and template.
+
+    The references are parsed once here and passed to each worker process once,
+    through the pool initializer; tasks carry only file paths. workers <= 1
+    runs the files in this process. Each input gets
+    <stem>_final_AI[_smart]_output.xlsx (and/or its tables) in out_dir, and
+    _QC_SUMMARY.xlsx aggregates the batch: per-file counts, issue counts by
+    type and every flagged QC row with its file. Everything is packed into
+    FINAL_AI_OUTPUTS.zip. A file that fails is reported in the summary and the
+    others still run. progress(done_files, total_files, name) is called as
+    files finish. With fingerprint_file, each input gets its own sidecar
+    derived from that name.
+    """
+    if highlight not in HIGHLIGHT_MODES:
+        raise ValueError(f'Unknown highlight mode: {highlight}')
+    formats = check_output_formats(formats)
+    af_inputs = [Path(p) for p in af_inputs]
+    if not af_inputs:
+        raise ValueError('No AF Input files given')
+    country_code_xlsx = Path(country_code_xlsx)
+    template_xlsx = Path(template_xlsx)
+    out_dir = Path(out_dir)
+    for p in af_inputs + [country_code_xlsx, template_xlsx]:
+        if not p.exists():
+            raise FileNotFoundError(f'Missing file: {p}')
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with track_run('final_ai_smart_batch' if smart else 'final_ai_batch') as run:
+        stats = _run_batch(af_inputs, country_code_xlsx, template_xlsx, out_dir, workers, chunk_rows, highlight,
+                           fingerprint_file, formats, smart, progress, run)
+        run.rows(stats['rows'])
+    return stats
+
+
+def _run_batch(af_inputs: list, country_code_xlsx: Path, template_xlsx: Path, out_dir: Path, workers: int, chunk_rows: int,
+               highlight: str, fingerprint_file, formats, smart: bool, progress, run: RunTracker) -> dict:
+    """run_final_ai_batch on validated arguments; the workers' durations are recorded as stage 'file'."""
+    with run.stage('load_references'):
+        refs = (*load_dhl_country_and_ddp(country_code_xlsx), compile_template(template_xlsx))
+    fp_context = context_digest('final_ai', file_digest(country_code_xlsx), FORMATS_DIGEST) if fingerprint_file else ''
+    suffix = '_final_AI_smart_output.xlsx' if smart else '_final_AI_output.xlsx'
+    jobs = []
+    for af_input_xlsx, stem in zip(af_inputs, unique_stems(af_inputs)):
+        fp = ''
+        if fingerprint_file:
+            fp = Path(fingerprint_file)
+            fp = str(fp.with_name(f'{fp.stem}.{stem}{fp.suffix}'))
+        jobs.append((str(af_input_xlsx), str(out_dir / f'{stem}{suffix}'), chunk_rows, highlight, formats, smart,
+                     fp, fp_context))
+
+    results = {}
+
+    def finished(n, job, result):
+        results[job[0]] = result
+        if progress is not None:
+            progress(n, len(jobs), Path(job[0]).name)
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    t0 = time.perf_counter()
+    if workers <= 1:
+        for n, job in enumerate(jobs, start=1):
+            try:
+                result = _batch_job(*job, refs=refs)
+            except Exception as e:
+                result = e
+            finished(n, job, result)
+    else:
+        # spawn: the app runs this from a threaded server process, where fork is unsafe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_batch_worker, initargs=refs) as pool:
+            futures = {pool.submit(_batch_job, *job): job for job in jobs}
+            for n, fut in enumerate(as_completed(futures), start=1):
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    result = e
+                finished(n, futures[fut], result)
+    seconds = round(time.perf_counter() - t0, 3)
+    run.observe('files', seconds)
+
+    qc_headers = QC_HEADERS + ['Reused'] if fingerprint_file else QC_HEADERS
+    file_rows, flagged_rows, issue_rows, issue_files = [], [], {}, {}
+    outputs, table_files = [], []
+    for job in jobs:
+        name = Path(job[0]).name
+        result = results[job[0]]
+        if isinstance(result, Exception):
+            file_rows.append({'File': name, 'Output': '', 'Rows': 0, 'Highlighted': 0, 'Seconds': None,
+                              'Error': f'{type(result).__name__}: {result}'})
+            continue
+        stats, flagged = result
+        run.observe('file', stats['seconds'])
+        if 'xlsx' in formats:
+            outputs.append(Path(job[1]))
+        table_files.extend(stats.get('tables', []))
+        file_rows.append({'File': name, 'Output': Path(job[1]).name if 'xlsx' in formats else '', 'Rows': stats['rows'],
+                          'Highlighted': stats['highlighted'], 'Seconds': stats['seconds'], 'Error': ''})
+        for r in flagged:
+            flagged_rows.append([name] + [r.get(h, '') for h in qc_headers])
+            for t in {issue_type(i) for i in r['Issues'].split('; ')}:
+                issue_rows[t] = issue_rows.get(t, 0) + 1
+                issue_files.setdefault(t, set()).add(name)
+
+    files_df = pd.DataFrame(file_rows, columns=['File', 'Output', 'Rows', 'Highlighted', 'Seconds', 'Error'])
+    issues_df = pd.DataFrame([[t, n, len(issue_files[t])] for t, n in sorted(issue_rows.items(), key=lambda kv: -kv[1])],
+                             columns=['Issue', 'Rows', 'Files'])
+    flagged_df = pd.DataFrame(flagged_rows, columns=['File'] + qc_headers)
+
+    summary_xlsx = out_dir / QC_SUMMARY_XLSX
+    if 'xlsx' in formats:
+        with ExcelOutput(summary_xlsx) as writer:
+            writer.write(files_df, 'Files')
+            writer.write(issues_df, 'Issues')
+            writer.write(flagged_df, 'Flagged')
+    with TableOutput(tables_dir(summary_xlsx), formats, replace=True) as tables:
+        tables.write(files_df, '_QC_FILES')
+        tables.write(issues_df, '_QC_ISSUES')
+        tables.write(flagged_df, '_QC_FLAGGED')
+    table_files.extend(str(p) for p in tables.paths)
+
+    zip_path = out_dir / BATCH_ZIP
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        for p in outputs + ([summary_xlsx] if 'xlsx' in formats else []) + [Path(t) for t in table_files]:
+            z.write(p, arcname=str(p.relative_to(out_dir)))
+
+    return {
+        'files': len(jobs),
+        'failed': int((files_df['Error'] != '').sum()),
+        'workers': workers,
+        'rows': int(files_df['Rows'].sum()),
+        'highlighted': int(files_df['Highlighted'].sum()),
+        'seconds': seconds,
+        'outputs': [str(p) for p in outputs],
+        'summary_xlsx': str(summary_xlsx) if 'xlsx' in formats else '',
+        'tables': table_files,
+        'zip_path': str(zip_path),
+    }
+
+
+def preview_final_ai(af_input_xlsx: Path, country_code_xlsx: Path, template_xlsx: Path, n_rows: int = PREVIEW_ROWS,
+                     header_mapper=None, sample_rows: int = 0) -> dict:
+    """Run the same transforms on the first n_rows of each AF Input sheet; nothing is written.
+
+    Sheets are streamed read-only, so this stays fast on large inputs. Mappers
+    that look at cell contents get sample_rows rows to decide on, as in a full run.
+    -> {'rows': output rows (Source Sheet + template columns), 'qc': QC rows with issues,
+        'mapping': which AF Input column feeds which contact field, per sheet}
+    """
+    read_rows = max(n_rows, sample_rows)
+    dhl_df, ddp_norm = load_dhl_country_and_ddp(country_code_xlsx)
+    tpl = compile_template(template_xlsx)
+    mapper = header_mapper or standard_header_mapper
+    date_str = today_str()
+    country_memo = {}
+
+    rows, qc_rows, mapping = [], [], []
+    for sheet, raw in iter_sheet_frames(af_input_xlsx, read_rows, read_rows, skip_sheet=is_skipped_sheet):
+        for src, dst in zip(raw.columns, mapper(raw, dhl_df)):
+            mapping.append({'Source Sheet': sheet, 'AF Input column': src, 'Mapped to': dst if dst in CONTACT_COLS else ''})
+        contacts = add_postcodes(normalize_contacts(raw, sheet, mapper, dhl_df).iloc[:n_rows], dhl_df, country_memo)
+        for order_no, row in enumerate(contacts.to_dict('records'), start=1):
+            fields, qc, _ = transform_contact(row, dhl_df, ddp_norm, country_memo)
+            rows.append([sheet] + tpl.build_row(order_no, date_str, fields))
+            qc_rows.append({'Order Number': order_no, 'Source Sheet': sheet, **qc})
+
+    return {
+        'rows': pd.DataFrame(rows, columns=['Source Sheet'] + tpl.headers),
+        'qc': pd.DataFrame(qc_rows, columns=QC_HEADERS),
+        'mapping': pd.DataFrame(mapping, columns=['Source Sheet', 'AF Input column', 'Mapped to']),
+    }
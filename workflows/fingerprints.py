@@ -0,0 +1,127 @@
+"""Row fingerprints for incremental (diff) runs.
+
+A run in diff mode fingerprints every normalized input row and stores the
+row's result under that fingerprint in a small SQLite sidecar next to its
+outputs. The next run over a mostly unchanged list looks each fingerprint up
+in the previous sidecar and reuses the stored result instead of computing it
+again; only new or changed rows are processed.
+
+The sidecar also records a context string (reference data digest, options,
+format version). A sidecar written under a different context is ignored, so
+changing the country list or the enricher options never reuses stale results.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import hashlib
+import json
+import os
+import sqlite3
+
+FINGERPRINT_VERSION = '1'
+BATCH_ROWS = 5_000
+
+SCHEMA = """
+CREATE TABLE results (fp TEXT PRIMARY KEY, result TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+"""
+
+
+def row_fingerprint(values) -> str:
+    # str() rather than normalize_text(): rows are already normalized and this runs once per row
+    return hashlib.sha1('\x1f'.join(map(str, values)).encode('utf-8')).digest().hex()
+
+
+def context_digest(*parts) -> str:
+    return hashlib.sha1(json.dumps([FINGERPRINT_VERSION, *parts], default=str).encode('utf-8')).hexdigest()
+
+
+class FingerprintStore:
+    """Previous run's results (read-only) + this run's results (written to a temp file).
+
+    commit() atomically replaces the sidecar with this run's rows only, so
+    contacts removed from the input drop out of it.
+    """
+
+    def __init__(self, path: Path, context: str):
+        self.path = Path(path)
+        self.context = context
+        self.reused = 0
+        self.computed = 0
+        self._prev = None
+        if self.path.exists():
+            try:
+                con = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+                row = con.execute("SELECT value FROM meta WHERE key = 'context'").fetchone()
+                if row and row[0] == context:
+                    self._prev = con
+                else:
+                    con.close()
+            except sqlite3.Error:
+                self._prev = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+        self._con = sqlite3.connect(self._tmp_path)
+        self._con.executescript(SCHEMA)
+        self._batch = []
+
+    @property
+    def has_previous(self) -> bool:
+        return self._prev is not None
+
+    def get(self, fp: str):
+        """Previous result for fp (carried over into this run's sidecar), else None."""
+        if self._prev is None:
+            return None
+        row = self._prev.execute('SELECT result FROM results WHERE fp = ?', (fp,)).fetchone()
+        if row is None:
+            return None
+        self._add(fp, row[0])
+        self.reused += 1
+        return json.loads(row[0])
+
+    def put(self, fp: str, result):
+        """Record a freshly computed result."""
+        self._add(fp, json.dumps(result, default=str))
+        self.computed += 1
+
+    def _add(self, fp: str, text: str):
+        self._batch.append((fp, text))
+        if len(self._batch) >= BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._batch:
+            self._con.executemany('INSERT OR REPLACE INTO results VALUES (?, ?)', self._batch)
+            self._batch = []
+
+    def commit(self) -> dict:
+        self._flush()
+        self._con.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('context', self.context), ('reused', str(self.reused)), ('computed', str(self.computed)),
+        ])
+        self._con.commit()
+        self._close()
+        os.replace(self._tmp_path, self.path)
+        return {'reused_rows': self.reused, 'computed_rows': self.computed}
+
+    def discard(self):
+        self._close()
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+
+    def _close(self):
+        if self._prev is not None:
+            self._prev.close()
+            self._prev = None
+        self._con.close()
+
+
+def open_fingerprints(path, context: str) -> FingerprintStore | None:
+    if not path:
+        return None
+    return FingerprintStore(Path(path), context)
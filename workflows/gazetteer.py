@@ -0,0 +1,171 @@
+"""Offline gazetteer for the postal enricher.
+
+Built once from a GeoNames-style postal TSV (e.g. allCountries.txt or a
+per-country file from download.geonames.org/export/zip/, optionally still
+zipped). Columns, tab separated, no header:
+
+    country code, postal code, place name, admin name1, admin code1,
+    admin name2, admin code2, admin name3, admin code3, latitude, longitude, accuracy
+
+The result is a small SQLite file with one row per (country, normalized
+place name) in a WITHOUT ROWID table, i.e. stored sorted by its primary key,
+so a lookup is a single B-tree seek. The enricher consults it before any
+DHL API call.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+import csv
+import io
+import os
+import sqlite3
+import zipfile
+
+from .common import norm_key
+
+BATCH_ROWS = 50_000
+MEMO_MAX = 100_000
+
+SCHEMA = """
+CREATE TABLE city_postal (
+    iso2 TEXT NOT NULL,
+    city_key TEXT NOT NULL,
+    city TEXT NOT NULL,
+    postal TEXT NOT NULL,
+    n_postals INTEGER NOT NULL,
+    PRIMARY KEY (iso2, city_key)
+) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+"""
+
+
+@contextmanager
+def _open_tsv(tsv_path: Path):
+    """Text stream over the TSV; a .zip is read from its first .txt/.tsv member.
+    The archive is closed with the stream."""
+    tsv_path = Path(tsv_path)
+    if not zipfile.is_zipfile(tsv_path):
+        with open(tsv_path, encoding='utf-8', newline='') as f:
+            yield f
+        return
+    with zipfile.ZipFile(tsv_path) as z:
+        members = [n for n in z.namelist() if n.lower().endswith(('.txt', '.tsv')) and 'readme' not in n.lower()]
+        if not members:
+            raise ValueError(f'No .txt/.tsv member in {tsv_path.name}')
+        with io.TextIOWrapper(z.open(members[0]), encoding='utf-8', newline='') as f:
+            yield f
+
+
+def build_gazetteer(tsv_path: Path, db_path: Path, countries=None) -> dict:
+    """Import a GeoNames postal TSV into db_path (replaced atomically).
+
+    countries: optional iterable of ISO2 codes to keep.
+    The representative postal code of a place is its lowest code.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    keep = {c.strip().upper() for c in countries} if countries else None
+    tmp_path = db_path.with_name(f'.{db_path.name}.{os.getpid()}.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    con = sqlite3.connect(tmp_path)
+    rows_read = 0
+    try:
+        con.executescript(SCHEMA)
+        con.execute('CREATE TEMP TABLE raw (iso2 TEXT, city_key TEXT, city TEXT, postal TEXT)')
+        with _open_tsv(tsv_path) as f:
+            batch = []
+            for rec in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+                if len(rec) < 3:
+                    continue
+                iso2 = rec[0].strip().upper()
+                postal = rec[1].strip()
+                city = rec[2].strip()
+                if not iso2 or not postal or not city or (keep is not None and iso2 not in keep):
+                    continue
+                rows_read += 1
+                batch.append((iso2, norm_key(city), city, postal))
+                if len(batch) >= BATCH_ROWS:
+                    con.executemany('INSERT INTO raw VALUES (?,?,?,?)', batch)
+                    batch = []
+            if batch:
+                con.executemany('INSERT INTO raw VALUES (?,?,?,?)', batch)
+
+        con.execute("""
+            INSERT INTO city_postal
+            SELECT iso2, city_key, MIN(city), MIN(postal), COUNT(DISTINCT postal)
+            FROM raw WHERE city_key != ''
+            GROUP BY iso2, city_key
+        """)
+        con.execute('DROP TABLE raw')
+        places = con.execute('SELECT COUNT(*) FROM city_postal').fetchone()[0]
+        n_countries = con.execute('SELECT COUNT(DISTINCT iso2) FROM city_postal').fetchone()[0]
+        con.executemany('INSERT INTO meta VALUES (?,?)', [
+            ('source', Path(tsv_path).name), ('rows_read', str(rows_read)),
+            ('places', str(places)), ('countries', str(n_countries)),
+        ])
+        con.commit()
+        con.execute('VACUUM')
+    except BaseException:
+        # nothing half-built is left next to the target
+        con.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        con.close()
+    os.replace(tmp_path, db_path)
+    return {'rows_read': rows_read, 'places': places, 'countries': n_countries, 'db_path': db_path}
+
+
+class Gazetteer:
+    """Read-only lookups with an in-process memo (misses are memoized too)."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._con = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False)
+        self._memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, iso2: str, city: str) -> dict | None:
+        """-> {'postal', 'city', 'n_postals'} for a known place, else None."""
+        key = (iso2, norm_key(city))
+        if key in self._memo:
+            res = self._memo[key]
+        else:
+            row = self._con.execute(
+                'SELECT city, postal, n_postals FROM city_postal WHERE iso2 = ? AND city_key = ?', key
+            ).fetchone()
+            res = {'city': row[0], 'postal': row[1], 'n_postals': row[2]} if row else None
+            if len(self._memo) >= MEMO_MAX:
+                self._memo.clear()
+            self._memo[key] = res
+        if res is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return res
+
+    def info(self) -> dict:
+        return dict(self._con.execute('SELECT key, value FROM meta').fetchall())
+
+    def close(self):
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_gazetteer(db_path) -> Gazetteer | None:
+    if not db_path:
+        return None
+    db_path = Path(db_path)
+    if not db_path.exists():
+        return None
+    return Gazetteer(db_path)
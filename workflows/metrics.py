@@ -0,0 +1,340 @@
+"""Process-wide metrics: counters, gauges and histograms with labels.
+
+Standard library only and thread-safe (Streamlit runs every session in its
+own thread). Workflows record into REGISTRY; metrics_service.py serves
+REGISTRY.render() (Prometheus text format 0.0.4) on a local port and the
+admin panel summarizes REGISTRY.snapshot(). Nothing external is needed to read
+or check the values: render() is a string, snapshot() a dict.
+
+Each process has its own registry. Runs of a process pool (CLI --bulk/--batch
+workers) are recorded by the parent from the stats the workers return.
+
+    with track_run('enrich') as run:
+        with run.stage('read'):
+            ...
+        run.rows(n)
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+import bisect
+import math
+import threading
+import time
+
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+API_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+def _fmt(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: tuple, values: tuple, extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        # label values (str tuple) -> value
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labels) or set(labels) != set(self.labels):
+            raise ValueError(f'{self.name} takes labels {self.labels}, got {tuple(labels)}')
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def _series(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        # unlabelled counters/histograms start at zero; a gauge has no value until set
+        if not items and not self.labels and self.kind != 'gauge':
+            items = [((), self._empty())]
+        return items
+
+    def _empty(self):
+        return 0.0
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> list:
+        """-> [(label dict, value)] for every label set recorded so far."""
+        return [(dict(zip(self.labels, key)), value) for key, value in self._series()]
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for key, value in self._series():
+            lines.append(f'{self.name}{_label_text(self.labels, key)} {_fmt(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError(f'{self.name}: counters only go up')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    """Bucket counts are kept per bucket and made cumulative when rendered."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels=(), buckets=STAGE_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def _empty(self):
+        return {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            h = self._values.get(key)
+            if h is None:
+                h = self._values[key] = self._empty()
+            h['counts'][i] += 1
+            h['sum'] += value
+            h['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def stats(self, **labels) -> dict:
+        """-> count, sum, mean and p50/p95 (upper bound of the bucket holding the quantile)."""
+        with self._lock:
+            h = self._values.get(self._key(labels))
+            h = {'counts': list(h['counts']), 'sum': h['sum'], 'count': h['count']} if h else self._empty()
+        return self._summarize(h)
+
+    def _summarize(self, h: dict) -> dict:
+        out = {'count': h['count'], 'sum': h['sum'], 'mean': h['sum'] / h['count'] if h['count'] else None}
+        for name, q in (('p50', 0.5), ('p95', 0.95)):
+            out[name] = None
+            if h['count']:
+                rank, seen = q * h['count'], 0
+                for bound, n in zip(self.buckets + (math.inf,), h['counts']):
+                    seen += n
+                    if seen >= rank:
+                        out[name] = bound
+                        break
+        return out
+
+    def samples(self) -> list:
+        return [(dict(zip(self.labels, key)), self._summarize(h)) for key, h in self._series()]
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for key, h in self._series():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), h['counts']):
+                cumulative += n
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, key)} {_fmt(h["sum"])}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, key)} {h["count"]}')
+        return lines
+
+
+class _Callback(_Metric):
+    """Unlabelled value read from fn() at render time (e.g. the parse cache's own hit counter)."""
+
+    def __init__(self, name: str, help: str, kind: str, fn):
+        super().__init__(name, help)
+        self.kind = kind
+        self.fn = fn
+
+    def _series(self) -> list:
+        try:
+            return [((), float(self.fn()))]
+        except Exception:
+            return []
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labels != metric.labels:
+                    raise ValueError(f'Metric {metric.name} is already registered differently')
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels=()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels=(), buckets=STAGE_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, fn, kind: str = 'gauge'):
+        return self._register(_Callback(name, help, kind, fn))
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for m in metrics for line in m.render()) + '\n'
+
+    def snapshot(self) -> dict:
+        """-> {name: {'kind', 'help', 'samples': [(labels, value or histogram stats)]}}."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: {'kind': m.kind, 'help': m.help, 'samples': m.samples()} for m in metrics}
+
+    def reset(self):
+        """Zero every recorded value (registrations stay)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for m in metrics:
+            m.reset()
+
+
+REGISTRY = Registry()
+
+WORKFLOW_RUNS = REGISTRY.counter('dhl_workflow_runs_total', 'Workflow runs by outcome.', ('workflow', 'status'))
+WORKFLOW_IN_PROGRESS = REGISTRY.gauge('dhl_workflow_in_progress', 'Workflow runs executing now.', ('workflow',))
+WORKFLOW_ROWS = REGISTRY.counter('dhl_workflow_rows_total', 'Input rows processed by successful workflow runs.', ('workflow',))
+STAGE_SECONDS = REGISTRY.histogram('dhl_workflow_stage_seconds', 'Wall time per workflow stage; stage "total" is the whole run.',
+                                   ('workflow', 'stage'), STAGE_BUCKETS)
+API_REQUESTS = REGISTRY.counter('dhl_api_requests_total', 'DHL Location Finder requests by HTTP status ("error": no response).', ('status',))
+API_SECONDS = REGISTRY.histogram('dhl_api_request_seconds', 'DHL Location Finder request latency.', (), API_BUCKETS)
+API_RETRIES = REGISTRY.counter('dhl_api_retries_total', 'DHL Location Finder requests retried, by the status that caused it.', ('status',))
+ENRICH_LOOKUPS = REGISTRY.counter('dhl_enrich_lookups_total', 'Enricher rows by where their result came from.', ('source',))
+ENRICH_CACHE_HIT_RATIO = REGISTRY.gauge('dhl_enrich_cache_hit_ratio', 'Share of the last enrichment\'s lookups answered without calling the API.')
+
+# kpi key of process_df -> source label; the first three are answered without a request
+LOOKUP_SOURCES = {
+    'cache_hits': 'cache',
+    'gazetteer_hits': 'gazetteer',
+    'neg_cached': 'neg_cache',
+    'api_calls': 'api',
+    'reused_rows': 'reused',
+    'resumed_rows': 'resumed',
+}
+
+
+@contextmanager
+def stage(workflow: str, name: str):
+    """Time one stage of a run into dhl_workflow_stage_seconds."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, workflow=workflow, stage=name)
+
+
+class RunTracker:
+    def __init__(self, workflow: str):
+        self.workflow = workflow
+
+    def stage(self, name: str):
+        return stage(self.workflow, name)
+
+    def observe(self, name: str, seconds: float):
+        """Record a stage duration measured elsewhere (e.g. returned by a worker process)."""
+        STAGE_SECONDS.observe(seconds, workflow=self.workflow, stage=name)
+
+    def rows(self, n: int):
+        WORKFLOW_ROWS.inc(n, workflow=self.workflow)
+
+
+@contextmanager
+def track_run(workflow: str):
+    """Count one run (status ok/error), keep the in-progress gauge and time it as stage 'total'."""
+    WORKFLOW_IN_PROGRESS.inc(workflow=workflow)
+    status = 'error'
+    t0 = time.perf_counter()
+    try:
+        yield RunTracker(workflow)
+        status = 'ok'
+    finally:
+        WORKFLOW_IN_PROGRESS.dec(workflow=workflow)
+        WORKFLOW_RUNS.inc(workflow=workflow, status=status)
+        STAGE_SECONDS.observe(time.perf_counter() - t0, workflow=workflow, stage='total')
+
+
+def record_lookups(kpis) -> float | None:
+    """Add the enricher's per-sheet kpis to dhl_enrich_lookups_total and set the hit ratio; -> ratio."""
+    totals = dict.fromkeys(LOOKUP_SOURCES, 0)
+    for kpi in kpis:
+        for key in LOOKUP_SOURCES:
+            totals[key] += int(kpi.get(key, 0) or 0)
+    for key, source in LOOKUP_SOURCES.items():
+        ENRICH_LOOKUPS.inc(totals[key], source=source)
+    answered = totals['cache_hits'] + totals['gazetteer_hits'] + totals['neg_cached']
+    looked_up = answered + totals['api_calls']
+    if not looked_up:
+        return None
+    ratio = answered / looked_up
+    ENRICH_CACHE_HIT_RATIO.set(ratio)
+    return ratio
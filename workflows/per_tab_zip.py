@@ -8,12 +8,15 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 import pandas as pd
 import re
+import time
 import zipfile
 
-from .common import normalize_text, norm_key
+from .common import ExcelOutput, TableOutput, check_output_formats, normalize_text, norm_key, excel_sheet_names, iter_sheet_frames, read_excel_cached
+from .metrics import RunTracker, track_run
 
 DATE_TZ = 'Africa/Cairo'
 DATE_FMT = '%d-%m-%Y'
+PREVIEW_ROWS = 20
 
 TEMPLATE_PHONE_COL = 'Destination Phone'
 ITEM_COLS = ['Item Name', 'Item Price', 'Qty', 'Pc Weight']
@@ -95,7 +98,7 @@ def normalize_phone_keep_if_cannot(raw: str):
 
 
 def load_items(items_xlsx: Path):
-    items_df = pd.read_excel(items_xlsx, engine='openpyxl')
+    items_df = read_excel_cached(items_xlsx, engine='openpyxl')
     items_df = items_df.loc[:, ~items_df.columns.duplicated()].copy()
 
     col_by_key = {norm_key(c): c for c in items_df.columns}
@@ -139,6 +142,86 @@ def sheet_code(name: str, used: dict) -> str:
 class PerTabZipOptions:
     keep_phone_on_all_item_lines: bool = True
     out_dirname: str = 'output_multiline'
+    out_root: str = ''  # parent of out_dirname; defaults to the MAIN workbook's folder
+    excel_writer: str = 'openpyxl'  # or 'xlsxwriter' (streaming, constant memory); see common.EXCEL_WRITERS
+    output_formats: tuple = ('xlsx',)  # any of common.OUTPUT_FORMATS; CSV/Parquet files sit next to the workbooks
+
+
+def expand_tab(raw: pd.DataFrame, sh: str, sc: str, item_list: list, blank_on_cont: set, run_date: str):
+    """One MAIN tab -> (output headers, one row per contact x item line, QC rows)."""
+    base_headers = list(raw.columns)
+    extra_cols = []
+    if 'Order Number' not in base_headers:
+        extra_cols.append('Order Number')
+    if TEMPLATE_PHONE_COL not in base_headers:
+        extra_cols.append(TEMPLATE_PHONE_COL)
+    for c in ITEM_COLS:
+        if c not in base_headers:
+            extra_cols.append(c)
+
+    out_headers = base_headers + extra_cols
+    seq = 1
+    out_rows = []
+    qc_rows = []
+
+    for _, r in raw.iterrows():
+        row_dict = r.to_dict()
+        for c in extra_cols:
+            row_dict.setdefault(c, '')
+
+        order = f"{sc}-{seq:04d}"
+        seq += 1
+        row_dict['Order Number'] = order
+
+        phone_existing = normalize_text(row_dict.get(TEMPLATE_PHONE_COL, ''))
+        phone_raw = phone_existing or extract_phone_from_row(row_dict)
+        phone_out, phone_note = normalize_phone_keep_if_cannot(phone_raw)
+        row_dict[TEMPLATE_PHONE_COL] = phone_out
+
+        for i, item in enumerate(item_list):
+            rec = dict(row_dict)
+            rec['Item Name'] = item.get('Item Name','')
+            rec['Item Price'] = item.get('Value', 0)
+            rec['Pc Weight'] = item.get('Pc Weight', 0)
+            rec['Qty'] = 1
+
+            if i > 0:
+                for col in blank_on_cont:
+                    if col in rec:
+                        rec[col] = ''
+
+            out_rows.append(rec)
+
+        qc_rows.append({
+            'Order Number': order,
+            'Source Tab': sh,
+            'Phone Raw': phone_raw,
+            'Phone Output': phone_out,
+            'Phone Note': phone_note,
+            'Run Date': run_date
+        })
+
+    return out_headers, out_rows, qc_rows
+
+
+def blank_on_continuation(options: PerTabZipOptions) -> set:
+    blank_on_cont = set(BLANK_ON_CONTINUATION)
+    if options.keep_phone_on_all_item_lines:
+        blank_on_cont.discard(TEMPLATE_PHONE_COL)
+    else:
+        blank_on_cont.add(TEMPLATE_PHONE_COL)
+    return blank_on_cont
+
+
+def is_skipped_tab(sh: str) -> bool:
+    return sh in SKIP_SHEETS or norm_key(sh) in {norm_key(s) for s in SKIP_SHEETS}
+
+
+def run_date_str() -> str:
+    try:
+        return datetime.now(ZoneInfo(DATE_TZ)).strftime(DATE_FMT)
+    except Exception:
+        return datetime.now().strftime(DATE_FMT)
 
 
 def run_per_tab_zip(main_xlsx: Path, items_xlsx: Path, options: PerTabZipOptions = PerTabZipOptions()):
@@ -148,26 +231,30 @@ def run_per_tab_zip(main_xlsx: Path, items_xlsx: Path, options: PerTabZipOptions
         raise FileNotFoundError(f"Missing main Excel: {main_xlsx}")
     if not items_xlsx.exists():
         raise FileNotFoundError(f"Missing Items.xlsx: {items_xlsx}")
+    formats = check_output_formats(options.output_formats)
+    with track_run('per_tab') as run:
+        return _run_per_tab_zip(main_xlsx, items_xlsx, options, formats, run)
+
 
-    out_dir = main_xlsx.parent / options.out_dirname
+def _run_per_tab_zip(main_xlsx: Path, items_xlsx: Path, options: PerTabZipOptions, formats: tuple, run: RunTracker) -> dict:
+    excel = 'xlsx' in formats
+
+    out_dir = (Path(options.out_root) if options.out_root else main_xlsx.parent) / options.out_dirname
     per_tab_dir = out_dir / 'per_tab_excels'
-    out_dir.mkdir(exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
     per_tab_dir.mkdir(exist_ok=True)
+    # the ZIP is built from this folder; drop tabs left over from an earlier run
+    for stale in per_tab_dir.glob('*.xlsx'):
+        stale.unlink()
+    tab_tables = TableOutput(per_tab_dir, formats, replace=True)
+    run_tables = TableOutput(out_dir, formats)
 
-    try:
-        run_date = datetime.now(ZoneInfo(DATE_TZ)).strftime(DATE_FMT)
-    except Exception:
-        run_date = datetime.now().strftime(DATE_FMT)
+    run_date = run_date_str()
+    blank_on_cont = blank_on_continuation(options)
 
-    blank_on_cont = set(BLANK_ON_CONTINUATION)
-    if options.keep_phone_on_all_item_lines:
-        blank_on_cont.discard(TEMPLATE_PHONE_COL)
-    else:
-        blank_on_cont.add(TEMPLATE_PHONE_COL)
+    with run.stage('load_items'):
+        item_list = load_items(items_xlsx)
 
-    item_list = load_items(items_xlsx)
-
-    xls = pd.ExcelFile(main_xlsx)
     used_codes = {}
 
     combined_rows = []
@@ -183,97 +270,63 @@ def run_per_tab_zip(main_xlsx: Path, items_xlsx: Path, options: PerTabZipOptions
                 seen.add(h)
         return union_list
 
-    for sh in xls.sheet_names:
-        if sh in SKIP_SHEETS or norm_key(sh) in {norm_key(s) for s in SKIP_SHEETS}:
+    t0 = time.perf_counter()
+    for sh in excel_sheet_names(main_xlsx):
+        if is_skipped_tab(sh):
             continue
-        raw = pd.read_excel(main_xlsx, sheet_name=sh, engine='openpyxl')
+        raw = read_excel_cached(main_xlsx, sheet_name=sh, engine='openpyxl')
         raw = raw.loc[:, ~raw.columns.duplicated()].copy()
         if raw.empty:
             continue
 
-        base_headers = list(raw.columns)
-        extra_cols = []
-        if 'Order Number' not in base_headers:
-            extra_cols.append('Order Number')
-        if TEMPLATE_PHONE_COL not in base_headers:
-            extra_cols.append(TEMPLATE_PHONE_COL)
-        for c in ITEM_COLS:
-            if c not in base_headers:
-                extra_cols.append(c)
-
-        out_headers = base_headers + extra_cols
-        combined_headers = extend_union_headers(combined_headers, out_headers)
-
         sc = sheet_code(sh, used_codes)
-        seq = 1
-        out_rows = []
-
-        for _, r in raw.iterrows():
-            row_dict = r.to_dict()
-            for c in extra_cols:
-                row_dict.setdefault(c, '')
-
-            order = f"{sc}-{seq:04d}"
-            seq += 1
-            row_dict['Order Number'] = order
-
-            phone_existing = normalize_text(row_dict.get(TEMPLATE_PHONE_COL, ''))
-            phone_raw = phone_existing or extract_phone_from_row(row_dict)
-            phone_out, phone_note = normalize_phone_keep_if_cannot(phone_raw)
-            row_dict[TEMPLATE_PHONE_COL] = phone_out
-
-            for i, item in enumerate(item_list):
-                rec = dict(row_dict)
-                rec['Item Name'] = item.get('Item Name','')
-                rec['Item Price'] = item.get('Value', 0)
-                rec['Pc Weight'] = item.get('Pc Weight', 0)
-                rec['Qty'] = 1
-
-                if i > 0:
-                    for col in blank_on_cont:
-                        if col in rec:
-                            rec[col] = ''
-
-                out_rows.append(rec)
-                combined_rows.append(dict(rec, **{'Source Tab': sh}))
-
-            qc_rows.append({
-                'Order Number': order,
-                'Source Tab': sh,
-                'Phone Raw': phone_raw,
-                'Phone Output': phone_out,
-                'Phone Note': phone_note,
-                'Run Date': run_date
-            })
+        out_headers, out_rows, tab_qc = expand_tab(raw, sh, sc, item_list, blank_on_cont, run_date)
+        combined_headers = extend_union_headers(combined_headers, out_headers)
+        combined_rows.extend(dict(rec, **{'Source Tab': sh}) for rec in out_rows)
+        qc_rows.extend(tab_qc)
 
         df_out = pd.DataFrame(out_rows).reindex(columns=out_headers)
-        tab_xlsx = per_tab_dir / (safe_filename(sh) + '.xlsx')
-        with pd.ExcelWriter(tab_xlsx, engine='openpyxl') as w:
-            df_out.to_excel(w, sheet_name=safe_sheet_name(sh), index=False)
+        if excel:
+            tab_xlsx = per_tab_dir / (safe_filename(sh) + '.xlsx')
+            with ExcelOutput(tab_xlsx, options.excel_writer) as w:
+                w.write(df_out, safe_sheet_name(sh))
+        tab_tables.write(df_out, safe_filename(sh))
 
         per_tab_count += 1
+    run.observe('tabs', time.perf_counter() - t0)
+    run.rows(len(qc_rows))
 
+    t0 = time.perf_counter()
     combined_xlsx = None
     if combined_rows:
         if 'Source Tab' not in combined_headers:
             combined_headers.append('Source Tab')
         combined_df = pd.DataFrame(combined_rows).reindex(columns=combined_headers)
-        combined_xlsx = out_dir / 'ALL_TABS_COMBINED.xlsx'
-        with pd.ExcelWriter(combined_xlsx, engine='openpyxl') as w:
-            combined_df.to_excel(w, sheet_name='COMBINED', index=False)
+        if excel:
+            combined_xlsx = out_dir / 'ALL_TABS_COMBINED.xlsx'
+            with ExcelOutput(combined_xlsx, options.excel_writer) as w:
+                w.write(combined_df, 'COMBINED')
+        run_tables.write(combined_df, 'ALL_TABS_COMBINED')
 
     qc_df = pd.DataFrame(qc_rows)
-    qc_xlsx = out_dir / '_QC.xlsx'
-    with pd.ExcelWriter(qc_xlsx, engine='openpyxl') as w:
-        qc_df.to_excel(w, sheet_name='_QC', index=False)
+    qc_xlsx = None
+    if excel:
+        qc_xlsx = out_dir / '_QC.xlsx'
+        with ExcelOutput(qc_xlsx, options.excel_writer) as w:
+            w.write(qc_df, '_QC')
+    run_tables.write(qc_df, '_QC')
+    tab_tables.close()
+    run_tables.close()
+    run.observe('combined', time.perf_counter() - t0)
 
     zip_path = out_dir / 'DHL_PER_TAB_EXCELS.zip'
-    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
-        for p in sorted(per_tab_dir.glob('*.xlsx')):
+    tab_files = sorted(per_tab_dir.glob('*.xlsx')) + tab_tables.paths
+    run_files = [p for p in (qc_xlsx, combined_xlsx) if p is not None] + run_tables.paths
+    with run.stage('zip'), zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        for p in tab_files:
             z.write(p, arcname=f"per_tab_excels/{p.name}")
-        z.write(qc_xlsx, arcname=qc_xlsx.name)
-        if combined_xlsx is not None and combined_xlsx.exists():
-            z.write(combined_xlsx, arcname=combined_xlsx.name)
+        for p in run_files:
+            z.write(p, arcname=p.name)
 
     return {
         'zip_path': zip_path,
@@ -281,4 +334,33 @@ def run_per_tab_zip(main_xlsx: Path, items_xlsx: Path, options: PerTabZipOptions
         'qc_xlsx': qc_xlsx,
         'per_tab_dir': per_tab_dir,
         'per_tab_count': per_tab_count,
+        'tables': [str(p) for p in tab_tables.paths + run_tables.paths],
     }
+
+
+def preview_per_tab(main_xlsx: Path, items_xlsx: Path, options: PerTabZipOptions = PerTabZipOptions(),
+                    n_rows: int = PREVIEW_ROWS) -> dict:
+    """Expand only the first n_rows contacts of each tab (streamed read-only); nothing is written.
+
+    -> {'rows': combined rows with Source Tab, 'qc': phone QC rows, 'tabs': tabs read}
+    """
+    item_list = load_items(items_xlsx)
+    blank_on_cont = blank_on_continuation(options)
+    run_date = run_date_str()
+
+    used_codes = {}
+    headers, rows, qc_rows = [], [], []
+    tabs = 0
+    for sh, raw in iter_sheet_frames(main_xlsx, n_rows, n_rows, skip_sheet=is_skipped_tab):
+        raw = raw.dropna(how='all')
+        if raw.empty:
+            continue
+        sc = sheet_code(sh, used_codes)
+        out_headers, out_rows, tab_qc = expand_tab(raw, sh, sc, item_list, blank_on_cont, run_date)
+        headers += [h for h in out_headers if h not in headers]
+        rows.extend(dict(rec, **{'Source Tab': sh}) for rec in out_rows)
+        qc_rows.extend(tab_qc)
+        tabs += 1
+    if 'Source Tab' not in headers:
+        headers.append('Source Tab')
+    return {'rows': pd.DataFrame(rows).reindex(columns=headers), 'qc': pd.DataFrame(qc_rows), 'tabs': tabs}
@@ -4,20 +4,32 @@ Adapted from your Batch Enricher v4.1:
 - Calls DHL Location Finder /find-by-address
 - Normalizes country code + city, fills postal code
 - Uses CSV cache to reduce API calls
+- Optionally resolves cities from an offline gazetteer before calling the API
+- Journals lookups and row results to a checkpoint so interrupted runs resume
+- Remembers failed lookups and unknown countries in a negative cache with its own TTL
 - Writes enriched workbook with _LOG and _SUMMARY sheets
+- Bulk mode: many workbooks share one cache and HTTP session, with a combined _SUMMARY
 
 This module is based on your POSTAL_CODE_.txt notebook export.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
+import hashlib
+import json
+import os
 import time
 import difflib
 import pandas as pd
 import requests
 
+from .common import ExcelOutput, TableOutput, check_output_formats, read_excel_cached, tables_dir, unique_stems
+from .fingerprints import context_digest, open_fingerprints, row_fingerprint
+from .gazetteer import open_gazetteer
+from .metrics import API_REQUESTS, API_RETRIES, API_SECONDS, STAGE_SECONDS, RunTracker, record_lookups, stage, track_run
+
 API_BASE = 'https://api.dhl.com/location-finder/v1'
 
 @dataclass
@@ -33,6 +45,16 @@ class EnricherOptions:
     only_empty: bool = False
     cache_file: str = 'dhl_city_cache.csv'
     city_index_file: str = 'dhl_country_city_index.csv'
+    api_base: str = API_BASE
+    gazetteer_file: str = ''  # SQLite built by workflows.gazetteer.build_gazetteer
+    checkpoint: bool = True
+    checkpoint_dir: str = ''  # defaults to the input's folder
+    checkpoint_every: int = 100  # rows between flushes; API lookups are flushed immediately
+    neg_cache_file: str = 'dhl_negative_cache.csv'
+    negative_ttl_sec: float = 7 * 24 * 3600
+    fingerprint_file: str = ''  # diff mode: reuse rows unchanged since the run that wrote this sidecar
+    excel_writer: str = 'openpyxl'  # or 'xlsxwriter' (streaming, constant memory); see common.EXCEL_WRITERS
+    output_formats: tuple = ('xlsx',)  # any of common.OUTPUT_FORMATS; CSV/Parquet go to common.tables_dir(out_xlsx)
 
 COUNTRY_SYNONYMS = {
     'UNITED ARAB EMIRATES': 'AE','UAE':'AE',
@@ -88,7 +110,7 @@ def save_cache(cache: dict, path: Path):
     for (iso2, city_seed), v in cache.items():
         rows.append({'iso2': iso2, 'city_seed': city_seed, 'postal': v.get('postal',''), 'city': v.get('city',''), 'country_name': v.get('country_name',''), 'distance': v.get('distance','')})
     if rows:
-        pd.DataFrame(rows).drop_duplicates().to_csv(path, index=False)
+        _write_csv_atomic(pd.DataFrame(rows).drop_duplicates(), path)
 
 
 def load_city_index(path: Path):
@@ -106,19 +128,124 @@ def save_city_index(index_map: dict, path: Path):
         for c in sorted(cities):
             rows.append({'iso2': iso2, 'city': c})
     if rows:
-        pd.DataFrame(rows).drop_duplicates().to_csv(path, index=False)
-
-
-def dhl_request_find_by_address(api_key: str, params: dict, max_retries: int):
+        _write_csv_atomic(pd.DataFrame(rows).drop_duplicates(), path)
+
+
+def _write_csv_atomic(df: pd.DataFrame, path: Path):
+    # concurrent runs (CLI worker pool) may share one cache file
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def result_options(opts: EnricherOptions) -> list:
+    """Options that change what a row resolves to."""
+    return [
+        opts.provider_type, opts.service_type, opts.limit_results, opts.max_accepted_distance_m,
+        opts.strict_city_from_dhl, opts.fallback_to_capital, opts.only_empty, opts.api_base,
+    ]
+
+
+def reusable_result(log: dict) -> bool:
+    """Row results a diff-mode run may reuse; misses are retried (the negative cache throttles them)."""
+    status = log.get('status', '')
+    if status in ('no_country', 'no_city_seed'):
+        return True
+    return status.startswith(('ok_api', 'ok_cached', 'ok_gazetteer')) and bool(log.get('postal'))
+
+
+def checkpoint_path(input_xlsx: Path, ckpt_dir: Path, opts: EnricherOptions) -> Path:
+    """Checkpoint file for this input content + result-affecting options."""
+    h = hashlib.sha1()
+    with open(input_xlsx, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    h.update(json.dumps(result_options(opts)).encode())
+    return Path(ckpt_dir) / f'.enrich_{Path(input_xlsx).stem}_{h.hexdigest()[:16]}.ckpt.jsonl'
+
+
+class EnrichCheckpoint:
+    """Append-only JSONL journal of completed API lookups, misses and row results.
+
+    A rerun on the same input replays it: lookups refill the cache and
+    finished rows are applied without being processed again. A torn last
+    line (process killed mid-write) is ignored.
+    """
+
+    def __init__(self, path: Path, flush_every: int = 100):
+        self.path = Path(path)
+        self.flush_every = max(1, int(flush_every))
+        self._f = None
+        self._pending = 0
+
+    def load(self):
+        lookups, negatives, rows = {}, {}, {}
+        if not self.path.exists():
+            return lookups, negatives, rows
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get('t') == 'lookup':
+                    lookups[tuple(rec['k'])] = rec['v']
+                elif rec.get('t') == 'neg':
+                    negatives[tuple(rec['k'])] = rec['ts']
+                elif rec.get('t') == 'row':
+                    rows[(rec['s'], rec['i'])] = ([tuple(w) for w in rec['w']], rec['log'])
+        return lookups, negatives, rows
+
+    def _write(self, rec: dict, flush: bool):
+        if self._f is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.path, 'a', encoding='utf-8')
+        self._f.write(json.dumps(rec, default=str) + '\n')
+        self._pending += 1
+        if flush or self._pending >= self.flush_every:
+            self._f.flush()
+            self._pending = 0
+
+    def lookup(self, key, value: dict):
+        self._write({'t': 'lookup', 'k': list(key), 'v': value}, flush=True)
+
+    def negative(self, key, ts: float):
+        self._write({'t': 'neg', 'k': list(key), 'ts': ts}, flush=True)
+
+    def row(self, sheet: str, i: int, writes, log: dict):
+        self._write({'t': 'row', 's': sheet, 'i': i, 'w': [list(w) for w in writes], 'log': log}, flush=False)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def remove(self):
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+
+
+def dhl_request_find_by_address(api_key: str, params: dict, max_retries: int, api_base: str = API_BASE, session=None):
     headers = {'DHL-API-Key': api_key, 'Accept': 'application/json'}
     backoff = 0.5
-    for _ in range(max_retries):
-        r = requests.get(f"{API_BASE}/find-by-address", params=params, headers=headers, timeout=30)
+    for attempt in range(max_retries):
+        t0 = time.perf_counter()
+        try:
+            r = (session or requests).get(f"{api_base}/find-by-address", params=params, headers=headers, timeout=30)
+        except requests.RequestException:
+            API_REQUESTS.inc(status='error')
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - t0)
+        API_REQUESTS.inc(status=r.status_code)
         if r.status_code == 200:
             return r.json()
         if r.status_code == 400 and 'Unknown Country' in r.text:
             return None
         if r.status_code in (429, 502, 503, 504):
+            if attempt + 1 < max_retries:
+                API_RETRIES.inc(status=r.status_code)
             time.sleep(min(10.0, backoff))
             backoff *= 1.6
             continue
@@ -161,10 +288,40 @@ def fuzzy_candidates(country_city_index, iso2, city, cutoff=0.85, topn=3):
     return [p for _, p in scored[:topn]]
 
 
-def query_with_corrections(api_key, country_city_index, iso2, city_seed, opts: EnricherOptions):
+ATTEMPT_LABELS = ('synonym_or_input', 'fuzzy', 'capital')
+
+LOG_COLS = ['sheet', 'row', 'input_country', 'input_country_code', 'input_city',
+            'iso2', 'final_city', 'postal', 'distance', 'status', 'neg_reason', 'reused']
+
+
+def query_with_corrections(api_key, country_city_index, iso2, city_seed, opts: EnricherOptions, neg_cache: dict | None = None,
+                           on_negative=None, http=None):
+    """Input/synonym -> fuzzy candidates -> capital, stopping at the first hit.
+
+    With neg_cache, (iso2, city, attempt) combinations that found nothing and
+    unknown countries are skipped without an API call (and without the delay);
+    new misses are recorded there (and passed to on_negative(key, ts)). A
+    result built only from skipped attempts carries 'neg_cached': True.
+    http is a requests.Session reused across calls (keep-alive).
+    """
     city_seed = apply_city_synonyms(iso2, city_seed)
+    now = time.time()
+    calls = {'made': 0, 'skipped': 0}
+
+    if neg_cache is not None and (iso2, '', 'unknown_country') in neg_cache:
+        return {'unknown_country': True, 'neg_cached': True}
+
+    def record_negative(key):
+        neg_cache[key] = now
+        if on_negative is not None:
+            on_negative(key, now)
 
     def do_query(city_used, label):
+        nk = (iso2, to_upper_ascii(city_used), label)
+        # the request is the same whichever step produced the city
+        if neg_cache is not None and any((iso2, nk[1], a) in neg_cache for a in ATTEMPT_LABELS):
+            calls['skipped'] += 1
+            return None
         params = {'countryCode': iso2, 'addressLocality': city_used}
         if opts.provider_type:
             params['providerType'] = opts.provider_type
@@ -172,25 +329,36 @@ def query_with_corrections(api_key, country_city_index, iso2, city_seed, opts: E
             params['serviceType'] = opts.service_type
         if opts.limit_results:
             params['limit'] = str(opts.limit_results)
-        payload = dhl_request_find_by_address(api_key, params, opts.max_retries)
+        calls['made'] += 1
+        payload = dhl_request_find_by_address(api_key, params, opts.max_retries, opts.api_base, session=http)
         if payload is None:
+            if neg_cache is not None:
+                record_negative((iso2, '', 'unknown_country'))
             return {'unknown_country': True}
         postal, dhl_city, dist, name, svc = best_location(payload)
         if dhl_city:
             return {'postal': postal or '', 'city': to_upper_ascii(dhl_city), 'distance': dist or '', 'attempt': label, 'used_city': to_upper_ascii(city_used), 'serviceTypes': svc or ''}
+        if neg_cache is not None:
+            record_negative(nk)
         return None
 
+    def pause(calls_before):
+        if calls['made'] > calls_before:
+            time.sleep(opts.request_delay_sec)
+
     if len(city_seed.strip()) >= 3:
+        before = calls['made']
         out = do_query(city_seed, 'synonym_or_input')
         if out:
             return out
-        time.sleep(opts.request_delay_sec)
+        pause(before)
 
     for cand in fuzzy_candidates(country_city_index, iso2, city_seed):
+        before = calls['made']
         out = do_query(cand, 'fuzzy')
         if out:
             return out
-        time.sleep(opts.request_delay_sec)
+        pause(before)
 
     if opts.fallback_to_capital and iso2 in CAPITAL_BY_ISO2:
         cap = to_upper_ascii(CAPITAL_BY_ISO2[iso2])
@@ -199,179 +367,550 @@ def query_with_corrections(api_key, country_city_index, iso2, city_seed, opts: E
             if out:
                 return out
 
-    return {'postal':'', 'city': to_upper_ascii(city_seed), 'distance':'', 'attempt':'fallback', 'used_city': to_upper_ascii(city_seed), 'serviceTypes': ''}
+    out = {'postal':'', 'city': to_upper_ascii(city_seed), 'distance':'', 'attempt':'fallback', 'used_city': to_upper_ascii(city_seed), 'serviceTypes': ''}
+    if calls['skipped'] and not calls['made']:
+        out['neg_cached'] = True
+    return out
+
+
+def load_negative_cache(path: Path, ttl_sec: float):
+    """{(iso2, city, attempt): recorded_at} for entries younger than ttl_sec."""
+    neg = {}
+    if path.exists():
+        cutoff = time.time() - ttl_sec
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        for iso2, city, attempt, ts in zip(df['iso2'], df['city'], df['attempt'], pd.to_numeric(df['ts'], errors='coerce')):
+            if ts == ts and ts >= cutoff:
+                neg[(iso2, city, attempt)] = float(ts)
+    return neg
+
+
+def save_negative_cache(neg: dict, path: Path, ttl_sec: float):
+    cutoff = time.time() - ttl_sec
+    rows = [{'iso2': k[0], 'city': k[1], 'attempt': k[2], 'ts': ts} for k, ts in neg.items() if ts >= cutoff]
+    if rows or path.exists():
+        _write_csv_atomic(pd.DataFrame(rows, columns=['iso2', 'city', 'attempt', 'ts']), path)
+
+
+class EnrichContext:
+    """Lookup state of a run: result, city-index and negative caches, the
+    gazetteer and one HTTP session.
+
+    A single-file run loads it from the input's folder; a bulk run shares one
+    across the whole batch, so the cache files are read and written once and a
+    key looked up for one workbook is a cache hit in every later one.
+    """
+
+    def __init__(self, cache_dir: Path, opts: EnricherOptions):
+        cache_dir = Path(cache_dir)
+        self.opts = opts
+        self.cache_path = cache_dir / opts.cache_file
+        self.city_index_path = cache_dir / opts.city_index_file
+        self.neg_cache_path = cache_dir / opts.neg_cache_file
+        self.cache = load_cache(self.cache_path)
+        self.city_index = load_city_index(self.city_index_path)
+        self.neg_cache = load_negative_cache(self.neg_cache_path, opts.negative_ttl_sec)
+        self.gazetteer = open_gazetteer(opts.gazetteer_file)
+        self.http = requests.Session()
+        self.api_requests = 0
+        self.http.hooks['response'].append(self._count_request)
+
+    def _count_request(self, response, *args, **kwargs):
+        self.api_requests += 1
+
+    def save(self):
+        save_cache(self.cache, self.cache_path)
+        save_city_index(self.city_index, self.city_index_path)
+        save_negative_cache(self.neg_cache, self.neg_cache_path, self.opts.negative_ttl_sec)
+
+    def close(self):
+        if self.gazetteer is not None:
+            self.gazetteer.close()
+            self.gazetteer = None
+        self.http.close()
+
+
+def find_col(df, candidates):
+    cols = {c.lower(): c for c in df.columns}
+    for cand in candidates:
+        if cand.lower() in cols:
+            return cols[cand.lower()]
+    for k, v in cols.items():
+        for cand in candidates:
+            if cand.lower() in k:
+                return v
+    return None
+
+
+def enrich_columns(df) -> tuple:
+    """(country name, country code, city, postal) columns of a sheet; defaults when absent."""
+    return (
+        find_col(df, ['country','country name','destination country']) or 'Country',
+        find_col(df, ['country code','iso2','iso']) or 'Country Code',
+        find_col(df, ['city','address locality','town']) or 'City',
+        find_col(df, ['postal code','postcode','zip']) or 'Postal Code',
+    )
+
+
+def lookup_key(in_name, in_code, in_city, opts: EnricherOptions):
+    """-> (iso2, canonical country, city seed); iso2 None: no country, seed '': no city."""
+    iso2, canonical = normalize_country(in_name, in_code)
+    if not iso2:
+        return None, None, ''
+    seed = to_upper_ascii(in_city).strip()
+    if not seed and opts.fallback_to_capital and iso2 in CAPITAL_BY_ISO2:
+        seed = to_upper_ascii(CAPITAL_BY_ISO2[iso2])
+    return iso2, canonical, seed
+
+
+def summary_frames(log_df: pd.DataFrame, sheet_kpis: list, opts: EnricherOptions, gazetteer_used: bool, diff_mode: bool):
+    """-> (RUN_CONFIG, OVERALL, SHEET_KPI), the blocks of the _SUMMARY sheet."""
+    run_config = pd.DataFrame([
+        ['PROVIDER_TYPE', opts.provider_type],
+        ['SERVICE_TYPE', opts.service_type],
+        ['LIMIT_RESULTS', opts.limit_results],
+        ['MAX_ACCEPTED_DISTANCE_M', opts.max_accepted_distance_m],
+        ['REQUEST_DELAY_SEC', opts.request_delay_sec],
+        ['MAX_RETRIES', opts.max_retries],
+        ['ONLY_EMPTY', opts.only_empty],
+        ['STRICT_CITY_FROM_DHL', opts.strict_city_from_dhl],
+        ['FALLBACK_TO_CAPITAL', opts.fallback_to_capital],
+        ['GAZETTEER', Path(opts.gazetteer_file).name if gazetteer_used else ''],
+        ['NEGATIVE_TTL_SEC', opts.negative_ttl_sec],
+        ['DIFF_MODE', diff_mode],
+    ], columns=['Key','Value'])
+
+    if not log_df.empty:
+        st = log_df['status'].fillna('')
+        overall = pd.DataFrame([
+            ['total_rows', len(log_df)],
+            ['ok_api', int(st.str.startswith('ok_api').sum())],
+            ['ok_cached', int(st.str.startswith('ok_cached').sum())],
+            ['ok_gazetteer', int(st.str.startswith('ok_gazetteer').sum())],
+            ['needs_review', int(st.str.contains('needs_review').sum())],
+            ['no_country', int((st=='no_country').sum())],
+            ['no_city_seed', int((st=='no_city_seed').sum())],
+            ['unknown_country', int((st=='unknown_country').sum())],
+            ['neg_cached', int(st.str.startswith('neg_cached').sum())],
+            ['reused', int(sum(k['reused_rows'] for k in sheet_kpis))],
+        ], columns=['Metric','Value'])
+        sheet_kpi = pd.DataFrame(sheet_kpis)
+    else:
+        overall = pd.DataFrame(columns=['Metric','Value'])
+        sheet_kpi = pd.DataFrame(columns=['sheet','api_calls','cache_hits','gazetteer_hits','neg_cached','flagged_far','resumed_rows','reused_rows'])
+    return run_config, overall, sheet_kpi
+
+
+def write_summary_blocks(writer, blocks: list, sheet_name: str = '_SUMMARY'):
+    """Stack DataFrames on one sheet, one blank row apart."""
+    start = 0
+    for block in blocks:
+        writer.write(block, sheet_name, startrow=start)
+        start += len(block) + 2
 
 
 def run_postal_enricher(input_xlsx: Path, out_xlsx: Path, dhl_api_key: str, opts: EnricherOptions = EnricherOptions()):
     input_xlsx = Path(input_xlsx)
-    out_xlsx = Path(out_xlsx)
     if not input_xlsx.exists():
         raise FileNotFoundError(f"Missing input: {input_xlsx}")
     if not dhl_api_key:
         raise ValueError('DHL API key is required')
+    check_output_formats(opts.output_formats)
 
-    cache_path = input_xlsx.parent / opts.cache_file
-    city_index_path = input_xlsx.parent / opts.city_index_file
+    with track_run('enrich') as run:
+        ctx = EnrichContext(input_xlsx.parent, opts)
+        try:
+            stats, _, _ = enrich_workbook(input_xlsx, out_xlsx, dhl_api_key, opts, ctx)
+            ctx.save()
+        finally:
+            ctx.close()
+        run.rows(stats['rows'])
+    stats['api_requests'] = ctx.api_requests
+    return stats
+
+
+def enrich_workbook(input_xlsx: Path, out_xlsx: Path, dhl_api_key: str, opts: EnricherOptions, ctx: EnrichContext,
+                    workflow: str = 'enrich'):
+    """Enrich one workbook against ctx (caches are updated, not saved). -> (stats, _LOG frame, sheet KPIs)
+
+    Stage timings go to the metrics registry under workflow, and the sheet KPIs
+    to the lookup counters (workflows.metrics.record_lookups).
+    """
+    input_xlsx = Path(input_xlsx)
+    out_xlsx = Path(out_xlsx)
+    formats = check_output_formats(opts.output_formats)
+
+    cache = ctx.cache
+    city_index = ctx.city_index
+    neg_cache = ctx.neg_cache
+    gazetteer = ctx.gazetteer
+
+    checkpoint = None
+    resumed_rows = {}
+    if opts.checkpoint:
+        ckpt_dir = Path(opts.checkpoint_dir) if opts.checkpoint_dir else input_xlsx.parent
+        checkpoint = EnrichCheckpoint(checkpoint_path(input_xlsx, ckpt_dir, opts), opts.checkpoint_every)
+        lookups, negatives, resumed_rows = checkpoint.load()
+        cache.update(lookups)
+        neg_cache.update(negatives)
+
+    fingerprints = open_fingerprints(opts.fingerprint_file, context_digest('enrich', result_options(opts)))
+
+    def resolve_row(in_name, in_code, in_city, i, sheet_name, cols):
+        """-> (writes, log) for one input row; writes are (column, value) pairs."""
+        country_name_col, country_code_col, city_col, postal_col = cols
+        writes = [('Original City', in_city)]
+
+        iso2, canonical, seed = lookup_key(in_name, in_code, in_city, opts)
+        log = {'sheet': sheet_name, 'row': i+1, 'input_country': in_name, 'input_country_code': in_code, 'input_city': in_city}
+
+        if not iso2:
+            log['status'] = 'no_country'
+            return writes, log
+        if not seed:
+            log['status'] = 'no_city_seed'
+            return writes, log
+        ck = (iso2, seed)
+        gz = None
+        if ck not in cache and gazetteer is not None:
+            gz = gazetteer.lookup(iso2, apply_city_synonyms(iso2, seed))
+        if ck in cache:
+            out = dict(cache[ck]); out['cache'] = 'hit'
+        elif gz:
+            out = {'postal': gz['postal'], 'city': to_upper_ascii(gz['city']), 'distance': '', 'cache': 'gazetteer'}
+        else:
+            out = query_with_corrections(dhl_api_key, city_index, iso2, seed, opts, neg_cache,
+                                         on_negative=checkpoint.negative if checkpoint is not None else None, http=ctx.http)
+            if out.get('unknown_country'):
+                if out.get('neg_cached'):
+                    log.update({'status': 'neg_cached', 'neg_reason': 'unknown_country'})
+                else:
+                    log['status'] = 'unknown_country'
+                return writes, log
+            if out.get('neg_cached'):
+                out['cache'] = 'neg'
+            else:
+                out['cache'] = 'miss'
+            # misses live in the negative cache (with its TTL), not in the permanent one
+            if out.get('attempt') != 'fallback':
+                cache[ck] = {'postal': out.get('postal',''), 'city': out.get('city',''), 'country_name': to_upper_ascii(ISO2_TO_CANONICAL.get(iso2, canonical)), 'distance': out.get('distance','')}
+                if checkpoint is not None:
+                    checkpoint.lookup(ck, cache[ck])
 
-    cache = load_cache(cache_path)
-    city_index = load_city_index(city_index_path)
+        if out.get('city'):
+            city_index.setdefault(iso2, set()).add(out['city'])
 
-    def find_col(df, candidates):
-        cols = {c.lower(): c for c in df.columns}
-        for cand in candidates:
-            if cand.lower() in cols:
-                return cols[cand.lower()]
-        for k, v in cols.items():
-            for cand in candidates:
-                if cand.lower() in k:
-                    return v
-        return None
+        final_city = out.get('city') if (opts.strict_city_from_dhl and out.get('city')) else seed
+        final_country = to_upper_ascii(ISO2_TO_CANONICAL.get(iso2, canonical))
+        final_postal = out.get('postal','')
 
-    def maybe_write(df, idx, col, value):
-        if opts.only_empty and str(df.loc[idx, col]).strip():
-            return
-        df.loc[idx, col] = value
+        needs_review = False
+        try:
+            if out.get('distance') and float(out['distance']) > float(opts.max_accepted_distance_m):
+                needs_review = True
+        except Exception:
+            pass
+
+        writes += [
+            (country_code_col, iso2),
+            (country_name_col, final_country),
+            (city_col, final_city),
+            (postal_col, final_postal),
+        ]
+
+        status = {'hit': 'ok_cached', 'gazetteer': 'ok_gazetteer', 'neg': 'neg_cached'}.get(out.get('cache'), 'ok_api')
+        if needs_review:
+            status += '_needs_review'
+
+        log.update({'iso2': iso2, 'final_city': final_city, 'postal': final_postal, 'distance': out.get('distance',''), 'status': status})
+        if out.get('cache') == 'neg':
+            log['neg_reason'] = 'no_match'
+        if out.get('cache') == 'miss':
+            time.sleep(opts.request_delay_sec)
+        return writes, log
 
     def process_df(df, sheet_name):
         df = df.copy().fillna('')
-        country_name_col = find_col(df, ['country','country name','destination country']) or 'Country'
-        country_code_col = find_col(df, ['country code','iso2','iso']) or 'Country Code'
-        city_col = find_col(df, ['city','address locality','town']) or 'City'
-        postal_col = find_col(df, ['postal code','postcode','zip']) or 'Postal Code'
+        cols = enrich_columns(df)
+        country_name_col, country_code_col, city_col, _ = cols
 
-        for col in [country_name_col, country_code_col, city_col, postal_col]:
+        for col in cols:
             if col not in df.columns:
                 df[col] = ''
         if 'Original City' not in df.columns:
             df['Original City'] = ''
 
-        logs = []
-        api_calls = 0
-        cache_hits = 0
-        flagged_far = 0
-
-        recs = df.to_dict('records')
-        for i, row in enumerate(recs):
-            in_name = row.get(country_name_col, '')
-            in_code = row.get(country_code_col, '')
-            in_city = row.get(city_col, '')
-            maybe_write(df, i, 'Original City', in_city)
-
-            iso2, canonical = normalize_country(in_name, in_code)
-            log = {'sheet': sheet_name, 'row': i+1, 'input_country': in_name, 'input_country_code': in_code, 'input_city': in_city}
-
-            if not iso2:
-                log['status'] = 'no_country'
-                logs.append(log)
-                continue
-
-            seed = to_upper_ascii(in_city).strip()
-            if not seed and opts.fallback_to_capital and iso2 in CAPITAL_BY_ISO2:
-                seed = to_upper_ascii(CAPITAL_BY_ISO2[iso2])
-            if not seed:
-                log['status'] = 'no_city_seed'
-                logs.append(log)
-                continue
-
-            ck = (iso2, seed)
-            if ck in cache:
-                out = dict(cache[ck]); out['cache'] = 'hit'
-                cache_hits += 1
+        n = len(df)
+        # results are gathered per column and applied once per column below;
+        # per-cell df.loc assignment dominated the non-API time on large sheets
+        new_values = {}
+        log_arrays = {k: [None] * n for k in LOG_COLS}
+        resumed = 0
+        reused = 0
+
+        inputs = zip(df[country_name_col].tolist(), df[country_code_col].tolist(), df[city_col].tolist())
+        for i, (in_name, in_code, in_city) in enumerate(inputs):
+            done = resumed_rows.get((sheet_name, i))
+            fp = row_fingerprint((in_name, in_code, in_city, *cols)) if fingerprints is not None else None
+            prev = fingerprints.get(fp) if fp is not None and done is None else None
+            if done is not None:
+                writes, log = done
+                resumed += 1
+            elif prev is not None:
+                writes, log = prev
+                log = dict(log, sheet=sheet_name, row=i+1, reused='Y')
+                reused += 1
             else:
-                out = query_with_corrections(dhl_api_key, city_index, iso2, seed, opts)
-                if out.get('unknown_country'):
-                    log['status'] = 'unknown_country'
-                    logs.append(log)
+                writes, log = resolve_row(in_name, in_code, in_city, i, sheet_name, cols)
+                if checkpoint is not None:
+                    checkpoint.row(sheet_name, i, writes, log)
+            if fp is not None and prev is None:
+                if reusable_result(log):
+                    fingerprints.put(fp, [writes, log])
+                else:
+                    fingerprints.computed += 1
+
+            for col, value in writes:
+                values = new_values.get(col)
+                if values is None:
+                    values = new_values[col] = [None] * n
+                # with only_empty an earlier write in the same row already filled the cell
+                if opts.only_empty and values[i] is not None and str(values[i]).strip():
                     continue
-                out['cache'] = 'miss'
-                api_calls += 1
-                cache[ck] = {'postal': out.get('postal',''), 'city': out.get('city',''), 'country_name': to_upper_ascii(ISO2_TO_CANONICAL.get(iso2, canonical)), 'distance': out.get('distance','')}
-
-            if out.get('city'):
-                city_index.setdefault(iso2, set()).add(out['city'])
-
-            final_city = out.get('city') if (opts.strict_city_from_dhl and out.get('city')) else seed
-            final_country = to_upper_ascii(ISO2_TO_CANONICAL.get(iso2, canonical))
-            final_postal = out.get('postal','')
-
-            needs_review = False
-            try:
-                if out.get('distance') and float(out['distance']) > float(opts.max_accepted_distance_m):
-                    needs_review = True
-                    flagged_far += 1
-            except Exception:
-                pass
-
-            maybe_write(df, i, country_code_col, iso2)
-            maybe_write(df, i, country_name_col, final_country)
-            maybe_write(df, i, city_col, final_city)
-            maybe_write(df, i, postal_col, final_postal)
-
-            status = 'ok_cached' if out.get('cache') == 'hit' else 'ok_api'
-            if needs_review:
-                status += '_needs_review'
-
-            log.update({'iso2': iso2, 'final_city': final_city, 'postal': final_postal, 'distance': out.get('distance',''), 'status': status})
-            logs.append(log)
-            time.sleep(opts.request_delay_sec)
-
-        return df, pd.DataFrame(logs), {'api_calls': api_calls, 'cache_hits': cache_hits, 'flagged_far': flagged_far}
-
-    sheets = pd.read_excel(input_xlsx, sheet_name=None, dtype=str, engine='openpyxl')
+                values[i] = value
+            for k, v in log.items():
+                if k in log_arrays:
+                    log_arrays[k][i] = v
+
+        for col, values in new_values.items():
+            values = pd.Series(values, index=df.index, dtype=object)
+            mask = values.notna()
+            if opts.only_empty:
+                mask &= df[col].astype(str).str.strip().eq('')
+            if mask.any():
+                df[col] = df[col].mask(mask, values)
+
+        log_arrays['sheet'] = [sheet_name] * n
+        ldf = pd.DataFrame(log_arrays, columns=LOG_COLS)
+        # reused rows made no lookups in this run
+        st = ldf['status'].fillna('')[ldf['reused'].isna()]
+        kpi = {
+            'api_calls': int(st.str.startswith('ok_api').sum()),
+            'cache_hits': int(st.str.startswith('ok_cached').sum()),
+            'gazetteer_hits': int(st.str.startswith('ok_gazetteer').sum()),
+            'neg_cached': int(st.str.startswith('neg_cached').sum()),
+            'flagged_far': int(st.str.contains('needs_review').sum()),
+            'resumed_rows': resumed,
+            'reused_rows': reused,
+        }
+        return df, ldf, kpi
+
+
+    with stage(workflow, 'read'):
+        sheets = read_excel_cached(input_xlsx, sheet_name=None, dtype=str, engine='openpyxl')
     out_book = {}
     log_frames = []
     sheet_kpis = []
 
-    for sname, sdf in sheets.items():
-        odf, ldf, kpi = process_df(sdf, sname)
-        out_book[sname[:31] or 'Sheet1'] = odf
-        log_frames.append(ldf.assign(sheet=sname))
-        sheet_kpis.append({'sheet': sname, **kpi})
-
+    try:
+        t0 = time.perf_counter()
+        for sname, sdf in sheets.items():
+            odf, ldf, kpi = process_df(sdf, sname)
+            out_book[sname[:31] or 'Sheet1'] = odf
+            log_frames.append(ldf)
+            sheet_kpis.append({'sheet': sname, **kpi})
+    except BaseException:
+        if fingerprints is not None:
+            fingerprints.discard()
+        raise
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    STAGE_SECONDS.observe(time.perf_counter() - t0, workflow=workflow, stage='lookup')
+    cache_hit_ratio = record_lookups(sheet_kpis)
+
+    t0 = time.perf_counter()
     LOG_DF = pd.concat(log_frames, ignore_index=True) if log_frames else pd.DataFrame()
-
-    RUN_CONFIG = pd.DataFrame([
-        ['PROVIDER_TYPE', opts.provider_type],
-        ['SERVICE_TYPE', opts.service_type],
-        ['LIMIT_RESULTS', opts.limit_results],
-        ['MAX_ACCEPTED_DISTANCE_M', opts.max_accepted_distance_m],
-        ['REQUEST_DELAY_SEC', opts.request_delay_sec],
-        ['MAX_RETRIES', opts.max_retries],
-        ['ONLY_EMPTY', opts.only_empty],
-        ['STRICT_CITY_FROM_DHL', opts.strict_city_from_dhl],
-        ['FALLBACK_TO_CAPITAL', opts.fallback_to_capital],
-    ], columns=['Key','Value'])
-
-    if not LOG_DF.empty:
-        st = LOG_DF['status'].fillna('')
-        OVERALL = pd.DataFrame([
-            ['total_rows', len(LOG_DF)],
-            ['ok_api', int(st.str.startswith('ok_api').sum())],
-            ['ok_cached', int(st.str.startswith('ok_cached').sum())],
-            ['needs_review', int(st.str.contains('needs_review').sum())],
-            ['no_country', int((st=='no_country').sum())],
-            ['no_city_seed', int((st=='no_city_seed').sum())],
-            ['unknown_country', int((st=='unknown_country').sum())],
-        ], columns=['Metric','Value'])
-        SHEET_KPI = pd.DataFrame(sheet_kpis)
-    else:
-        OVERALL = pd.DataFrame(columns=['Metric','Value'])
-        SHEET_KPI = pd.DataFrame(columns=['sheet','api_calls','cache_hits','flagged_far'])
-
-    with pd.ExcelWriter(out_xlsx, engine='openpyxl') as writer:
+    # columns no row produced (e.g. neg_reason) stay out of the sheet
+    LOG_DF = LOG_DF.dropna(axis=1, how='all')
+
+    RUN_CONFIG, OVERALL, SHEET_KPI = summary_frames(LOG_DF, sheet_kpis, opts, gazetteer is not None,
+                                                    bool(fingerprints is not None and fingerprints.has_previous))
+
+    if 'xlsx' in formats:
+        with ExcelOutput(out_xlsx, opts.excel_writer) as writer:
+            for sname, odf in out_book.items():
+                writer.write(odf, sname)
+            if not LOG_DF.empty:
+                writer.write(LOG_DF, '_LOG')
+            write_summary_blocks(writer, [RUN_CONFIG, OVERALL, SHEET_KPI])
+
+    # the three _SUMMARY blocks become three tables
+    with TableOutput(tables_dir(out_xlsx), formats, replace=True) as tables:
         for sname, odf in out_book.items():
-            odf.to_excel(writer, index=False, sheet_name=sname)
+            tables.write(odf, sname)
         if not LOG_DF.empty:
-            LOG_DF.to_excel(writer, index=False, sheet_name='_LOG')
-
-        start = 0
-        RUN_CONFIG.to_excel(writer, index=False, sheet_name='_SUMMARY', startrow=start)
-        start += len(RUN_CONFIG) + 2
-        OVERALL.to_excel(writer, index=False, sheet_name='_SUMMARY', startrow=start)
-        start += len(OVERALL) + 2
-        SHEET_KPI.to_excel(writer, index=False, sheet_name='_SUMMARY', startrow=start)
-
-    save_cache(cache, cache_path)
-    save_city_index(city_index, city_index_path)
-
-    return {'rows': int(len(LOG_DF)) if not LOG_DF.empty else 0, 'cache_size': len(cache)}
+            tables.write(LOG_DF, '_LOG')
+        tables.write(RUN_CONFIG, '_SUMMARY_CONFIG')
+        tables.write(OVERALL, '_SUMMARY_OVERALL')
+        tables.write(SHEET_KPI, '_SUMMARY_SHEETS')
+
+    if checkpoint is not None:
+        # the output is complete; nothing left to resume
+        checkpoint.remove()
+    STAGE_SECONDS.observe(time.perf_counter() - t0, workflow=workflow, stage='write')
+
+    stats = {
+        'rows': int(len(LOG_DF)) if not LOG_DF.empty else 0,
+        'cache_size': len(cache),
+        'api_calls': sum(k['api_calls'] for k in sheet_kpis),
+        'cache_hits': sum(k['cache_hits'] for k in sheet_kpis),
+        'cache_hit_ratio': round(cache_hit_ratio, 4) if cache_hit_ratio is not None else None,
+        'gazetteer_hits': sum(k['gazetteer_hits'] for k in sheet_kpis),
+        'resumed_rows': sum(k['resumed_rows'] for k in sheet_kpis),
+        'neg_cached': sum(k['neg_cached'] for k in sheet_kpis),
+        'neg_cache_size': len(neg_cache),
+    }
+    if tables.paths:
+        stats['tables'] = [str(p) for p in tables.paths]
+    if fingerprints is not None:
+        stats.update(fingerprints.commit())
+    return stats, LOG_DF, sheet_kpis
+
+
+def plan_lookups(inputs: list, opts: EnricherOptions, ctx: EnrichContext) -> dict:
+    """Distinct (iso2, city seed) keys across all inputs, and how many of them
+    neither the cache nor the gazetteer can answer (the batch's lookups)."""
+    keys = set()
+    for input_xlsx in inputs:
+        try:
+            sheets = read_excel_cached(input_xlsx, sheet_name=None, dtype=str, engine='openpyxl')
+        except Exception:
+            # an unreadable file fails again, and is recorded, when the batch reaches it
+            continue
+        for sdf in sheets.values():
+            sdf = sdf.fillna('')
+            name_col, code_col, city_col, _ = enrich_columns(sdf)
+            blank = [''] * len(sdf)
+            columns = [sdf[c].tolist() if c in sdf.columns else blank for c in (name_col, code_col, city_col)]
+            for in_name, in_code, in_city in zip(*columns):
+                iso2, _, seed = lookup_key(in_name, in_code, in_city, opts)
+                if iso2 and seed:
+                    keys.add((iso2, seed))
+    lookups = 0
+    for iso2, seed in keys:
+        if (iso2, seed) in ctx.cache:
+            continue
+        if ctx.gazetteer is not None and ctx.gazetteer.lookup(iso2, apply_city_synonyms(iso2, seed)):
+            continue
+        lookups += 1
+    return {'unique_keys': len(keys), 'planned_lookups': lookups}
+
+
+def run_postal_enricher_bulk(inputs: list, out_dir: Path, dhl_api_key: str, opts: EnricherOptions = EnricherOptions(),
+                             progress=None) -> dict:
+    """Enrich several workbooks as one batch.
+
+    One EnrichContext (caches loaded from and saved to out_dir, one HTTP
+    session) serves every file, so each distinct key is looked up at most once
+    across the batch. Outputs are <stem>_enriched_output.xlsx per input plus
+    _SUMMARY.xlsx with the combined run config, totals and per-file and
+    per-sheet KPIs. A file that fails is recorded with its error in the
+    per-file KPIs and counted in 'failed'; the other files still run.
+    progress(done_files, total_files, name) is called per file.
+    With opts.fingerprint_file, each input gets its own sidecar next to it.
+    """
+    inputs = [Path(p) for p in inputs]
+    out_dir = Path(out_dir)
+    for p in inputs:
+        if not p.exists():
+            raise FileNotFoundError(f"Missing input: {p}")
+    if not dhl_api_key:
+        raise ValueError('DHL API key is required')
+    formats = check_output_formats(opts.output_formats)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with track_run('enrich_bulk') as run:
+        stats = _run_bulk(inputs, out_dir, dhl_api_key, opts, formats, progress, run)
+        run.rows(stats['rows'])
+    return stats
+
+
+FILE_KPI_COUNTS = ('api_calls', 'cache_hits', 'gazetteer_hits', 'neg_cached', 'flagged_far', 'resumed_rows', 'reused_rows')
+
+
+def _run_bulk(inputs: list, out_dir: Path, dhl_api_key: str, opts: EnricherOptions, formats: tuple, progress,
+              run: RunTracker) -> dict:
+    ctx = EnrichContext(out_dir, opts)
+    gazetteer_used = ctx.gazetteer is not None
+    outputs, table_files, logs, file_kpis, sheet_kpis = [], [], [], [], []
+    try:
+        with run.stage('plan'):
+            plan = plan_lookups(inputs, opts, ctx)
+        for n, (input_xlsx, stem) in enumerate(zip(inputs, unique_stems(inputs))):
+            if progress is not None:
+                progress(n, len(inputs), input_xlsx.name)
+            file_opts = opts
+            if opts.fingerprint_file:
+                fp = Path(opts.fingerprint_file)
+                file_opts = replace(opts, fingerprint_file=str(fp.with_name(f'{fp.stem}.{stem}{fp.suffix}')))
+            out_xlsx = out_dir / f'{stem}_enriched_output.xlsx'
+            requests_before = ctx.api_requests
+            try:
+                stats, log_df, kpis = enrich_workbook(input_xlsx, out_xlsx, dhl_api_key, file_opts, ctx, run.workflow)
+            except Exception as e:
+                file_kpis.append({'file': input_xlsx.name, 'output': '', 'rows': 0,
+                                  'api_requests': ctx.api_requests - requests_before,
+                                  **dict.fromkeys(FILE_KPI_COUNTS, 0), 'error': f'{type(e).__name__}: {e}'})
+                continue
+            finally:
+                # keep what this file looked up even if it or a later one fails
+                ctx.save()
+            outputs.append(out_xlsx)
+            table_files.extend(stats.get('tables', []))
+            logs.append(log_df.assign(file=input_xlsx.name))
+            sheet_kpis.extend({'file': input_xlsx.name, **k} for k in kpis)
+            file_kpis.append({
+                'file': input_xlsx.name, 'output': out_xlsx.name if 'xlsx' in formats else '',
+                'rows': stats['rows'], 'api_requests': ctx.api_requests - requests_before,
+                **{k: sum(s[k] for s in kpis) for k in FILE_KPI_COUNTS}, 'error': '',
+            })
+        if progress is not None:
+            progress(len(inputs), len(inputs), '')
+    finally:
+        ctx.close()
+
+    log_df = pd.concat(logs, ignore_index=True) if logs else pd.DataFrame()
+    run_config, overall, sheet_kpi = summary_frames(log_df, sheet_kpis, opts, gazetteer_used, bool(opts.fingerprint_file))
+    batch = pd.DataFrame([
+        ['files', len(inputs)],
+        ['unique_keys', plan['unique_keys']],
+        ['planned_lookups', plan['planned_lookups']],
+        ['api_requests', ctx.api_requests],
+    ], columns=['Metric','Value'])
+    file_kpi = pd.DataFrame(file_kpis)
+    if not sheet_kpi.empty:
+        sheet_kpi = sheet_kpi[['file'] + [c for c in sheet_kpi.columns if c != 'file']]
+
+    summary_xlsx = out_dir / '_SUMMARY.xlsx'
+    if 'xlsx' in formats:
+        with ExcelOutput(summary_xlsx, opts.excel_writer) as writer:
+            write_summary_blocks(writer, [run_config, batch, overall, file_kpi, sheet_kpi])
+    with TableOutput(tables_dir(summary_xlsx), formats, replace=True) as tables:
+        tables.write(run_config, '_SUMMARY_CONFIG')
+        tables.write(pd.concat([batch, overall], ignore_index=True), '_SUMMARY_OVERALL')
+        tables.write(file_kpi, '_SUMMARY_FILES')
+        tables.write(sheet_kpi, '_SUMMARY_SHEETS')
+
+    return {
+        'files': len(inputs),
+        'failed': int((file_kpi['error'] != '').sum()),
+        'rows': int(len(log_df)),
+        'unique_keys': plan['unique_keys'],
+        'planned_lookups': plan['planned_lookups'],
+        'api_requests': ctx.api_requests,
+        'cache_size': len(ctx.cache),
+        'outputs': [str(p) for p in outputs] if 'xlsx' in formats else [],
+        'summary_xlsx': str(summary_xlsx) if 'xlsx' in formats else '',
+        'tables': table_files + [str(p) for p in tables.paths],
+    }
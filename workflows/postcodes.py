@@ -0,0 +1,189 @@
+"""Postcode formats per DHL country code.
+
+POSTCODE_FORMATS maps a DHL (ISO 3166 alpha-2) country code to the regex of
+one postcode, without anchors, or to None for countries without a postcode
+system. Both derived patterns are compiled once at import:
+
+- validation: the whole postcode must match (case-insensitive);
+- extraction: the *last* postcode-shaped token in the street text, delimited
+  by non-alphanumerics. Addresses put the postcode after building numbers and
+  P.O. boxes, so the last match is the right one far more often than the first.
+
+A given postcode made only of digits is zero-padded to its country's length
+first: Excel stores "02134" typed as a number as 2134, which would otherwise
+fail a five-digit format.
+
+resolve_postcodes() works on whole columns: one str.extract / str.fullmatch
+per country present in the block instead of one re.search per row. Countries
+that are not in the table fall back to GENERIC_POSTCODE_RE (US ZIP, UK, 4-6
+digits) for extraction and are not validated.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+POSTCODE_FORMATS = {
+    'AD': r'AD\d{3}',
+    'AE': None,
+    'AR': r'[A-HJ-NP-Z]?\d{4}(?:[A-Z]{3})?',
+    'AT': r'\d{4}',
+    'AU': r'\d{4}',
+    'BD': r'\d{4}',
+    'BE': r'\d{4}',
+    'BG': r'\d{4}',
+    'BH': r'\d{3,4}',
+    'BR': r'\d{5}-?\d{3}',
+    'CA': r'[ABCEGHJ-NPRSTVXY]\d[ABCEGHJ-NPRSTV-Z] ?\d[ABCEGHJ-NPRSTV-Z]\d',
+    'CH': r'\d{4}',
+    'CN': r'\d{6}',
+    'CY': r'\d{4}',
+    'CZ': r'\d{3} ?\d{2}',
+    'DE': r'\d{5}',
+    'DK': r'\d{4}',
+    'DZ': r'\d{5}',
+    'EE': r'\d{5}',
+    'EG': r'\d{5}',
+    'ES': r'\d{5}',
+    'FI': r'\d{5}',
+    'FR': r'\d{2} ?\d{3}',
+    'GB': r'GIR ?0AA|[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}',
+    'GR': r'\d{3} ?\d{2}',
+    'HK': None,
+    'HR': r'\d{5}',
+    'HU': r'\d{4}',
+    'ID': r'\d{5}',
+    'IE': r'(?:[AC-FHKNPRTV-Y]\d{2}|D6W) ?[0-9AC-FHKNPRTV-Y]{4}',
+    'IL': r'\d{5}(?:\d{2})?',
+    'IN': r'\d{3} ?\d{3}',
+    'IQ': r'\d{5}',
+    'IT': r'\d{5}',
+    'JO': r'\d{5}',
+    'JP': r'\d{3}-?\d{4}',
+    'KE': r'\d{5}',
+    'KR': r'\d{5}',
+    'KW': r'\d{5}',
+    'LB': r'\d{4}(?: ?\d{4})?',
+    'LT': r'(?:LT-)?\d{5}',
+    'LU': r'(?:L-)?\d{4}',
+    'LV': r'(?:LV-)?\d{4}',
+    'MA': r'\d{5}',
+    'MX': r'\d{5}',
+    'MY': r'\d{5}',
+    'NG': r'\d{6}',
+    'NL': r'\d{4} ?[A-Z]{2}',
+    'NO': r'\d{4}',
+    'NZ': r'\d{4}',
+    'OM': r'\d{3}',
+    'PH': r'\d{4}',
+    'PK': r'\d{5}',
+    'PL': r'\d{2}-?\d{3}',
+    'PT': r'\d{4}-?\d{3}',
+    'QA': None,
+    'RO': r'\d{6}',
+    'RS': r'\d{5}',
+    'RU': r'\d{6}',
+    'SA': r'\d{5}(?:-?\d{4})?',
+    'SE': r'\d{3} ?\d{2}',
+    'SG': r'\d{6}',
+    'SI': r'(?:SI-)?\d{4}',
+    'SK': r'\d{3} ?\d{2}',
+    'TH': r'\d{5}',
+    'TN': r'\d{4}',
+    'TR': r'\d{5}',
+    'TW': r'\d{3}(?:\d{2,3})?',
+    'UA': r'\d{5}',
+    'US': r'\d{5}(?:-\d{4})?',
+    'VN': r'\d{6}',
+    'ZA': r'\d{4}',
+}
+
+GENERIC_POSTCODE_RE = re.compile(r'\b\d{5}(?:-\d{4})?\b|\b[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}\b|\b\d{4,6}\b', re.I)
+
+VALID_RE = {cc: re.compile(f'(?:{fmt})', re.I) for cc, fmt in POSTCODE_FORMATS.items() if fmt}
+EXTRACT_RE = {cc: re.compile(f'.*(?<![A-Z0-9])({fmt})(?![A-Z0-9])', re.I) for cc, fmt in POSTCODE_FORMATS.items() if fmt}
+_GENERIC_EXTRACT_RE = re.compile(f'({GENERIC_POSTCODE_RE.pattern})', re.I)
+
+# Shortest digits-only postcode each country's format accepts. Only values
+# shorter than that are padded: a dropped leading zero, not a longer variant
+# (SA 12345-6789) with digits missing.
+PAD_WIDTHS = {cc: next((n for n in range(1, 13) if rx.fullmatch('1' * n)), 0) for cc, rx in VALID_RE.items()}
+PAD_WIDTHS = {cc: width for cc, width in PAD_WIDTHS.items() if width}
+
+# Part of the diff-mode context: cached transforms are redone when the formats
+# (or the rules applying them) change
+FORMATS_DIGEST = hashlib.sha1(repr((sorted(POSTCODE_FORMATS.items()), 'zero-pad')).encode('utf-8')).hexdigest()[:12]
+
+# integers read as floats ("12345.0")
+_FLOAT_INT_RE = r'^(\d+)\.0$'
+_DIGITS_RE = r'[0-9]+'
+
+
+def zero_pad(postcode: str, country_code: str | None) -> str:
+    """Digits-only postcode -> left-padded with zeros to the shortest length its country accepts."""
+    width = PAD_WIDTHS.get(country_code or '', 0)
+    if len(postcode) < width and re.fullmatch(_DIGITS_RE, postcode):
+        return postcode.zfill(width)
+    return postcode
+
+
+def resolve_postcode(postcode: str, street: str, country_code: str | None) -> tuple:
+    """One contact: -> (postcode, valid). Same rules as resolve_postcodes."""
+    postcode = zero_pad(re.sub(_FLOAT_INT_RE, r'\1', postcode), country_code)
+    fmt = POSTCODE_FORMATS.get(country_code or '', '')
+    if postcode:
+        return postcode, not fmt or VALID_RE[country_code].fullmatch(postcode) is not None
+    if fmt is None:
+        return '', True
+    if fmt == '':
+        m = GENERIC_POSTCODE_RE.search(street)
+        return (m.group(0).strip() if m else ''), True
+    m = EXTRACT_RE[country_code].match(street)
+    return (m.group(1) if m else ''), True
+
+
+def _zero_pad_column(postcode: pd.Series, width: int) -> pd.Series:
+    """zero_pad over the postcodes of one country."""
+    short = (postcode.str.len() < width) & postcode.str.fullmatch(_DIGITS_RE)
+    if not short.any():
+        return postcode
+    return postcode.mask(short, postcode.str.zfill(width))
+
+
+def resolve_postcodes(postcode: pd.Series, street: pd.Series, country_code: pd.Series) -> tuple:
+    """Vectorized resolve_postcode over aligned columns of normalized text.
+
+    -> (postcode, valid): a given postcode is kept (float artefacts like
+    '12345.0' repaired, lost leading zeros restored) and checked against its
+    country's format; an empty one is extracted from the street. valid is False only for a given postcode
+    that does not fit the known format of its country.
+    """
+    postcode = postcode.str.replace(_FLOAT_INT_RE, r'\1', regex=True)
+    codes = country_code.fillna('').to_numpy()
+    missing = (postcode == '').to_numpy()
+    out = postcode.to_numpy(dtype=object, copy=True)
+    valid = np.ones(len(postcode), dtype=bool)
+
+    for cc in pd.unique(codes):
+        in_cc = codes == cc
+        fmt = POSTCODE_FORMATS.get(cc, '')
+        if fmt is None:
+            continue
+        given = in_cc & ~missing
+        if given.any():
+            pc = postcode[given]
+            if cc in PAD_WIDTHS:
+                pc = _zero_pad_column(pc, PAD_WIDTHS[cc])
+                out[given] = pc.to_numpy(dtype=object)
+            if fmt:
+                valid[given] = pc.str.fullmatch(VALID_RE[cc]).to_numpy(dtype=bool)
+        need = in_cc & missing
+        if need.any():
+            found = street[need].str.extract(EXTRACT_RE[cc] if fmt else _GENERIC_EXTRACT_RE, expand=False)
+            out[need] = found.fillna('').str.strip().to_numpy(dtype=object)
+
+    return pd.Series(out, index=postcode.index), pd.Series(valid, index=postcode.index)
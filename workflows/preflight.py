@@ -0,0 +1,166 @@
+"""Pre-flight inspection of uploaded workbooks.
+
+Reads sheet names and row counts straight from the xlsx XML (workbook.xml,
+its relationships and each sheet's <dimension> tag) without loading any cell
+data, so oversized inputs can be rejected before a workflow starts.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+WARN_RATIO = 0.6
+
+
+@dataclass
+class WorkflowLimits:
+    max_upload_mb: float = 50
+    max_sheets: int = 200
+    max_rows_per_sheet: int = 200_000
+    max_total_rows: int = 300_000
+    max_uncompressed_mb: float = 400
+
+
+# AF Inputs above CHUNKED_THRESHOLD_ROWS run through the chunked pipeline,
+# whose memory is bounded by chunk size, so their row limits are higher.
+CHUNKED_THRESHOLD_ROWS = 50_000
+CHUNK_ROWS = 5_000
+
+WORKFLOW_LIMITS = {
+    'standard': WorkflowLimits(max_upload_mb=150, max_rows_per_sheet=600_000, max_total_rows=1_000_000, max_uncompressed_mb=1500),
+    'smart': WorkflowLimits(max_upload_mb=150, max_rows_per_sheet=600_000, max_total_rows=1_000_000, max_uncompressed_mb=1500),
+    # every input row is repeated once per item line
+    'per_tab': WorkflowLimits(max_rows_per_sheet=100_000, max_total_rows=150_000),
+    'enrich': WorkflowLimits(max_total_rows=200_000),
+    # GeoNames postal dumps (allCountries.zip is ~20 MB zipped)
+    'gazetteer': WorkflowLimits(max_upload_mb=200),
+    'reference': WorkflowLimits(max_upload_mb=10, max_sheets=20, max_rows_per_sheet=20_000, max_total_rows=50_000),
+}
+
+
+def _col_to_num(col: str) -> int:
+    n = 0
+    for ch in col.upper():
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def parse_dimension(ref: str):
+    """'A1:M500' -> (rows, cols). Returns (None, None) when unparseable."""
+    m = re.fullmatch(r'\$?([A-Z]+)\$?(\d+)(?::\$?([A-Z]+)\$?(\d+))?', (ref or '').strip().upper())
+    if not m:
+        return None, None
+    c1, r1, c2, r2 = m.groups()
+    c2 = c2 or c1
+    r2 = r2 or r1
+    return int(r2) - int(r1) + 1, _col_to_num(c2) - _col_to_num(c1) + 1
+
+
+def _sheet_targets(z: zipfile.ZipFile):
+    with z.open('xl/workbook.xml') as f:
+        wb = ET.parse(f).getroot()
+    rels = {}
+    try:
+        with z.open('xl/_rels/workbook.xml.rels') as f:
+            for rel in ET.parse(f).getroot().iter(f'{NS_PKG_REL}Relationship'):
+                target = rel.get('Target', '')
+                if target.startswith('/'):
+                    target = target.lstrip('/')
+                else:
+                    target = posixpath.normpath(posixpath.join('xl', target))
+                rels[rel.get('Id')] = target
+    except KeyError:
+        pass
+
+    out = []
+    for i, sh in enumerate(wb.iter(f'{NS_MAIN}sheet'), start=1):
+        rid = sh.get(f'{NS_REL}id')
+        out.append((sh.get('name', ''), rels.get(rid, f'xl/worksheets/sheet{i}.xml')))
+    return out
+
+
+def _sheet_dimension(z: zipfile.ZipFile, member: str, count_rows_if_missing: bool):
+    """Stream the sheet XML up to <sheetData>; only walk rows if <dimension> is absent."""
+    try:
+        f = z.open(member)
+    except KeyError:
+        return '', None, None
+    with f:
+        ref = ''
+        counting = False
+        rows = 0
+        for event, el in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if el.tag == f'{NS_MAIN}dimension':
+                    ref = el.get('ref', '')
+                elif el.tag == f'{NS_MAIN}sheetData':
+                    n_rows, n_cols = parse_dimension(ref)
+                    # writers that skip <dimension> (or emit a bare "A1") need a real count
+                    if n_rows is not None and ref.upper() != 'A1':
+                        return ref, n_rows, n_cols
+                    if not count_rows_if_missing:
+                        return ref, n_rows, n_cols
+                    counting = True
+            elif counting:
+                if el.tag == f'{NS_MAIN}row':
+                    rows += 1
+                    el.clear()
+                elif el.tag == f'{NS_MAIN}sheetData':
+                    break
+        return ref, rows, None
+
+
+def inspect_workbook(path: Path, count_rows_if_missing: bool = True) -> dict:
+    """Cheap structural summary of an .xlsx/.xlsm file.
+
+    Row counts include the header row (they come from the dimension tag).
+    """
+    path = Path(path)
+    info = {
+        'path': str(path),
+        'size_mb': path.stat().st_size / (1024 * 1024),
+        'uncompressed_mb': 0.0,
+        'sheets': [],
+        'total_rows': 0,
+    }
+    with zipfile.ZipFile(path) as z:
+        info['uncompressed_mb'] = sum(zi.file_size for zi in z.infolist()) / (1024 * 1024)
+        for name, member in _sheet_targets(z):
+            ref, rows, cols = _sheet_dimension(z, member, count_rows_if_missing)
+            info['sheets'].append({'name': name, 'dimension': ref, 'rows': rows or 0, 'cols': cols or 0})
+            info['total_rows'] += rows or 0
+    return info
+
+
+def check_upload_size(size_bytes: int, limits: WorkflowLimits):
+    size_mb = size_bytes / (1024 * 1024)
+    if size_mb > limits.max_upload_mb:
+        return [f'File is {size_mb:.1f} MB; the limit is {limits.max_upload_mb:g} MB.']
+    return []
+
+
+def check_workbook(info: dict, limits: WorkflowLimits, row_multiplier: int = 1):
+    """Compare an inspect_workbook() summary with limits -> (errors, warnings)."""
+    errors, warnings = [], []
+
+    def check(value, limit, label):
+        if value > limit:
+            errors.append(f'{label}: {value:,.0f} exceeds the limit of {limit:,.0f}.')
+        elif value > limit * WARN_RATIO:
+            warnings.append(f'{label}: {value:,.0f} is close to the limit of {limit:,.0f}.')
+
+    check(info['uncompressed_mb'], limits.max_uncompressed_mb, 'Uncompressed size (MB)')
+    check(len(info['sheets']), limits.max_sheets, 'Sheets')
+    for sh in info['sheets']:
+        check(sh['rows'] * row_multiplier, limits.max_rows_per_sheet, f"Rows in '{sh['name']}'")
+    check(info['total_rows'] * row_multiplier, limits.max_total_rows, 'Total rows')
+    return errors, warnings